@@ -0,0 +1,3 @@
+from app import startup
+
+startup.start_profiling()
\ No newline at end of file
@@ -0,0 +1,263 @@
+"""HTTP routes served next to the Reflex app."""
+
+import asyncio
+import bisect
+import io
+import itertools
+import json
+import logging
+import math
+import os
+
+from starlette.applications import Starlette
+from starlette.background import BackgroundTask
+from starlette.requests import Request
+from starlette.responses import (
+    FileResponse,
+    PlainTextResponse,
+    Response,
+    StreamingResponse,
+)
+from starlette.routing import Route
+
+from app.startup import lazy_import
+from app.state import (
+    METADATA_EXECUTOR,
+    RESULT_CURSORS,
+    RESULT_PAGE_SIZE,
+    RESULT_STORE,
+    RESULT_STORE_BATCH_ROWS_KEY,
+    RESULT_STREAM_PATH,
+    RESULT_STREAMS,
+    SESSION_EXPORT_PATH,
+    SESSION_EXPORTS,
+    _arrow_columns,
+    _RowPager,
+    _scheduled_call,
+)
+
+logger = logging.getLogger(__name__)
+pa = lazy_import("pyarrow")
+
+STREAM_BATCH_ROWS = 10000
+ARROW_STREAM_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+MAX_ROWS_PER_REQUEST = 1000
+
+
+def _page_tables(pager: _RowPager):
+    """Yield every page of an open result as an Arrow table, reading ahead if needed.
+
+    Pages come from the pager's spool or its cursor one at a time, so only
+    the page being sent is held in memory.
+    """
+    index = 0
+    while (page := pager.page(index)) is not None:
+        yield pager.table(page)
+        index += 1
+
+
+def _stored_tables(reader: "pa.ipc.RecordBatchFileReader"):
+    """Yield a stored result a record batch at a time."""
+    for index in range(reader.num_record_batches):
+        yield pa.Table.from_batches([reader.get_batch(index)])
+
+
+def _batch_starts(reader: "pa.ipc.RecordBatchFileReader") -> list[int]:
+    """Get the first row of each record batch of a stored result."""
+    batch_rows = (reader.schema.metadata or {}).get(RESULT_STORE_BATCH_ROWS_KEY)
+    if batch_rows is not None:
+        return [i * int(batch_rows) for i in range(reader.num_record_batches)]
+    # Written before stores recorded their batch size, so count every batch.
+    return list(
+        itertools.accumulate(
+            (
+                reader.get_batch(i).num_rows
+                for i in range(reader.num_record_batches - 1)
+            ),
+            initial=0,
+        )
+    )
+
+
+def _json_cell(value):
+    """Keep a cell valid JSON; NaN and infinities become text."""
+    if isinstance(value, float) and not math.isfinite(value):
+        return str(value)
+    return value
+
+
+def _window_rows(result_id: str, first: int, last: int) -> list[list] | None:
+    """Read rows first..last of a result for the grid, or None if it is gone.
+
+    A result that is still open is read from the pages its pager spooled;
+    this never reads its cursor, since the grid only asks for rows already
+    fetched. Other results are read from RESULT_STORE, decompressing only
+    the batches the window overlaps.
+    """
+    columns = []
+    pager = RESULT_CURSORS.pager(result_id)
+    if pager is not None:
+        for index in range(first // RESULT_PAGE_SIZE, -(-last // RESULT_PAGE_SIZE)):
+            page = pager.spooled(index)
+            if page is None:
+                break
+            start = index * RESULT_PAGE_SIZE
+            cells = pager.cells(page)
+            columns.append([c[max(first - start, 0) : last - start] for c in cells])
+    if not columns:
+        reader = RESULT_STORE.open_file(result_id)
+        if reader is None:
+            return None
+        starts = _batch_starts(reader)
+        index = max(bisect.bisect_right(starts, first) - 1, 0)
+        while index < reader.num_record_batches and starts[index] < last:
+            start = starts[index]
+            batch = reader.get_batch(index)
+            batch = batch.slice(max(first - start, 0), last - max(first, start))
+            columns.append(_arrow_columns(pa.Table.from_batches([batch])))
+            index += 1
+    return [
+        [_json_cell(value) for value in row] for cells in columns for row in zip(*cells)
+    ]
+
+
+def _conform(table: "pa.Table", schema: "pa.Schema") -> "pa.Table":
+    """Cast a page to the stream's schema, which the first page decided."""
+    if table.schema.equals(schema):
+        return table
+    arrays = []
+    for column, field in zip(table.columns, schema):
+        values = column.to_pylist()
+        if pa.types.is_string(field.type):
+            values = [None if v is None else str(v) for v in values]
+        arrays.append(pa.array(values, type=field.type))
+    return pa.Table.from_arrays(arrays, schema=schema)
+
+
+def _arrow_ipc_chunks(result_id: str):
+    """Yield a result as Arrow IPC stream chunks without running its statement again.
+
+    A result that is still open is read through its pager, sharing the
+    pages the grid has fetched; each page is written out as soon as it is
+    read, so the client receives the first rows while the rest are still
+    being produced. Other results are read from RESULT_STORE a batch at a
+    time.
+    """
+    pager = RESULT_CURSORS.pager(result_id)
+    if pager is not None:
+        tables = _page_tables(pager)
+    else:
+        reader = RESULT_STORE.open_file(result_id)
+        if reader is None or (reader.schema.metadata or {}).get(b"has_more") == b"true":
+            # Only part of a result whose cursor is gone was kept.
+            return
+        tables = _stored_tables(reader)
+    first = next(tables, None)
+    if first is None:
+        return
+    # Row drivers type each page separately; a column that is all null in
+    # the first page is streamed as text.
+    schema = pa.schema(
+        [
+            field.with_type(pa.string()) if pa.types.is_null(field.type) else field
+            for field in first.schema
+        ],
+        metadata={
+            key: value
+            for key, value in (first.schema.metadata or {}).items()
+            if key != RESULT_STORE_BATCH_ROWS_KEY
+        },
+    )
+    sink = io.BytesIO()
+    options = pa.ipc.IpcWriteOptions(compression="zstd")
+    with pa.ipc.new_stream(sink, schema, options=options) as writer:
+        for table in itertools.chain([first], tables):
+            for batch in _conform(table, schema).to_batches(STREAM_BATCH_ROWS):
+                writer.write_batch(batch)
+                yield sink.getvalue()
+                sink.seek(0)
+                sink.truncate()
+    yield sink.getvalue()
+
+
+async def stream_result(request: Request):
+    """Stream a recent query result as Arrow IPC."""
+    result_id = request.path_params["result_id"]
+    session_token = RESULT_STREAMS.get(result_id)
+    if session_token is None:
+        return PlainTextResponse("Unknown or expired result.", status_code=404)
+    loop = asyncio.get_running_loop()
+    chunks = _arrow_ipc_chunks(result_id)
+    # Each chunk may read from the database, so it waits for one of the
+    # session's scheduler slots like the session's other queries.
+    try:
+        first = await _scheduled_call(session_token, next, chunks, b"")
+    except Exception as e:
+        logger.exception("Failed to stream result")
+        await loop.run_in_executor(METADATA_EXECUTOR, chunks.close)
+        return PlainTextResponse(f"Could not stream the result: {e}", status_code=503)
+    if not first:
+        return PlainTextResponse(
+            "The result is no longer available. Run it again.", status_code=404
+        )
+
+    async def body():
+        try:
+            yield first
+            while chunk := await _scheduled_call(session_token, next, chunks, b""):
+                yield chunk
+        except Exception:
+            logger.exception("Failed to stream result")
+        finally:
+            await loop.run_in_executor(METADATA_EXECUTOR, chunks.close)
+
+    return StreamingResponse(
+        body(),
+        media_type=ARROW_STREAM_MEDIA_TYPE,
+        headers={
+            "Content-Disposition": "attachment; filename=result.arrows",
+            "Cache-Control": "no-store",
+        },
+    )
+
+
+async def result_rows(request: Request):
+    """Send the grid a window of a recent result's rows as JSON."""
+    result_id = request.path_params["result_id"]
+    try:
+        first = max(int(request.query_params["first"]), 0)
+        last = min(int(request.query_params["last"]), first + MAX_ROWS_PER_REQUEST)
+    except (KeyError, ValueError):
+        return PlainTextResponse("first and last must be row numbers.", status_code=400)
+    rows = await asyncio.get_running_loop().run_in_executor(
+        METADATA_EXECUTOR, _window_rows, result_id, first, last
+    )
+    if rows is None:
+        return PlainTextResponse("Unknown or expired result.", status_code=404)
+    return Response(
+        json.dumps({"rows": rows}, default=str, allow_nan=False),
+        media_type="application/json",
+        headers={"Cache-Control": "no-store"},
+    )
+
+
+async def download_session(request: Request):
+    """Send an exported session file once, deleting it afterwards."""
+    path = SESSION_EXPORTS.pop(request.path_params["export_id"])
+    if path is None:
+        return PlainTextResponse("Unknown or expired export.", status_code=404)
+    return FileResponse(
+        path,
+        media_type="application/zip",
+        filename=os.path.basename(path),
+        background=BackgroundTask(os.remove, path),
+    )
+
+
+results_api = Starlette(
+    routes=[
+        Route(f"{RESULT_STREAM_PATH}/{{result_id}}", stream_result),
+        Route(f"{RESULT_STREAM_PATH}/{{result_id}}/rows", result_rows),
+        Route(f"{SESSION_EXPORT_PATH}/{{export_id}}", download_session),
+    ]
+)
\ No newline at end of file
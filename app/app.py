@@ -1,14 +1,17 @@
 import reflex as rx
-from app.components.header import header
-from app.components.sidebar import sidebar
+
+from app import startup
+from app.api import results_api
 from app.components.editor import editor_panel
-from app.components.status_bar import status_bar
+from app.components.header import header
 from app.components.modals import (
-    import_modal,
     connect_db_modal,
-    new_session_modal,
+    import_modal,
     import_session_modal,
+    new_session_modal,
 )
+from app.components.sidebar import sidebar
+from app.components.status_bar import status_bar
 from app.state import DBState
 
 
@@ -33,6 +36,7 @@ def index() -> rx.Component:
 
 app = rx.App(
     theme=rx.theme(appearance="light"),
+    api_transformer=results_api,
     head_components=[
         rx.el.link(rel="preconnect", href="https://fonts.googleapis.com"),
         rx.el.link(rel="preconnect", href="https://fonts.gstatic.com", crossorigin=""),
@@ -40,6 +44,8 @@ app = rx.App(
             href="https://fonts.googleapis.com/css2?family=Poppins:wght@400;500;600;700&display=swap",
             rel="stylesheet",
         ),
+        rx.el.script(src="/results_grid.js", defer=True),
     ],
 )
-app.add_page(index, route="/", title="Orbit Workbench", on_load=DBState.initialize_db)
\ No newline at end of file
+app.add_page(index, route="/", title="Orbit Workbench", on_load=DBState.initialize_db)
+startup.report()
\ No newline at end of file
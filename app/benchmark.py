@@ -0,0 +1,531 @@
+"""Benchmarks for the workbench's hot paths.
+
+Builds synthetic DuckDB catalogs and tables with generate_series and drives
+the state handlers directly, without a browser or websocket. Each case
+records its latency, how far the process's RSS grew while it ran and the
+bytes it produced for the client, and is compared against a stored JSON
+baseline. Every repetition of a case starts from the same state, so what
+a case produces does not depend on --repeat.
+
+    python -m app.benchmark --rows 1000 --tables 10
+    python -m app.benchmark --rows 1000,1000000 --tables 10,10000
+    python -m app.benchmark --rows 1000 --tables 10 --update-baseline
+
+The committed baseline, app/benchmark-baseline.json, covers the small
+cases of the first command. Cases it doesn't cover are reported but never
+flagged. Latencies are compared as multiples of a calibration workload
+timed at the start of each run, so a baseline recorded on one machine can
+be checked on another; payloads are compared as they are.
+"""
+
+import argparse
+import asyncio
+import datetime
+import json
+import os
+import platform
+import statistics
+import sys
+import threading
+import time
+import uuid
+from typing import TypedDict
+
+import duckdb
+import reflex as rx
+from reflex.istate.data import RouterData
+from reflex.utils import format
+
+from app import drivers
+from app.state import (
+    DATA_VERSIONS,
+    DB_POOL,
+    ER_DIAGRAMS,
+    SCHEMA_CACHE,
+    SESSION_EXPORTS,
+    DBState,
+    QueryState,
+    SessionState,
+)
+
+BENCHMARK_VERSION = 2
+DEFAULT_BASELINE_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "benchmark-baseline.json"
+)
+DEFAULT_ROW_COUNTS = [1_000, 100_000, 1_000_000]
+DEFAULT_TABLE_COUNTS = [10, 1_000, 10_000]
+DEFAULT_REPEATS = 5
+DEFAULT_TOLERANCE = 0.25
+# Growth below these is noise on the small cases: timer jitter, or the
+# allocator holding on to a few more pages.
+MIN_LATENCY_REGRESSION_MS = 10.0
+MIN_RSS_REGRESSION_BYTES = 16 * 2**20
+RSS_SAMPLE_SECONDS = 0.005
+CALIBRATION_ROWS = 200_000
+CALIBRATION_REPEATS = 5
+SCAN_QUERY = "SELECT * FROM facts"
+AGGREGATE_QUERY = (
+    "SELECT region, count(*) AS sales, sum(amount) AS revenue "
+    "FROM facts GROUP BY region ORDER BY region"
+)
+EXPORT_HISTORY_QUERIES = 10
+
+
+class CaseResult(TypedDict):
+    """One case's measurements.
+
+    relative_latency is latency_ms as a multiple of the run's calibration
+    time, and rss_growth_bytes how far peak RSS rose above RSS at the start.
+    """
+
+    case: str
+    latency_ms: float
+    min_latency_ms: float
+    max_latency_ms: float
+    relative_latency: float
+    peak_rss_bytes: int
+    rss_growth_bytes: int
+    payload_bytes: int
+
+
+class Regression(TypedDict):
+    case: str
+    metric: str
+    baseline: float
+    current: float
+
+
+def _current_rss() -> int:
+    """Get the resident set size of this process in bytes."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        import resource
+
+        # Without /proc, fall back to the lifetime peak (KiB on Linux, bytes on macOS).
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+class _PeakRSS:
+    """Samples RSS on a background thread and keeps the highest value seen."""
+
+    def __init__(self):
+        self.start = 0
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+
+    def _sample(self):
+        while not self._stop.is_set():
+            self.peak = max(self.peak, _current_rss())
+            self._stop.wait(RSS_SAMPLE_SECONDS)
+
+    def __enter__(self) -> "_PeakRSS":
+        self.start = self.peak = _current_rss()
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, _current_rss())
+
+
+class _StateProxy:
+    """Stands in for Reflex's StateProxy so background events run in-process.
+
+    Entering the proxy is a no-op: nothing else touches the benchmark's
+    states, so there is no lock to take or state to reload.
+    """
+
+    def __init__(self, state: rx.State):
+        object.__setattr__(self, "_state", state)
+
+    async def __aenter__(self) -> "_StateProxy":
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+    def __getattr__(self, name: str):
+        value = getattr(self._state, name)
+        if getattr(value, "__self__", None) is self._state:
+            # Rebind methods so their `async with self` also goes through the proxy.
+            return value.__func__.__get__(self)
+        return value
+
+    def __setattr__(self, name: str, value):
+        setattr(self._state, name, value)
+
+
+def _new_session(driver: drivers.Driver) -> rx.State:
+    """Create a root state for a fresh session connected to a driver."""
+    token = f"benchmark-{uuid.uuid4()}"
+    root = rx.State(_reflex_internal_init=True)
+    root.router = RouterData.from_router_data(
+        {"token": token, "sid": token, "headers": {}, "pathname": "/"}
+    )
+    DB_POOL.set(token, driver)
+    return root
+
+
+async def _dispatch(state: rx.State, handler, *args) -> list:
+    """Run an event handler to completion and return what it yielded."""
+    fn = handler.fn
+    target = _StateProxy(state) if handler.is_background else state
+    result = fn(target, *args)
+    if hasattr(result, "__aiter__"):
+        return [event async for event in result]
+    if asyncio.iscoroutine(result):
+        return [await result]
+    if hasattr(result, "__iter__"):
+        return list(result)
+    return [result]
+
+
+async def _take_payload(root: rx.State) -> int:
+    """Get the bytes of the delta the client would be sent, and clear it."""
+    delta = await root._get_resolved_delta()
+    root._clean()
+    return len(format.json_dumps(delta).encode())
+
+
+def _create_facts(driver: drivers.DuckDBDriver, rows: int):
+    driver.con.execute(
+        "CREATE TABLE facts AS SELECT i AS id, i % 1000 AS customer_id, "
+        "(i * 7919) % 100000 / 100.0 AS amount, 'region_' || (i % 16) AS region, "
+        "DATE '2024-01-01' + (i % 365)::INT AS day "
+        f"FROM generate_series(1, {rows}) t(i)"
+    )
+
+
+def _create_catalog(driver: drivers.DuckDBDriver, tables: int):
+    """Create tables that each reference the one before by a t#####_id column."""
+    con = driver.con
+    con.execute("BEGIN TRANSACTION")
+    for i in range(tables):
+        con.execute(
+            f"CREATE TABLE t{i:05d} AS SELECT i AS id, "
+            f"i AS t{max(i - 1, 0):05d}_id, 'label_' || i AS label, "
+            "i * 1.5 AS score FROM generate_series(1, 10) t(i)"
+        )
+    con.execute("COMMIT")
+
+
+def _calibrate() -> float:
+    """Time a fixed workload that latencies are compared in multiples of.
+
+    Like the cases, it reads rows from DuckDB into Python and serializes
+    them, so it speeds up and slows down with the machine in the same way.
+    """
+    con = duckdb.connect()
+    try:
+        latencies = []
+        for _ in range(CALIBRATION_REPEATS):
+            started = time.perf_counter()
+            rows = con.execute(
+                "SELECT i, i % 7 AS k, 'value_' || i AS v "
+                f"FROM range({CALIBRATION_ROWS}) t(i)"
+            ).fetchall()
+            json.dumps(rows)
+            latencies.append((time.perf_counter() - started) * 1000)
+        return statistics.median(latencies)
+    finally:
+        con.close()
+
+
+async def _measure(
+    name: str, repeats: int, calibration_ms: float, case, setup=None
+) -> CaseResult:
+    """Run a case several times, keeping its latencies, RSS and payload.
+
+    The case is an async callable that runs one repetition and returns the
+    bytes it produced for the client. setup, if given, is awaited before
+    each repetition, untimed, to put the state back where the case starts.
+    """
+    latencies = []
+    payload_bytes = 0
+    with _PeakRSS() as rss:
+        for _ in range(repeats):
+            if setup is not None:
+                await setup()
+            started = time.perf_counter()
+            payload_bytes = await case()
+            latencies.append((time.perf_counter() - started) * 1000)
+    latency_ms = statistics.median(latencies)
+    return CaseResult(
+        case=name,
+        latency_ms=round(latency_ms, 3),
+        min_latency_ms=round(min(latencies), 3),
+        max_latency_ms=round(max(latencies), 3),
+        relative_latency=round(latency_ms / calibration_ms, 4),
+        peak_rss_bytes=rss.peak,
+        rss_growth_bytes=rss.peak - rss.start,
+        payload_bytes=payload_bytes,
+    )
+
+
+async def _bench_queries(
+    rows: int, repeats: int, calibration_ms: float
+) -> list[CaseResult]:
+    """Benchmark run_query on a fact table, then export a session of scans."""
+    driver = drivers.DuckDBDriver.connect({"database": ":memory:"})
+    _create_facts(driver, rows)
+    root = _new_session(driver)
+    query_state = await root.get_state(QueryState)
+    session_state = await root.get_state(SessionState)
+
+    async def clear_history():
+        # Each query adds to the history the client is sent, so every
+        # repetition starts from an empty one.
+        await _dispatch(query_state, QueryState.new_session)
+        await _take_payload(root)
+
+    results = []
+    for label, sql in (("scan", SCAN_QUERY), ("aggregate", AGGREGATE_QUERY)):
+
+        async def run_query(sql=sql) -> int:
+            # Bump the data version so every repetition misses the result cache.
+            DATA_VERSIONS.bump(driver.catalog_key)
+            query_state.query_input = sql
+            await _dispatch(query_state, QueryState.run_query)
+            return await _take_payload(root)
+
+        results.append(
+            await _measure(
+                f"run_query.{label}[rows={rows}]",
+                repeats,
+                calibration_ms,
+                run_query,
+                setup=clear_history,
+            )
+        )
+
+    await clear_history()
+    for _ in range(EXPORT_HISTORY_QUERIES):
+        DATA_VERSIONS.bump(driver.catalog_key)
+        query_state.query_input = SCAN_QUERY
+        await _dispatch(query_state, QueryState.run_query)
+    await _take_payload(root)
+
+    async def export_session() -> int:
+        before = set(SESSION_EXPORTS._paths)
+        await _dispatch(session_state, SessionState.export_session)
+        export_id = next(iter(set(SESSION_EXPORTS._paths) - before))
+        path = SESSION_EXPORTS.pop(export_id)
+        try:
+            return os.path.getsize(path)
+        finally:
+            os.remove(path)
+
+    results.append(
+        await _measure(
+            f"export_session[rows={rows}]", repeats, calibration_ms, export_session
+        )
+    )
+    await _dispatch(query_state, QueryState.new_session)
+    DB_POOL.release(root.router.session.client_token)
+    return results
+
+
+async def _bench_catalog(
+    tables: int, repeats: int, calibration_ms: float
+) -> list[CaseResult]:
+    """Benchmark schema loading and ER diagram rendering on a catalog."""
+    driver = drivers.DuckDBDriver.connect({"database": ":memory:"})
+    _create_catalog(driver, tables)
+    root = _new_session(driver)
+    db_state = await root.get_state(DBState)
+    query_state = await root.get_state(QueryState)
+
+    async def load_schema() -> int:
+        # Drop the cached catalog so the schema is introspected every time.
+        SCHEMA_CACHE._entries.pop(driver.catalog_key, None)
+        await _dispatch(db_state, DBState.load_schema)
+        return await _take_payload(root)
+
+    results = [
+        await _measure(
+            f"load_schema[tables={tables}]", repeats, calibration_ms, load_schema
+        )
+    ]
+    query_state.active_table = f"t{tables // 2:05d}"
+    for hops in (0, 2):
+
+        async def er_diagram(hops=hops) -> int:
+            ER_DIAGRAMS._entries.clear()
+            query_state.er_neighborhood_hops = hops
+            return len((await query_state.er_diagram_markdown).encode())
+
+        results.append(
+            await _measure(
+                f"er_diagram_markdown[tables={tables},hops={hops}]",
+                repeats,
+                calibration_ms,
+                er_diagram,
+            )
+        )
+    DB_POOL.release(root.router.session.client_token)
+    return results
+
+
+async def run_benchmarks(
+    row_counts: list[int], table_counts: list[int], repeats: int
+) -> tuple[float, list[CaseResult]]:
+    """Run every case, returning the calibration time and the results."""
+    calibration_ms = _calibrate()
+    results = []
+    for rows in row_counts:
+        results.extend(await _bench_queries(rows, repeats, calibration_ms))
+    for tables in table_counts:
+        results.extend(await _bench_catalog(tables, repeats, calibration_ms))
+    return calibration_ms, results
+
+
+def find_regressions(
+    results: list[CaseResult], baseline: dict, tolerance: float, calibration_ms: float
+) -> list[Regression]:
+    """Compare results with a baseline, flagging metrics that grew past tolerance.
+
+    Latencies are compared relative to each run's calibration time. Cases
+    missing from the baseline are skipped, so new cases never fail a run,
+    and latency and RSS must also grow by MIN_LATENCY_REGRESSION_MS and
+    MIN_RSS_REGRESSION_BYTES.
+    """
+    previous = {result["case"]: result for result in baseline.get("results", [])}
+    floors = {
+        "relative_latency": MIN_LATENCY_REGRESSION_MS / calibration_ms,
+        "rss_growth_bytes": MIN_RSS_REGRESSION_BYTES,
+        "payload_bytes": 0,
+    }
+    regressions = []
+    for result in results:
+        base = previous.get(result["case"])
+        if base is None:
+            continue
+        for metric, floor in floors.items():
+            grew = (
+                result[metric] > base[metric] * (1 + tolerance)
+                and result[metric] - base[metric] > floor
+            )
+            if grew:
+                regressions.append(
+                    Regression(
+                        case=result["case"],
+                        metric=metric,
+                        baseline=base[metric],
+                        current=result[metric],
+                    )
+                )
+    return regressions
+
+
+def _environment() -> dict[str, str]:
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "duckdb": duckdb.__version__,
+    }
+
+
+def _print_results(
+    calibration_ms: float, results: list[CaseResult], regressions: list[Regression]
+):
+    flagged = {regression["case"] for regression in regressions}
+    print(f"Calibration: {calibration_ms:.1f} ms")
+    print(
+        f"{'case':<48} {'median ms':>10} {'relative':>9} "
+        f"{'RSS growth MB':>14} {'payload KB':>11}"
+    )
+    for result in results:
+        marker = "  REGRESSION" if result["case"] in flagged else ""
+        print(
+            f"{result['case']:<48} {result['latency_ms']:>10.1f} "
+            f"{result['relative_latency']:>9.3f} "
+            f"{result['rss_growth_bytes'] / 2**20:>14.1f} "
+            f"{result['payload_bytes'] / 1024:>11.1f}{marker}"
+        )
+    for regression in regressions:
+        print(
+            f"Regression: {regression['case']} {regression['metric']} "
+            f"{regression['baseline']} -> {regression['current']}"
+        )
+
+
+def _parse_counts(value: str) -> list[int]:
+    return [int(part) for part in value.split(",") if part.strip()]
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m app.benchmark", description=__doc__.splitlines()[0]
+    )
+    parser.add_argument(
+        "--rows",
+        type=_parse_counts,
+        default=DEFAULT_ROW_COUNTS,
+        help="comma-separated fact table sizes for run_query and export_session",
+    )
+    parser.add_argument(
+        "--tables",
+        type=_parse_counts,
+        default=DEFAULT_TABLE_COUNTS,
+        help="comma-separated catalog sizes for load_schema and the ER diagram",
+    )
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEATS)
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE_PATH)
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=DEFAULT_TOLERANCE,
+        help="fraction a metric may grow over the baseline before it is flagged",
+    )
+    parser.add_argument(
+        "--update-baseline",
+        action="store_true",
+        help="write this run's results as the new baseline",
+    )
+    args = parser.parse_args(argv)
+
+    calibration_ms, results = asyncio.run(
+        run_benchmarks(args.rows, args.tables, args.repeat)
+    )
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    if baseline and baseline.get("version") != BENCHMARK_VERSION:
+        print("Warning: the baseline is from another benchmark version; skipping it.")
+        baseline = {}
+    regressions = (
+        []
+        if args.update_baseline
+        else find_regressions(results, baseline, args.tolerance, calibration_ms)
+    )
+    _print_results(calibration_ms, results, regressions)
+    if args.update_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(
+                {
+                    "version": BENCHMARK_VERSION,
+                    "created": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+                    "environment": _environment(),
+                    "calibration_ms": round(calibration_ms, 3),
+                    "results": results,
+                },
+                f,
+                indent=2,
+            )
+        print(f"Baseline written to {args.baseline}")
+    elif baseline.get("environment", _environment()) != _environment():
+        print(
+            "Note: the baseline was recorded in a different environment; "
+            "latencies are compared relative to each run's calibration."
+        )
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
\ No newline at end of file
@@ -1,8 +1,12 @@
 import reflex as rx
 from reflex_monaco import monaco
-from app.state import QueryState, UIState
-from app.components.results_table import results_table
+
 from app.components.er_diagram import er_diagram_view
+from app.components.history import history_view
+from app.components.profile import profile_view
+from app.components.results_table import results_table
+from app.components.table_stats import table_stats_view
+from app.state import QueryState, SessionState, UIState
 
 
 def _tab_button(name: str, tab_key: str) -> rx.Component:
@@ -18,6 +22,30 @@ def _tab_button(name: str, tab_key: str) -> rx.Component:
     )
 
 
+def _parameter_input(param: rx.Var) -> rx.Component:
+    return rx.el.label(
+        rx.el.span(f"${param['name']}", class_name="font-mono text-gray-600"),
+        rx.el.input(
+            value=param["value"],
+            on_change=lambda value: QueryState.set_query_param(param["name"], value),
+            placeholder="42, true, NULL or 'text'",
+            class_name="w-32 px-2 py-1 border border-gray-300 rounded-md text-xs focus:outline-none focus:ring-2 focus:ring-orange-500",
+        ),
+        class_name="flex items-center gap-2",
+    )
+
+
+def parameter_panel() -> rx.Component:
+    return rx.cond(
+        QueryState.query_parameters.length() > 0,
+        rx.el.div(
+            rx.el.span("Parameters", class_name="font-semibold text-gray-800"),
+            rx.foreach(QueryState.query_parameters, _parameter_input),
+            class_name="flex flex-wrap items-center gap-4 px-4 pb-2 text-xs",
+        ),
+    )
+
+
 def query_view() -> rx.Component:
     return rx.el.div(
         rx.el.div(
@@ -36,6 +64,15 @@ def query_view() -> rx.Component:
                     },
                 ),
                 rx.el.div(
+                    rx.cond(
+                        QueryState.is_running,
+                        rx.el.button(
+                            rx.icon("square", size=16),
+                            "Cancel",
+                            on_click=QueryState.cancel_query,
+                            class_name="flex items-center gap-2 bg-gray-100 text-gray-700 px-4 py-2 rounded-md text-sm font-medium hover:bg-gray-200",
+                        ),
+                    ),
                     rx.el.button(
                         rx.icon("play", size=16),
                         "Run",
@@ -43,21 +80,66 @@ def query_view() -> rx.Component:
                         is_loading=QueryState.is_running,
                         class_name="flex items-center gap-2 bg-black text-white px-4 py-2 rounded-md text-sm font-medium hover:bg-gray-800 disabled:opacity-50",
                     ),
-                    class_name="absolute bottom-4 right-4 z-10",
+                    class_name="absolute bottom-4 right-4 z-10 flex gap-2",
+                ),
+                rx.el.div(
+                    rx.el.label(
+                        rx.el.input(
+                            type="checkbox",
+                            checked=QueryState.script_mode,
+                            on_change=QueryState.toggle_script_mode,
+                            class_name="accent-orange-500",
+                        ),
+                        "Script",
+                        title="Run each statement separately",
+                        class_name="flex items-center gap-1",
+                    ),
+                    rx.cond(
+                        QueryState.script_mode,
+                        rx.el.label(
+                            rx.el.input(
+                                type="checkbox",
+                                checked=QueryState.stop_on_error,
+                                on_change=QueryState.toggle_stop_on_error,
+                                class_name="accent-orange-500",
+                            ),
+                            "Stop on error",
+                            class_name="flex items-center gap-1",
+                        ),
+                    ),
+                    class_name="absolute bottom-4 left-4 z-10 flex gap-4 px-2 py-1 text-xs text-gray-600 bg-white/90 rounded-md",
                 ),
                 class_name="relative h-full w-full border border-gray-200 rounded-lg overflow-hidden",
             ),
             class_name="flex h-1/2 p-4 gap-4",
         ),
+        parameter_panel(),
         rx.el.div(
             rx.el.div(
                 rx.el.h2("Results", class_name="text-sm font-semibold text-gray-800"),
-                rx.cond(
-                    QueryState.current_results["rows"].length() > 0,
-                    rx.el.span(
-                        f"{QueryState.current_results['rows'].length()} rows",
-                        class_name="text-xs text-gray-500",
+                rx.el.div(
+                    rx.cond(
+                        SessionState.result_row_count > 0,
+                        rx.el.span(
+                            rx.cond(
+                                SessionState.result_has_more,
+                                f"{SessionState.result_row_count}+ rows",
+                                f"{SessionState.result_row_count} rows",
+                            ),
+                            class_name="text-xs text-gray-500",
+                        ),
                     ),
+                    rx.cond(
+                        QueryState.result_stream_url != "",
+                        rx.el.a(
+                            rx.icon("download", size=12),
+                            "Arrow",
+                            href=QueryState.result_stream_url,
+                            title="Stream the full result as Arrow IPC",
+                            class_name="flex items-center gap-1 text-xs text-gray-500 hover:text-gray-800",
+                        ),
+                    ),
+                    class_name="flex items-center gap-3",
                 ),
                 class_name="flex items-center justify-between px-4 pt-2",
             ),
@@ -73,8 +155,18 @@ def editor_panel() -> rx.Component:
         rx.el.div(
             _tab_button("Query", "query"),
             _tab_button("ER Diagram", "er_diagram"),
+            _tab_button("Column Stats", "column_stats"),
+            _tab_button("Profile", "profile"),
+            _tab_button("History", "history"),
             class_name="flex border-b border-gray-200 bg-gray-50",
         ),
-        rx.cond(UIState.active_editor_tab == "query", query_view(), er_diagram_view()),
+        rx.match(
+            UIState.active_editor_tab,
+            ("er_diagram", er_diagram_view()),
+            ("column_stats", table_stats_view()),
+            ("profile", profile_view()),
+            ("history", history_view()),
+            query_view(),
+        ),
         class_name="flex-1 flex flex-col overflow-hidden",
     )
\ No newline at end of file
@@ -1,11 +1,34 @@
 import reflex as rx
+
 from app.state import QueryState
 
+_NEIGHBORHOOD_OPTIONS = [
+    ("0", "Whole database"),
+    ("1", "1 hop from selected table"),
+    ("2", "2 hops from selected table"),
+    ("3", "3 hops from selected table"),
+]
+
 
 def er_diagram_view() -> rx.Component:
     return rx.el.div(
-        rx.markdown(
-            QueryState.er_diagram_markdown, component_map={"erDiagram": rx.el.div}
+        rx.el.div(
+            rx.el.select(
+                *[
+                    rx.el.option(label, value=value)
+                    for value, label in _NEIGHBORHOOD_OPTIONS
+                ],
+                default_value="0",
+                on_change=QueryState.set_er_neighborhood_hops,
+                class_name="px-2 py-1 text-sm border border-gray-200 rounded-md focus:outline-none focus:ring-2 focus:ring-orange-500",
+            ),
+            class_name="flex justify-end px-4 pt-4",
+        ),
+        rx.el.div(
+            rx.markdown(
+                QueryState.er_diagram_markdown, component_map={"erDiagram": rx.el.div}
+            ),
+            class_name="flex-1 w-full p-4 overflow-auto flex items-center justify-center",
         ),
-        class_name="w-full h-full p-4 overflow-auto bg-white flex items-center justify-center",
+        class_name="w-full h-full flex flex-col bg-white",
     )
\ No newline at end of file
@@ -0,0 +1,48 @@
+import reflex as rx
+
+from app.state import QueryHistoryItem, SessionState
+
+
+def render_history_item(item: QueryHistoryItem) -> rx.Component:
+    return rx.el.button(
+        rx.el.div(
+            rx.el.span(
+                item["natural_language"],
+                class_name="truncate text-sm font-medium text-gray-800",
+            ),
+            rx.el.span(
+                item["generated_sql"], class_name="truncate text-xs text-gray-500"
+            ),
+            class_name="flex flex-col items-start min-w-0",
+        ),
+        rx.el.div(
+            rx.el.span(item["status"]),
+            rx.el.span(f"{item['row_count']} rows"),
+            rx.el.span(f"{item['execution_time']}s"),
+            class_name="flex items-center gap-3 flex-shrink-0 text-xs text-gray-500",
+        ),
+        on_click=lambda: SessionState.open_history_item(item["id"]),
+        class_name=rx.cond(
+            SessionState.active_result_id == item["id"],
+            "w-full flex items-center justify-between gap-4 px-4 py-2 text-left bg-orange-50 border-b border-gray-200",
+            "w-full flex items-center justify-between gap-4 px-4 py-2 text-left hover:bg-gray-50 border-b border-gray-200",
+        ),
+    )
+
+
+def history_view() -> rx.Component:
+    return rx.el.div(
+        rx.cond(
+            SessionState.query_history.length() > 0,
+            rx.el.div(
+                rx.foreach(SessionState.query_history, render_history_item),
+                class_name="flex flex-col-reverse",
+            ),
+            rx.el.div(
+                rx.icon("history", size=32, class_name="text-gray-400 mb-2"),
+                rx.el.p("No queries run yet.", class_name="text-sm text-gray-500"),
+                class_name="flex flex-col items-center justify-center h-full text-center p-8",
+            ),
+        ),
+        class_name="w-full h-full overflow-auto bg-white",
+    )
\ No newline at end of file
@@ -1,5 +1,6 @@
 import reflex as rx
-from app.state import UIState, DBState, QueryState, SessionState
+
+from app.state import DBState, QueryState, SessionState, UIState
 
 
 def _modal_overlay() -> rx.Component:
@@ -94,7 +95,7 @@ def import_modal() -> rx.Component:
                 ),
                 rx.cond(
                     UIState.import_source_type == "file",
-                    rx.el.div(
+                    rx.upload.root(
                         rx.el.div(
                             rx.icon(
                                 "cloud_upload", size=32, class_name="text-gray-500"
@@ -104,11 +105,20 @@ def import_modal() -> rx.Component:
                                 class_name="font-medium text-gray-700",
                             ),
                             rx.el.p(
-                                "XLS, CSV, JSON (up to 10MB)",
+                                "CSV, Parquet, JSON (optionally gzipped)",
                                 class_name="text-sm text-gray-500",
                             ),
+                            rx.foreach(
+                                rx.selected_files("import-dataset-upload"),
+                                lambda name: rx.el.p(
+                                    name,
+                                    class_name="mt-2 text-sm font-medium text-orange-600",
+                                ),
+                            ),
                             class_name="text-center",
                         ),
+                        id="import-dataset-upload",
+                        max_files=1,
                         class_name="flex items-center justify-center w-full h-48 border-2 border-dashed border-gray-300 rounded-lg cursor-pointer hover:bg-gray-50",
                     ),
                     rx.el.div(
@@ -126,9 +136,20 @@ def import_modal() -> rx.Component:
                         on_click=UIState.toggle_import_modal,
                         class_name="px-4 py-2 text-sm font-medium text-gray-700 bg-gray-100 rounded-lg hover:bg-gray-200",
                     ),
-                    rx.el.button(
-                        "Import",
-                        class_name="px-4 py-2 text-sm font-medium text-white bg-black rounded-lg hover:bg-gray-800",
+                    rx.cond(
+                        UIState.import_source_type == "file",
+                        rx.el.button(
+                            "Import",
+                            on_click=DBState.handle_dataset_upload(
+                                rx.upload_files(upload_id="import-dataset-upload")
+                            ),
+                            class_name="px-4 py-2 text-sm font-medium text-white bg-black rounded-lg hover:bg-gray-800",
+                        ),
+                        rx.el.button(
+                            "Import",
+                            on_click=DBState.import_dataset_from_url,
+                            class_name="px-4 py-2 text-sm font-medium text-white bg-black rounded-lg hover:bg-gray-800",
+                        ),
                     ),
                     class_name="flex justify-end gap-3 mt-6",
                 ),
@@ -255,7 +276,7 @@ def import_session_modal() -> rx.Component:
                             class_name="font-medium text-gray-700 mt-2",
                         ),
                         rx.el.p(
-                            "ORB files up to 10MB", class_name="text-sm text-gray-500"
+                            "ORB session files", class_name="text-sm text-gray-500"
                         ),
                         class_name="text-center",
                     ),
@@ -265,6 +286,16 @@ def import_session_modal() -> rx.Component:
                     ),
                     class_name="flex items-center justify-center w-full h-48 border-2 border-dashed border-gray-300 rounded-lg cursor-pointer hover:bg-gray-50 p-4",
                 ),
+                rx.el.label(
+                    rx.el.input(
+                        type="checkbox",
+                        checked=SessionState.revalidate_schema_on_import,
+                        on_change=SessionState.toggle_revalidate_schema_on_import,
+                        class_name="accent-orange-500",
+                    ),
+                    "Reconnect and re-check the schema after importing",
+                    class_name="flex items-center gap-2 mt-4 text-sm text-gray-700",
+                ),
                 rx.el.div(
                     rx.el.button(
                         "Close",
@@ -0,0 +1,118 @@
+import reflex as rx
+
+from app.state import PhaseTiming, ProfileOperator, QueryState, SessionState
+
+
+def render_phase(phase: PhaseTiming) -> rx.Component:
+    return rx.el.div(
+        rx.el.span(phase["name"], class_name="w-24 text-gray-600"),
+        rx.el.div(
+            rx.el.div(
+                class_name="h-2 bg-orange-500 rounded",
+                style={"width": f"{phase['percent']}%"},
+            ),
+            class_name="flex-1 bg-gray-100 rounded",
+        ),
+        rx.el.span(f"{phase['ms']} ms", class_name="w-24 text-right text-gray-700"),
+        class_name="flex items-center gap-3 text-xs",
+    )
+
+
+def render_operator(operator: ProfileOperator) -> rx.Component:
+    return rx.el.tr(
+        rx.el.td(
+            operator["name"],
+            style={"paddingLeft": f"{operator['depth'] * 16 + 16}px"},
+            class_name="py-1 pr-4 font-mono text-xs text-gray-800 whitespace-nowrap",
+        ),
+        rx.el.td(
+            operator["rows"], class_name="px-4 py-1 text-xs text-right text-gray-600"
+        ),
+        rx.el.td(
+            f"{operator['time_ms']} ms",
+            class_name="px-4 py-1 text-xs text-right text-gray-600",
+        ),
+        class_name="border-b border-gray-100",
+    )
+
+
+def profile_view() -> rx.Component:
+    return rx.el.div(
+        rx.cond(
+            QueryState.selected_query_sql != "",
+            rx.el.div(
+                rx.el.div(
+                    rx.el.code(
+                        QueryState.selected_query_sql,
+                        class_name="flex-1 text-xs text-gray-700 truncate",
+                    ),
+                    rx.el.button(
+                        rx.icon("gauge", size=16),
+                        "Profile",
+                        on_click=QueryState.profile_query,
+                        disabled=QueryState.is_profiling,
+                        class_name="flex items-center gap-2 bg-black text-white px-4 py-2 rounded-md text-sm font-medium hover:bg-gray-800 disabled:opacity-50",
+                    ),
+                    class_name="flex items-center gap-4",
+                ),
+                rx.el.h3(
+                    "Phase timings",
+                    class_name="mt-6 mb-2 text-xs font-semibold text-gray-500 uppercase tracking-wider",
+                ),
+                rx.el.div(
+                    rx.foreach(QueryState.selected_phase_timings, render_phase),
+                    class_name="space-y-2",
+                ),
+                rx.cond(
+                    QueryState.profile_result_id == SessionState.active_result_id,
+                    rx.el.div(
+                        rx.el.h3(
+                            "EXPLAIN ANALYZE",
+                            class_name="mt-6 mb-2 text-xs font-semibold text-gray-500 uppercase tracking-wider",
+                        ),
+                        rx.el.pre(
+                            QueryState.profile_summary,
+                            class_name="text-xs text-gray-700 whitespace-pre-wrap",
+                        ),
+                        rx.cond(
+                            QueryState.profile_operators.length() > 0,
+                            rx.el.table(
+                                rx.el.thead(
+                                    rx.el.tr(
+                                        rx.el.th(
+                                            "Operator",
+                                            class_name="py-2 pl-4 text-left text-xs font-semibold text-gray-500",
+                                        ),
+                                        rx.el.th(
+                                            "Rows",
+                                            class_name="px-4 py-2 text-right text-xs font-semibold text-gray-500",
+                                        ),
+                                        rx.el.th(
+                                            "Time",
+                                            class_name="px-4 py-2 text-right text-xs font-semibold text-gray-500",
+                                        ),
+                                    ),
+                                    class_name="bg-gray-50 border-b border-gray-200",
+                                ),
+                                rx.el.tbody(
+                                    rx.foreach(
+                                        QueryState.profile_operators, render_operator
+                                    )
+                                ),
+                                class_name="mt-2 w-full border border-gray-200 rounded-lg",
+                            ),
+                        ),
+                    ),
+                ),
+                class_name="p-4",
+            ),
+            rx.el.div(
+                rx.icon("gauge", size=32, class_name="text-gray-400 mb-2"),
+                rx.el.p(
+                    "Run a query to profile it.", class_name="text-sm text-gray-500"
+                ),
+                class_name="flex flex-col items-center justify-center h-full text-center p-8",
+            ),
+        ),
+        class_name="w-full h-full overflow-auto bg-white",
+    )
\ No newline at end of file
@@ -1,43 +1,88 @@
 import reflex as rx
-from app.state import QueryState
+
+from app.state import (
+    OVERSCAN_ROWS,
+    RESULT_PAGE_SIZE,
+    RESULTS_SCROLL_ID,
+    ROW_HEIGHT_PX,
+    QueryState,
+    SessionState,
+)
+
+# The rows in view are rendered by /results_grid.js, which reads them from
+# the rows route; these only carry the classes and sizes it uses.
+_ROW_CLASS = "border-b border-gray-200 hover:bg-gray-50"
+_CELL_CLASS = "px-4 flex items-center text-sm text-gray-700 whitespace-nowrap truncate"
+
+_SCROLL_METRICS_SCRIPT = f"""(() => {{
+    const el = document.getElementById("{RESULTS_SCROLL_ID}");
+    return el ? [el.scrollTop, el.clientHeight, el.scrollHeight] : [0, 0, 0];
+}})()"""
 
 
 def results_table() -> rx.Component:
+    layout = QueryState.results_layout
     return rx.el.div(
         rx.cond(
-            QueryState.current_results["rows"].length() > 0,
+            SessionState.result_row_count > 0,
             rx.el.div(
-                rx.el.table(
-                    rx.el.thead(
-                        rx.el.tr(
-                            rx.foreach(
-                                QueryState.current_results["columns"],
-                                lambda col: rx.el.th(
-                                    col,
-                                    class_name="px-4 py-2 text-left text-xs font-semibold text-gray-500 uppercase tracking-wider bg-gray-50",
-                                ),
-                            ),
-                            class_name="border-b border-gray-200",
-                        )
-                    ),
-                    rx.el.tbody(
+                rx.el.div(
+                    rx.el.div(
                         rx.foreach(
-                            QueryState.current_results["rows"],
-                            lambda row: rx.el.tr(
-                                rx.foreach(
-                                    row,
-                                    lambda item: rx.el.td(
-                                        item.to_string(),
-                                        class_name="px-4 py-2 text-sm text-gray-700 whitespace-nowrap",
-                                    ),
-                                ),
-                                class_name="border-b border-gray-200 hover:bg-gray-50",
+                            layout["columns"],
+                            lambda col: rx.el.div(
+                                col,
+                                class_name="px-4 flex items-center text-left text-xs font-semibold text-gray-500 uppercase tracking-wider truncate",
                             ),
-                        )
+                        ),
+                        style={
+                            "display": "grid",
+                            "gridTemplateColumns": layout["grid_template"],
+                            "height": f"{ROW_HEIGHT_PX}px",
+                        },
+                        class_name="sticky top-0 z-10 bg-gray-50 border-b border-gray-200",
                     ),
-                    class_name="w-full",
+                    rx.el.div(
+                        style={
+                            "height": f"{SessionState.result_row_count * ROW_HEIGHT_PX}px"
+                        },
+                        class_name="relative",
+                        custom_attrs={"data-results-body": ""},
+                    ),
+                    role="grid",
+                    class_name="min-w-max",
+                ),
+                rx.cond(
+                    SessionState.result_has_more,
+                    rx.el.div(
+                        rx.cond(
+                            SessionState.result_pageable,
+                            "Scroll to load more rows...",
+                            "This result can no longer be paged. Run the query again to see more rows.",
+                        ),
+                        class_name="px-4 py-2 text-xs text-gray-500 text-center",
+                    ),
+                ),
+                id=RESULTS_SCROLL_ID,
+                custom_attrs={
+                    "data-rows-url": QueryState.result_rows_url,
+                    "data-row-count": SessionState.result_row_count,
+                    "data-row-height": ROW_HEIGHT_PX,
+                    "data-block-rows": RESULT_PAGE_SIZE,
+                    "data-overscan-rows": OVERSCAN_ROWS,
+                    "data-grid-template": layout["grid_template"],
+                    "data-row-class": _ROW_CLASS,
+                    "data-cell-class": _CELL_CLASS,
+                },
+                # The throttle only lets the first scroll event of each window
+                # through; scroll end reports where the scrolling stopped.
+                on_scroll=rx.call_script(
+                    _SCROLL_METRICS_SCRIPT, callback=QueryState.handle_results_scroll
+                ).throttle(100),
+                on_scroll_end=rx.call_script(
+                    _SCROLL_METRICS_SCRIPT, callback=QueryState.handle_results_scroll
                 ),
-                class_name="w-full overflow-auto border border-gray-200 rounded-lg",
+                class_name="w-full h-full overflow-auto border border-gray-200 rounded-lg",
             ),
             rx.el.div(
                 rx.icon("circle_play", size=32, class_name="text-gray-400 mb-2"),
@@ -47,5 +92,5 @@ def results_table() -> rx.Component:
                 class_name="flex flex-col items-center justify-center h-full text-center p-8 bg-gray-50 rounded-lg",
             ),
         ),
-        class_name="flex-1 w-full p-4 overflow-auto",
+        class_name="flex-1 w-full p-4 overflow-hidden",
     )
\ No newline at end of file
@@ -1,5 +1,6 @@
 import reflex as rx
-from app.state import DBState, Database, Table, QueryState, UIState
+
+from app.state import Column, DBState, QueryState, UIState
 
 
 def schema_item(
@@ -17,28 +18,65 @@ def schema_item(
     )
 
 
-def render_table(table: Table) -> rx.Component:
-    return schema_item(
-        "table",
-        table["name"],
-        QueryState.active_table == table["name"],
-        lambda: QueryState.select_table(table["name"]),
+def render_column(column: Column) -> rx.Component:
+    return rx.el.div(
+        rx.el.span(column["name"], class_name="truncate"),
+        rx.el.span(column["type"], class_name="text-gray-400 flex-shrink-0"),
+        class_name="flex items-center justify-between gap-2 px-2 py-0.5 text-xs text-gray-600",
     )
 
 
-def render_database(db: Database) -> rx.Component:
-    is_active_db = QueryState.active_db == db["name"]
+def render_table(table_name: str) -> rx.Component:
+    is_expanded = DBState.expanded_table == table_name
+    return rx.el.div(
+        rx.el.div(
+            rx.el.button(
+                rx.cond(
+                    is_expanded,
+                    rx.icon("chevron-down", size=14),
+                    rx.icon("chevron-right", size=14),
+                ),
+                on_click=lambda: DBState.toggle_table_columns(table_name),
+                class_name="p-0.5 text-gray-400 hover:text-gray-700",
+            ),
+            schema_item(
+                "table",
+                table_name,
+                QueryState.active_table == table_name,
+                lambda: QueryState.select_table(table_name),
+            ),
+            class_name="flex items-center",
+        ),
+        rx.cond(
+            is_expanded,
+            rx.el.div(
+                rx.foreach(DBState.expanded_columns, render_column),
+                class_name="pl-6 mt-0.5",
+            ),
+        ),
+    )
+
+
+def render_database(db_name: str) -> rx.Component:
+    is_active_db = QueryState.active_db == db_name
     return rx.el.div(
         schema_item(
             "database",
-            db["name"],
+            db_name,
             is_active_db,
-            lambda: QueryState.select_db(db["name"]),
+            lambda: QueryState.select_db(db_name),
         ),
         rx.cond(
             is_active_db,
             rx.el.div(
-                rx.foreach(QueryState.active_db_tables, render_table),
+                rx.foreach(DBState.sidebar_tables, render_table),
+                rx.cond(
+                    DBState.hidden_table_count > 0,
+                    rx.el.p(
+                        f"{DBState.hidden_table_count} more tables, refine the filter",
+                        class_name="px-2 py-1 text-xs text-gray-400",
+                    ),
+                ),
                 class_name="pl-4 mt-1 space-y-1",
             ),
         ),
@@ -68,8 +106,15 @@ def sidebar() -> rx.Component:
                 "Schemas",
                 class_name="px-2 text-xs font-semibold text-gray-500 uppercase tracking-wider",
             ),
+            rx.el.input(
+                placeholder="Filter tables...",
+                on_change=DBState.set_table_filter.debounce(250),
+                class_name="w-full mt-2 px-2 py-1 text-sm border border-gray-200 rounded-md focus:outline-none focus:ring-2 focus:ring-orange-500",
+            ),
             class_name="mb-4",
         ),
-        rx.el.div(rx.foreach(DBState.schema, render_database), class_name="space-y-2"),
+        rx.el.div(
+            rx.foreach(DBState.database_names, render_database), class_name="space-y-2"
+        ),
         class_name="w-64 h-full bg-white border-r border-gray-200 p-4 overflow-y-auto",
     )
\ No newline at end of file
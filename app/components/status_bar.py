@@ -1,5 +1,6 @@
 import reflex as rx
-from app.state import UIState, QueryState
+
+from app.state import QueryState, UIState
 
 
 def status_bar() -> rx.Component:
@@ -10,7 +11,20 @@ def status_bar() -> rx.Component:
             class_name="flex items-center gap-2",
         ),
         rx.el.div(
-            rx.el.span(f"Query: {QueryState.last_query_time.to_string()}s"),
+            rx.cond(
+                QueryState.queue_position > 0,
+                rx.el.span(
+                    f"Queued: #{QueryState.queue_position}",
+                    class_name="text-orange-600",
+                ),
+            ),
+            rx.el.span(
+                f"Cache: {QueryState.cache_hits} hits / {QueryState.cache_misses} misses"
+            ),
+            rx.el.span(
+                f"Query: {QueryState.last_query_time}",
+                rx.cond(QueryState.last_query_cached, " (cached)", ""),
+            ),
             class_name="flex items-center gap-4",
         ),
         class_name="h-10 px-4 flex items-center justify-between border-t border-gray-200 bg-gray-50 text-xs text-gray-600",
@@ -0,0 +1,117 @@
+import reflex as rx
+
+from app.state import ColumnStats, DBState, HistogramBin
+
+
+def render_bin(bin: HistogramBin) -> rx.Component:
+    return rx.el.div(
+        class_name="flex-1 bg-orange-400 rounded-t-sm min-h-px",
+        style={"height": f"{bin['percent']}%"},
+        title=f"{bin['label']}: {bin['count']}",
+    )
+
+
+def render_column_stats(column: ColumnStats) -> rx.Component:
+    return rx.el.tr(
+        rx.el.td(
+            rx.el.div(column["name"], class_name="font-medium text-gray-800"),
+            rx.el.div(column["type"], class_name="text-gray-400"),
+            class_name="px-4 py-2",
+        ),
+        rx.el.td(f"{column['null_percent']}%", class_name="px-4 py-2 text-right"),
+        rx.el.td(column["approx_unique"], class_name="px-4 py-2 text-right"),
+        rx.el.td(column["min"], class_name="px-4 py-2 max-w-40 truncate"),
+        rx.el.td(column["max"], class_name="px-4 py-2 max-w-40 truncate"),
+        rx.el.td(
+            rx.el.div(
+                rx.foreach(column["histogram"], render_bin),
+                class_name="flex items-end gap-px h-8 w-40",
+            ),
+            class_name="px-4 py-2",
+        ),
+        class_name="border-b border-gray-100 text-xs text-gray-600",
+    )
+
+
+def _header(name: str, align: str = "text-left") -> rx.Component:
+    return rx.el.th(
+        name, class_name=f"px-4 py-2 {align} text-xs font-semibold text-gray-500"
+    )
+
+
+def table_stats_view() -> rx.Component:
+    return rx.el.div(
+        rx.cond(
+            DBState.stats_table != "",
+            rx.el.div(
+                rx.el.div(
+                    rx.el.h2(
+                        DBState.stats_table,
+                        class_name="text-sm font-semibold text-gray-800",
+                    ),
+                    rx.cond(
+                        DBState.is_loading_table_stats,
+                        rx.el.span(
+                            "Computing statistics...",
+                            class_name="text-xs text-gray-500",
+                        ),
+                        rx.cond(
+                            DBState.table_stats["error"] == "",
+                            rx.el.span(
+                                rx.cond(
+                                    DBState.table_stats["sample_rows"] > 0,
+                                    f"{DBState.table_stats['row_count']} rows, statistics from a sample of {DBState.table_stats['sample_rows']}",
+                                    f"{DBState.table_stats['row_count']} rows",
+                                ),
+                                class_name="text-xs text-gray-500",
+                            ),
+                        ),
+                    ),
+                    class_name="flex items-center justify-between mb-4",
+                ),
+                rx.cond(
+                    DBState.table_stats["columns"].length() > 0,
+                    rx.el.table(
+                        rx.el.thead(
+                            rx.el.tr(
+                                _header("Column"),
+                                _header("Nulls", "text-right"),
+                                _header("Distinct (approx.)", "text-right"),
+                                _header("Min"),
+                                _header("Max"),
+                                _header("Distribution"),
+                            ),
+                            class_name="bg-gray-50 border-b border-gray-200",
+                        ),
+                        rx.el.tbody(
+                            rx.foreach(
+                                DBState.table_stats["columns"], render_column_stats
+                            )
+                        ),
+                        class_name="w-full border border-gray-200 rounded-lg",
+                    ),
+                    rx.cond(
+                        ~DBState.is_loading_table_stats,
+                        rx.el.p(
+                            rx.cond(
+                                DBState.table_stats["error"] != "",
+                                DBState.table_stats["error"],
+                                "This table has no columns.",
+                            ),
+                            class_name="text-sm text-gray-500",
+                        ),
+                    ),
+                ),
+                class_name="p-4",
+            ),
+            rx.el.div(
+                rx.icon("chart-column", size=32, class_name="text-gray-400 mb-2"),
+                rx.el.p(
+                    "Select a table to see its column statistics.",
+                    class_name="text-sm text-gray-500",
+                ),
+                class_name="flex flex-col items-center justify-center h-full text-center p-8",
+            ),
+        ),
+        class_name="w-full h-full overflow-auto bg-white",
+    )
\ No newline at end of file
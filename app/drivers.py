@@ -0,0 +1,743 @@
+"""Database drivers behind a common interface.
+
+Each driver wraps one backend and hands out DB-API style cursors that can be
+interrupted from another thread. Rows are streamed from the server where the
+backend supports it, so large results are never fully buffered client-side.
+
+A driver also opens one session cursor, which keeps a single connection for
+the statements a user runs, so temp tables, variables and transactions carry
+over between them.
+"""
+
+import contextlib
+import re
+import sqlite3
+import threading
+import uuid
+from typing import Callable, ClassVar
+
+from app.startup import lazy_import
+
+duckdb = lazy_import("duckdb")
+
+DRIVER_POOL_SIZE = 4
+DRIVER_POOL_TIMEOUT_SECONDS = 30
+POSTGRES_ITERSIZE = 2000
+FETCH_BATCH_SIZE = 2000
+# PostgreSQL can only DECLARE a cursor for a query, so statements such as
+# SHOW or EXPLAIN run on a plain, client-side cursor.
+SERVER_CURSOR_KEYWORDS = ("select", "with", "values", "table")
+_LEADING_COMMENTS_PATTERN = re.compile(r"(?:\s+|--[^\n]*|/\*.*?\*/)*", re.DOTALL)
+
+# (database, schema, table, column, type) rows used to build DBState.schema.
+# The database is empty for the connection's default database.
+ColumnRow = tuple[str, str, str, str, str]
+# (database, table, referenced table) rows for foreign key constraints.
+ForeignKeyRow = tuple[str, str, str]
+
+
+class QueryCancelled(Exception):
+    """Raised when a running query is interrupted by the user."""
+
+
+class ConnectionClosed(Exception):
+    """Raised when a session's connection was closed and must be reopened."""
+
+
+def _leading_words(sql: str, count: int) -> list[str]:
+    """The first words of a statement, lowercased and past any comments."""
+    body = sql[_LEADING_COMMENTS_PATTERN.match(sql).end() :]
+    return re.findall(r"[a-z_]+", body[:64].lower())[:count]
+
+
+def _declares_cursor(sql: str) -> bool:
+    words = _leading_words(sql, 1)
+    return bool(words) and words[0] in SERVER_CURSOR_KEYWORDS
+
+
+def _in_transaction_after(sql: str, in_transaction: bool) -> bool:
+    """Whether an explicit transaction is open once a statement has run."""
+    words = _leading_words(sql, 3)
+    if not words:
+        return in_transaction
+    if words[0] in ("begin", "start"):
+        return True
+    if words[0] in ("commit", "end", "abort") or (
+        words[0] == "rollback" and "to" not in words[1:]
+    ):
+        return False
+    return in_transaction
+
+
+def arrow_connection(cursor) -> "duckdb.DuckDBPyConnection | None":
+    """Get the DuckDB connection behind a cursor, which can return Arrow, if any."""
+    if isinstance(cursor, _DuckDBSessionCursor):
+        return cursor.con
+    if isinstance(cursor, duckdb.DuckDBPyConnection):
+        return cursor
+    return None
+
+
+class Driver:
+    """A connection to one database backend.
+
+    Drivers that point at the same catalog share a catalog_key, so cached
+    schemas can be reused across sessions.
+    """
+
+    dialect: ClassVar[str] = ""
+    # Whether complete results may be cached. Writes are only tracked when
+    # they go through this process, so databases other clients can write
+    # to opt out.
+    caches_results: ClassVar[bool] = True
+
+    def __init__(self, label: str, catalog_key: str):
+        self.label = label
+        self.catalog_key = catalog_key
+
+    def cursor(self):
+        """Get a cursor with execute, description, fetchmany, interrupt and close."""
+        raise NotImplementedError
+
+    def session_cursor(self):
+        """Open the cursor a session runs its own statements on.
+
+        It keeps one connection, so temp tables, variables, USE and explicit
+        transactions carry over between statements. Executing a statement
+        or closing the cursor ends the previous result; the connection
+        itself is closed with the driver.
+        """
+        raise NotImplementedError
+
+    def load_columns(self) -> list[ColumnRow]:
+        """Get every user-visible column in the catalog."""
+        raise NotImplementedError
+
+    def load_foreign_keys(self) -> list[ForeignKeyRow]:
+        """Get every foreign key relationship declared in the catalog."""
+        return []
+
+    def load_table_columns(self, table_name: str) -> list[ColumnRow]:
+        """Get the columns of one table in the default schema, if supported."""
+        return []
+
+    def _fetch_all(self, sql: str) -> list:
+        cursor = self.cursor()
+        try:
+            cursor.execute(sql)
+            rows = []
+            while batch := cursor.fetchmany(FETCH_BATCH_SIZE):
+                rows.extend(batch)
+            return rows
+        finally:
+            cursor.close()
+
+    def catalog_version(self) -> object | None:
+        """Get a cheap fingerprint that changes with the catalog, or None if unknown."""
+        return None
+
+    def close(self):
+        """Release the driver's connections."""
+        raise NotImplementedError
+
+
+class _DuckDBSessionCursor:
+    """A driver's own DuckDB connection, used as its session cursor.
+
+    Everything is forwarded to the connection except close, which leaves it
+    open; DuckDB ends a pending result when the next statement runs.
+    """
+
+    def __init__(self, con: "duckdb.DuckDBPyConnection"):
+        self.con = con
+
+    def close(self):
+        pass
+
+    def __getattr__(self, attr: str):
+        return getattr(self.con, attr)
+
+
+class DuckDBDriver(Driver):
+    """A DuckDB connection. DuckDB cursors already satisfy the cursor interface.
+
+    Sessions run their statements on the driver's connection; every other
+    cursor is a separate connection to the same database.
+    """
+
+    dialect = "duckdb"
+
+    def __init__(self, con: "duckdb.DuckDBPyConnection", label: str, catalog_key: str):
+        super().__init__(label, catalog_key)
+        self.con = con
+
+    @classmethod
+    def connect(cls, form: dict[str, str]) -> "DuckDBDriver":
+        database = form.get("database") or ":memory:"
+        con = duckdb.connect(database=database, read_only=False)
+        if database == ":memory:":
+            catalog_key = f"duckdb:memory:{uuid.uuid4().hex}"
+        else:
+            catalog_key = f"duckdb:{database}"
+        return cls(con, f"DuckDB file: {database}", catalog_key)
+
+    def cursor(self):
+        return self.con.cursor()
+
+    def session_cursor(self):
+        return _DuckDBSessionCursor(self.con)
+
+    def load_columns(self) -> list[ColumnRow]:
+        return self._fetch_all(
+            "SELECT CASE WHEN database_name = current_database() THEN '' "
+            "ELSE database_name END, "
+            "schema_name, table_name, column_name, data_type "
+            "FROM duckdb_columns() WHERE NOT internal "
+            "ORDER BY database_name, schema_name, table_name, column_index"
+        )
+
+    def load_table_columns(self, table_name: str) -> list[ColumnRow]:
+        cursor = self.cursor()
+        try:
+            return cursor.execute(
+                "SELECT '', schema_name, table_name, column_name, data_type "
+                "FROM duckdb_columns() WHERE database_name = current_database() "
+                "AND schema_name = current_schema() AND table_name = ? "
+                "ORDER BY column_index",
+                [table_name],
+            ).fetchall()
+        finally:
+            cursor.close()
+
+    def load_foreign_keys(self) -> list[ForeignKeyRow]:
+        return self._fetch_all(
+            "SELECT DISTINCT CASE WHEN database_name = current_database() "
+            "THEN schema_name ELSE database_name || '.' || schema_name END, "
+            "table_name, referenced_table FROM duckdb_constraints() "
+            "WHERE constraint_type = 'FOREIGN KEY'"
+        )
+
+    def catalog_version(self) -> object | None:
+        cursor = self.cursor()
+        try:
+            return cursor.execute(
+                "SELECT count(*), sum(hash(database_name, schema_name, table_name, "
+                "column_name, data_type)) FROM duckdb_columns() WHERE NOT internal"
+            ).fetchone()
+        finally:
+            cursor.close()
+
+    def close(self):
+        self.con.close()
+
+
+class ClosedDriver(Driver):
+    """Stands in for a session's driver after its connection was closed.
+
+    Every operation raises ConnectionClosed until the session connects again.
+    """
+
+    def __init__(self, label: str, reason: str):
+        super().__init__(f"{label} (disconnected)", f"closed:{uuid.uuid4().hex}")
+        self.reason = reason
+
+    def _closed(self):
+        raise ConnectionClosed(self.reason)
+
+    def cursor(self):
+        self._closed()
+
+    def session_cursor(self):
+        self._closed()
+
+    def load_columns(self) -> list[ColumnRow]:
+        self._closed()
+
+    def close(self):
+        pass
+
+
+class _BlockingPool:
+    """Hands out a pool's connections, waiting for a free one when all are in use.
+
+    psycopg2 and mysql-connector pools raise as soon as they are exhausted;
+    this waits up to DRIVER_POOL_TIMEOUT_SECONDS instead.
+    """
+
+    def __init__(
+        self,
+        label: str,
+        get: Callable[[], object],
+        put: Callable[[object], None],
+        close: Callable[[], None],
+    ):
+        self._label = label
+        self._get = get
+        self._put = put
+        self.close = close
+        self._slots = threading.BoundedSemaphore(DRIVER_POOL_SIZE)
+
+    def get(self):
+        if not self._slots.acquire(timeout=DRIVER_POOL_TIMEOUT_SECONDS):
+            raise TimeoutError(
+                f"All {DRIVER_POOL_SIZE} pooled connections to {self._label} are busy."
+            )
+        try:
+            return self._get()
+        except Exception:
+            self._slots.release()
+            raise
+
+    def put(self, conn):
+        try:
+            self._put(conn)
+        finally:
+            self._slots.release()
+
+
+class _SharedPools:
+    """Connection pools shared by every driver with the same parameters."""
+
+    _pools: ClassVar[dict[tuple, list]] = {}
+    _lock: ClassVar[threading.Lock] = threading.Lock()
+
+    @classmethod
+    def acquire(cls, key: tuple, factory: Callable[[], object]):
+        """Get the pool for key, creating it on first use."""
+        with cls._lock:
+            entry = cls._pools.get(key)
+            if entry is None:
+                entry = cls._pools[key] = [factory(), 0]
+            entry[1] += 1
+            return entry[0]
+
+    @classmethod
+    def release(cls, key: tuple, close: Callable[[object], None]):
+        """Drop a reference to the pool for key, closing it when unused."""
+        with cls._lock:
+            entry = cls._pools.get(key)
+            if entry is None:
+                return
+            entry[1] -= 1
+            if entry[1] > 0:
+                return
+            del cls._pools[key]
+        close(entry[0])
+
+
+class _PostgresCursor:
+    """A psycopg2 cursor that streams row-returning statements server-side.
+
+    A pooled cursor commits each write and returns its connection to the
+    pool when closed. A session cursor keeps its connection and commits
+    after each statement, unless the session has opened a transaction with
+    BEGIN, which then spans statements until COMMIT or ROLLBACK.
+
+    Server-side cursors are declared WITH HOLD and committed after their
+    first page, so a result kept open for paging does not leave the
+    connection idle in a transaction, holding its locks and snapshot.
+    PostgreSQL computes the rest of the result at that commit.
+    """
+
+    def __init__(self, conn, release: Callable[[object], None] | None = None):
+        self._conn = conn
+        self._release = release
+        self._cur = None
+        self._pending: list = []
+        self._in_transaction = False
+
+    @property
+    def description(self):
+        return self._cur.description if self._cur is not None else None
+
+    def execute(self, sql: str):
+        from psycopg2.extensions import QueryCanceledError
+
+        self._end_result()
+        if self._release is None:
+            self._in_transaction = _in_transaction_after(sql, self._in_transaction)
+        if _declares_cursor(sql):
+            self._cur = self._conn.cursor(
+                name=f"orbit_{uuid.uuid4().hex}", withhold=True
+            )
+            self._cur.itersize = POSTGRES_ITERSIZE
+        else:
+            self._cur = self._conn.cursor()
+        try:
+            self._cur.execute(sql)
+            if self._cur.name:
+                # Named cursors only describe their result after the first fetch.
+                self._pending = self._cur.fetchmany(POSTGRES_ITERSIZE)
+            if not self._in_transaction:
+                self._conn.commit()
+        except Exception as e:
+            self._cur = None
+            if self._release is None and not self._in_transaction:
+                self._conn.rollback()
+            if isinstance(e, QueryCanceledError):
+                raise QueryCancelled(str(e)) from e
+            raise
+
+    def fetchmany(self, size: int) -> list:
+        if self.description is None:
+            return []
+        rows = self._pending[:size]
+        self._pending = self._pending[size:]
+        if len(rows) < size:
+            rows.extend(self._cur.fetchmany(size - len(rows)))
+        return rows
+
+    def interrupt(self):
+        self._conn.cancel()
+
+    def _end_result(self):
+        """Close the current result; a session commits it outside a transaction.
+
+        Closing a held cursor starts a transaction of its own, which the
+        commit ends.
+        """
+        cur, self._cur, self._pending = self._cur, None, []
+        if cur is None:
+            return
+        cur.close()
+        if cur.name and self._release is None and not self._in_transaction:
+            self._conn.commit()
+
+    def close(self):
+        if self._release is None:
+            self._end_result()
+            return
+        try:
+            if self._cur is not None:
+                self._cur.close()
+            self._conn.rollback()
+        finally:
+            self._release(self._conn)
+
+
+class PostgresDriver(Driver):
+    """A pooled PostgreSQL connection using psycopg2."""
+
+    dialect = "postgresql"
+    caches_results = False
+
+    def __init__(self, params: dict, label: str):
+        # What a catalog shows depends on the user's privileges.
+        super().__init__(label, f"{label} as {params['user'] or ''}")
+        self._key = ("postgresql", *sorted(params.items()))
+        self._params = params
+        self._pool = _SharedPools.acquire(self._key, self._create_pool)
+        self._session_conn = None
+
+    @classmethod
+    def connect(cls, form: dict[str, str]) -> "PostgresDriver":
+        params = {
+            "host": form.get("host") or "localhost",
+            "port": int(form.get("port") or 5432),
+            "user": form.get("user") or None,
+            "password": form.get("password") or None,
+            "dbname": form.get("database") or "postgres",
+        }
+        driver = cls(
+            params, f"PostgreSQL {params['host']}:{params['port']}/{params['dbname']}"
+        )
+        driver.cursor().close()
+        return driver
+
+    def _create_pool(self):
+        from psycopg2.pool import ThreadedConnectionPool
+
+        pool = ThreadedConnectionPool(1, DRIVER_POOL_SIZE, **self._params)
+        return _BlockingPool(self.label, pool.getconn, pool.putconn, pool.closeall)
+
+    def cursor(self):
+        return _PostgresCursor(self._pool.get(), self._pool.put)
+
+    def session_cursor(self):
+        import psycopg2
+
+        self._session_conn = psycopg2.connect(**self._params)
+        return _PostgresCursor(self._session_conn)
+
+    def load_columns(self) -> list[ColumnRow]:
+        return self._fetch_all(
+            "SELECT '', table_schema, table_name, column_name, data_type "
+            "FROM information_schema.columns "
+            "WHERE table_schema NOT IN ('pg_catalog', 'information_schema') "
+            "ORDER BY table_schema, table_name, ordinal_position"
+        )
+
+    def load_foreign_keys(self) -> list[ForeignKeyRow]:
+        return self._fetch_all(
+            "SELECT DISTINCT tc.table_schema, tc.table_name, ccu.table_name "
+            "FROM information_schema.table_constraints tc "
+            "JOIN information_schema.constraint_column_usage ccu "
+            "ON tc.constraint_name = ccu.constraint_name "
+            "AND tc.constraint_schema = ccu.constraint_schema "
+            "WHERE tc.constraint_type = 'FOREIGN KEY'"
+        )
+
+    def close(self):
+        if self._session_conn is not None:
+            self._session_conn.close()
+        _SharedPools.release(self._key, lambda pool: pool.close())
+
+
+class _MySQLCursor:
+    """An unbuffered mysql-connector cursor, so rows stream from the server.
+
+    A pooled cursor commits each write and returns its connection to the
+    pool when closed. A session cursor keeps its autocommit connection, on
+    which BEGIN and COMMIT work across statements.
+    """
+
+    def __init__(
+        self,
+        driver: "MySQLDriver",
+        conn,
+        release: Callable[[object], None] | None = None,
+    ):
+        self._driver = driver
+        self._conn = conn
+        self._release = release
+        self._cur = None
+        self._done = True
+
+    @property
+    def description(self):
+        return self._cur.description if self._cur is not None else None
+
+    def execute(self, sql: str):
+        from mysql.connector import errorcode, errors
+
+        self._end_result()
+        self._cur = self._conn.cursor(buffered=False)
+        self._done = False
+        try:
+            self._cur.execute(sql)
+        except errors.DatabaseError as e:
+            self._done = True
+            if e.errno == errorcode.ER_QUERY_INTERRUPTED:
+                raise QueryCancelled(str(e)) from e
+            raise
+        if self._cur.description is None:
+            if self._release is not None:
+                self._conn.commit()
+            self._done = True
+
+    def fetchmany(self, size: int) -> list:
+        if self._done:
+            return []
+        rows = self._cur.fetchmany(size)
+        if len(rows) < size:
+            self._done = True
+        return rows
+
+    def interrupt(self):
+        self._driver.kill_query(self._conn.connection_id)
+
+    def _end_result(self):
+        cur, self._cur = self._cur, None
+        if cur is None:
+            return
+        if not self._done:
+            self.interrupt()
+            with contextlib.suppress(Exception):
+                self._conn.consume_results()
+            self._done = True
+        cur.close()
+
+    def close(self):
+        if self._release is None:
+            self._end_result()
+            return
+        try:
+            self._end_result()
+        finally:
+            self._release(self._conn)
+
+
+class MySQLDriver(Driver):
+    """A pooled MySQL connection using mysql-connector-python."""
+
+    dialect = "mysql"
+    caches_results = False
+
+    def __init__(self, params: dict, label: str):
+        # What a catalog shows depends on the user's privileges.
+        super().__init__(label, f"{label} as {params['user'] or ''}")
+        self._key = ("mysql", *sorted(params.items()))
+        self._params = params
+        self._pool = _SharedPools.acquire(self._key, self._create_pool)
+        self._session_conn = None
+
+    @classmethod
+    def connect(cls, form: dict[str, str]) -> "MySQLDriver":
+        params = {
+            "host": form.get("host") or "localhost",
+            "port": int(form.get("port") or 3306),
+            "user": form.get("user") or "root",
+            "password": form.get("password") or "",
+            "database": form.get("database") or None,
+        }
+        driver = cls(
+            params, f"MySQL {params['host']}:{params['port']}/{params['database']}"
+        )
+        driver.cursor().close()
+        return driver
+
+    def _create_pool(self):
+        from mysql.connector.pooling import MySQLConnectionPool
+
+        pool = MySQLConnectionPool(
+            pool_name=f"orbit_{uuid.uuid4().hex[:8]}",
+            pool_size=DRIVER_POOL_SIZE,
+            **self._params,
+        )
+        # Closing a pooled mysql-connector connection returns it to the pool,
+        # and the pool's connections are closed when it is collected.
+        return _BlockingPool(
+            self.label, pool.get_connection, lambda conn: conn.close(), lambda: None
+        )
+
+    def cursor(self):
+        return _MySQLCursor(self, self._pool.get(), self._pool.put)
+
+    def session_cursor(self):
+        import mysql.connector
+
+        self._session_conn = mysql.connector.connect(**self._params, autocommit=True)
+        return _MySQLCursor(self, self._session_conn)
+
+    def kill_query(self, connection_id: int):
+        """Stop the statement running on a connection from a separate one."""
+        import mysql.connector
+
+        con = mysql.connector.connect(**self._params)
+        try:
+            con.cmd_query(f"KILL QUERY {int(connection_id)}")
+        finally:
+            con.close()
+
+    def load_columns(self) -> list[ColumnRow]:
+        return self._fetch_all(
+            "SELECT '', table_schema, table_name, column_name, column_type "
+            "FROM information_schema.columns "
+            "WHERE table_schema NOT IN "
+            "('mysql', 'information_schema', 'performance_schema', 'sys') "
+            "ORDER BY table_schema, table_name, ordinal_position"
+        )
+
+    def load_foreign_keys(self) -> list[ForeignKeyRow]:
+        return self._fetch_all(
+            "SELECT DISTINCT table_schema, table_name, referenced_table_name "
+            "FROM information_schema.key_column_usage "
+            "WHERE referenced_table_name IS NOT NULL"
+        )
+
+    def close(self):
+        if self._session_conn is not None:
+            self._session_conn.close()
+        _SharedPools.release(self._key, lambda pool: pool.close())
+
+
+class _SQLiteCursor:
+    """A sqlite3 cursor; sqlite steps through rows lazily as they are fetched.
+
+    The connection is in autocommit mode, so writes are committed as they
+    run unless a statement has opened a transaction with BEGIN.
+    """
+
+    def __init__(self, conn: sqlite3.Connection):
+        self._conn = conn
+        self._cur = None
+
+    @property
+    def description(self):
+        return self._cur.description if self._cur is not None else None
+
+    def execute(self, sql: str):
+        self.close()
+        self._cur = self._conn.cursor()
+        try:
+            self._cur.execute(sql)
+        except sqlite3.OperationalError as e:
+            if str(e) == "interrupted":
+                raise QueryCancelled(str(e)) from e
+            raise
+
+    def fetchmany(self, size: int) -> list:
+        return self._cur.fetchmany(size) if self._cur is not None else []
+
+    def interrupt(self):
+        self._conn.interrupt()
+
+    def close(self):
+        if self._cur is not None:
+            self._cur.close()
+            self._cur = None
+
+
+class SQLiteDriver(Driver):
+    """A SQLite database file using the standard library driver."""
+
+    dialect = "sqlite"
+    # Other processes may write to the same file.
+    caches_results = False
+
+    def __init__(self, conn: sqlite3.Connection, label: str, catalog_key: str):
+        super().__init__(label, catalog_key)
+        self._conn = conn
+
+    @classmethod
+    def connect(cls, form: dict[str, str]) -> "SQLiteDriver":
+        database = form.get("database") or ":memory:"
+        conn = sqlite3.connect(database, check_same_thread=False, isolation_level=None)
+        if database == ":memory:":
+            catalog_key = f"sqlite:memory:{uuid.uuid4().hex}"
+        else:
+            catalog_key = f"sqlite:{database}"
+        return cls(conn, f"SQLite file: {database}", catalog_key)
+
+    def cursor(self):
+        return _SQLiteCursor(self._conn)
+
+    def session_cursor(self):
+        # Every cursor shares the one connection, and with it its state.
+        return _SQLiteCursor(self._conn)
+
+    def load_columns(self) -> list[ColumnRow]:
+        return self._conn.execute(
+            "SELECT '', 'main', m.name, p.name, p.type FROM sqlite_master m "
+            "JOIN pragma_table_info(m.name) p "
+            "WHERE m.type IN ('table', 'view') AND m.name NOT LIKE 'sqlite_%' "
+            "ORDER BY m.name, p.cid"
+        ).fetchall()
+
+    def load_foreign_keys(self) -> list[ForeignKeyRow]:
+        return self._conn.execute(
+            "SELECT DISTINCT 'main', m.name, f.\"table\" FROM sqlite_master m "
+            "JOIN pragma_foreign_key_list(m.name) f WHERE m.type = 'table'"
+        ).fetchall()
+
+    def catalog_version(self) -> object | None:
+        return self._conn.execute("PRAGMA schema_version").fetchone()
+
+    def close(self):
+        self._conn.close()
+
+
+DRIVERS: dict[str, Callable[[dict[str, str]], Driver]] = {
+    "duckdb": DuckDBDriver.connect,
+    "postgresql": PostgresDriver.connect,
+    "mysql": MySQLDriver.connect,
+    "sqlite": SQLiteDriver.connect,
+}
+
+
+def connect(form: dict[str, str]) -> Driver:
+    """Open a driver for the connection form's database type."""
+    db_type = form.get("db_type", "duckdb")
+    if db_type not in DRIVERS:
+        raise ValueError(f"Unsupported database type: {db_type}")
+    return DRIVERS[db_type](form)
\ No newline at end of file
@@ -0,0 +1,145 @@
+"""Lazy imports and an opt-in startup profiler.
+
+Heavy libraries are bound with lazy_import, so a worker only pays for
+importing them once a request needs them. Setting ORBIT_PROFILE_STARTUP=1
+times every module imported while the app loads and prints the slowest
+ones, with the time spent in each module's own body (its initialization)
+apart from the modules it imports.
+"""
+
+import importlib
+import importlib.abc
+import os
+import sys
+import threading
+import time
+import types
+from typing import ClassVar
+
+PROFILE_STARTUP = os.environ.get("ORBIT_PROFILE_STARTUP", "") not in ("", "0")
+STARTUP_PROFILE_TOP = 30
+
+
+class _LazyModule(types.ModuleType):
+    """A module that is imported the first time one of its attributes is used."""
+
+    def __getattr__(self, attr: str):
+        # Only keep a reference to the real module. Copying its attributes
+        # would keep extension objects alive past interpreter teardown.
+        module = self.__dict__.get("_module")
+        if module is None:
+            module = self.__dict__["_module"] = importlib.import_module(self.__name__)
+        return getattr(module, attr)
+
+
+def lazy_import(name: str) -> types.ModuleType:
+    """Bind a module without importing it until it is first used.
+
+    Annotations that name the module's types must be strings, or they
+    import it when the function or class is defined.
+    """
+    if name in sys.modules:
+        return sys.modules[name]
+    return _LazyModule(name)
+
+
+class _ImportTiming:
+    def __init__(self, name: str, own: float, total: float):
+        self.name = name
+        self.own = own
+        self.total = total
+
+
+class _TimedLoader:
+    """Wraps a module's loader to time the execution of its body."""
+
+    def __init__(self, loader, name: str):
+        self._loader = loader
+        self._name = name
+
+    def create_module(self, spec):
+        return self._loader.create_module(spec)
+
+    def exec_module(self, module):
+        stack = _ImportProfiler.stack()
+        stack.append(0.0)
+        started = time.perf_counter()
+        try:
+            self._loader.exec_module(module)
+        finally:
+            total = time.perf_counter() - started
+            children = stack.pop()
+            if stack:
+                stack[-1] += total
+            _ImportProfiler.record(_ImportTiming(self._name, total - children, total))
+            # Leave the module with its real loader once it is loaded.
+            module.__loader__ = self._loader
+            if module.__spec__ is not None:
+                module.__spec__.loader = self._loader
+
+    def __getattr__(self, attr: str):
+        return getattr(self._loader, attr)
+
+
+class _ImportProfiler(importlib.abc.MetaPathFinder):
+    """Times module imports by wrapping the loaders the other finders return."""
+
+    _timings: ClassVar[list[_ImportTiming]] = []
+    _local: ClassVar[threading.local] = threading.local()
+    _lock: ClassVar[threading.Lock] = threading.Lock()
+    _started: ClassVar[float] = 0.0
+
+    @classmethod
+    def stack(cls) -> list[float]:
+        if not hasattr(cls._local, "stack"):
+            cls._local.stack = []
+        return cls._local.stack
+
+    @classmethod
+    def record(cls, timing: _ImportTiming):
+        with cls._lock:
+            cls._timings.append(timing)
+
+    def find_spec(self, fullname, path, target=None):
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, "find_spec"):
+                continue
+            spec = finder.find_spec(fullname, path, target)
+            if spec is None:
+                continue
+            if hasattr(spec.loader, "exec_module"):
+                spec.loader = _TimedLoader(spec.loader, fullname)
+            return spec
+        return None
+
+
+def start_profiling():
+    """Start timing imports, if ORBIT_PROFILE_STARTUP is set."""
+    if not PROFILE_STARTUP or any(
+        isinstance(finder, _ImportProfiler) for finder in sys.meta_path
+    ):
+        return
+    _ImportProfiler._started = time.perf_counter()
+    sys.meta_path.insert(0, _ImportProfiler())
+
+
+def report():
+    """Print the slowest imports since profiling started and stop profiling."""
+    profilers = [f for f in sys.meta_path if isinstance(f, _ImportProfiler)]
+    if not profilers:
+        return
+    for profiler in profilers:
+        sys.meta_path.remove(profiler)
+    elapsed = time.perf_counter() - _ImportProfiler._started
+    with _ImportProfiler._lock:
+        timings = sorted(_ImportProfiler._timings, key=lambda t: t.own, reverse=True)
+    print(
+        f"Startup took {elapsed * 1000:.1f} ms, importing {len(timings)} modules.",
+        file=sys.stderr,
+    )
+    print(f"{'own ms':>10} {'total ms':>10}  module", file=sys.stderr)
+    for timing in timings[:STARTUP_PROFILE_TOP]:
+        print(
+            f"{timing.own * 1000:>10.1f} {timing.total * 1000:>10.1f}  {timing.name}",
+            file=sys.stderr,
+        )
\ No newline at end of file
@@ -1,13 +1,117 @@
-import reflex as rx
-from typing import TypedDict, ClassVar, Literal
-import duckdb
-import pandas as pd
-import logging
 import asyncio
-import re
-import uuid
+import bisect
+import contextlib
 import datetime
+import functools
+import hashlib
 import json
+import logging
+import os
+import re
+import tempfile
+import threading
+import time
+import urllib.parse
+import urllib.request
+import uuid
+import zipfile
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, ClassVar, Literal, TypedDict
+
+import reflex as rx
+
+from app import drivers
+from app.startup import lazy_import
+
+logger = logging.getLogger(__name__)
+duckdb = lazy_import("duckdb")
+pa = lazy_import("pyarrow")
+pc = lazy_import("pyarrow.compute")
+pq = lazy_import("pyarrow.parquet")
+
+RESULT_PAGE_SIZE = 200
+MAX_OPEN_RESULT_CURSORS = 32
+MAX_STREAMABLE_RESULTS = 256
+RESULT_STREAM_PATH = "/api/results"
+SESSION_EXPORT_PATH = "/api/sessions"
+MAX_PENDING_SESSION_EXPORTS = 16
+SESSION_FORMAT_VERSION = "2.0"
+SESSION_MANIFEST_NAME = "manifest.json"
+ROW_HEIGHT_PX = 36
+OVERSCAN_ROWS = 20
+COLUMN_WIDTH_SAMPLE_ROWS = 50
+DICT_ENCODING_MAX_VALUES = 256
+RESULTS_SCROLL_ID = "results-scroll"
+MAX_CONCURRENT_QUERIES = 3
+PREVIEW_QUERY_SLOTS = 1
+# QUERY_EXECUTOR only runs work holding a scheduler slot, so it has a
+# worker per slot; page fetches, schema loads and connects run on
+# METADATA_EXECUTOR and never wait behind long queries.
+QUERY_WORKERS = MAX_CONCURRENT_QUERIES + PREVIEW_QUERY_SLOTS
+METADATA_WORKERS = 4
+MAX_QUEUED_QUERIES_PER_SESSION = 16
+QUEUE_STATUS_INTERVAL_SECONDS = 0.5
+MAX_POOLED_SESSIONS = 64
+MAX_TRACKED_EVICTIONS = 1024
+SESSION_IDLE_TIMEOUT_SECONDS = 30 * 60
+MAX_CACHED_SCHEMAS = 16
+SIDEBAR_TABLE_LIMIT = 200
+MAX_CACHED_ER_DIAGRAMS = 64
+MAX_CACHED_TRANSLATIONS = 1024
+MAX_PREPARED_STATEMENTS = 32
+MAX_CACHED_TABLE_STATS = 64
+TABLE_STATS_SAMPLE_THRESHOLD_ROWS = 1_000_000
+TABLE_STATS_SAMPLE_ROWS = 100_000
+TABLE_STATS_SAMPLE_SEED = 42
+TABLE_STATS_HISTOGRAM_BINS = 10
+ER_DIAGRAM_MAX_TABLES = 150
+RESULT_CACHE_MAX_BYTES = 64 * 1024 * 1024
+WORKSPACE_CATALOG_KEY = "duckdb:workspace"
+WORKSPACE_DATABASE = os.environ.get("ORBIT_WORKSPACE_DATABASE", ":memory:")
+SAMPLE_DATA_SQL = """
+CREATE TABLE users (id BIGINT, name VARCHAR, email VARCHAR, created_at VARCHAR);
+INSERT INTO users VALUES
+    (1, 'Alice', 'alice@example.com', '2024-01-15 10:00:00'),
+    (2, 'Bob', 'bob@example.com', '2024-01-16 11:30:00'),
+    (3, 'Charlie', 'charlie@example.com', '2024-01-17 14:00:00');
+CREATE TABLE products (product_id BIGINT, name VARCHAR, price DOUBLE, stock BIGINT);
+INSERT INTO products VALUES
+    (101, 'Laptop', 1200.0, 50),
+    (102, 'Mouse', 25.0, 200),
+    (103, 'Keyboard', 75.0, 150);
+CREATE TABLE sales (
+    sale_id BIGINT, product_id BIGINT, user_id BIGINT, amount DOUBLE, sale_date VARCHAR
+);
+INSERT INTO sales VALUES
+    (1001, 101, 1, 1200.0, '2024-05-01'),
+    (1002, 102, 1, 25.0, '2024-05-01'),
+    (1003, 103, 2, 75.0, '2024-05-02');
+"""
+MAX_HISTORY_ITEMS = 200
+RESULT_STORE_DIR = os.environ.get(
+    "ORBIT_RESULT_STORE_DIR", os.path.join(tempfile.gettempdir(), "orbit-results")
+)
+RESULT_STORE_MAX_BYTES = int(
+    os.environ.get("ORBIT_RESULT_STORE_MAX_BYTES", str(1024 * 1024 * 1024))
+)
+# Rows per record batch in stored results; the grid reads a window of a
+# stored result by decompressing only the batches it overlaps.
+RESULT_STORE_BATCH_ROWS = 8192
+RESULT_STORE_BATCH_ROWS_KEY = b"batch_rows"
+IMPORT_CHUNK_BYTES = 8 * 1024 * 1024
+# Applies to connecting and to each read of a dataset download.
+DATASET_URL_TIMEOUT_SECONDS = 30
+DATASET_READERS = {
+    ".csv": "read_csv_auto",
+    ".tsv": "read_csv_auto",
+    ".txt": "read_csv_auto",
+    ".parquet": "read_parquet",
+    ".json": "read_json_auto",
+    ".jsonl": "read_json_auto",
+    ".ndjson": "read_json_auto",
+}
+READ_ONLY_KEYWORDS = ("select", "with", "values", "table", "from", "show", "describe")
 
 
 class Column(TypedDict):
@@ -18,52 +122,2583 @@ class Column(TypedDict):
 
 
 class Table(TypedDict):
-    """A database table."""
+    """A database table.
+
+    database is empty for tables in the connection's default database.
+    """
+
+    name: str
+    database: str
+    schema: str
+    columns: list[Column]
+
+
+class Database(TypedDict):
+    """A database with its tables."""
+
+    name: str
+    tables: list[Table]
+
+
+class Catalog(TypedDict):
+    """A database catalog as introspected from a driver."""
+
+    schema: list[Database]
+    foreign_keys: dict[str, list[tuple[str, str]]]
+    fingerprint: str
+
+
+class ResultColumn(TypedDict):
+    """One result column stored as a typed array.
+
+    Null cells hold a placeholder in values and are marked in the nulls
+    bitmap, which only grows as far as the last null. Low-cardinality
+    string columns are dictionary encoded, with values holding indexes into
+    dictionary.
+    """
+
+    name: str
+    kind: Literal["int", "float", "bool", "str", "dict"]
+    values: list[int | float | bool | str]
+    dictionary: list[str]
+    nulls: bytearray
+
+
+class QueryResult(TypedDict):
+    columns: list[ResultColumn]
+    row_count: int
+    has_more: bool
+
+
+class ResultLayout(TypedDict):
+    """The columns of the current result and their widths in the grid."""
+
+    columns: list[str]
+    grid_template: str
+
+
+class QueryParameter(TypedDict):
+    name: str
+    value: str
+
+
+class QueryTimings(TypedDict):
+    """Milliseconds spent in each phase of running a query.
+
+    plan is only measured separately on DuckDB; elsewhere it is part of execute.
+    """
+
+    translate: float
+    plan: float
+    execute: float
+    fetch: float
+    serialize: float
+    state_sync: float
+
+
+class QueryHistoryItem(TypedDict):
+    """A query run in this session. Its result is kept in RESULT_STORE by id."""
+
+    id: str
+    natural_language: str
+    generated_sql: str
+    row_count: int
+    execution_time: float
+    timestamp: str
+    status: Literal["success", "error", "cancelled"]
+    cache_hit: bool
+    timings: QueryTimings
+
+
+class PhaseTiming(TypedDict):
+    name: str
+    ms: float
+    percent: float
+
+
+class ProfileOperator(TypedDict):
+    """One operator of a profiled query plan."""
+
+    name: str
+    depth: int
+    time_ms: float
+    rows: int
+
+
+class HistogramBin(TypedDict):
+    """A histogram bar; percent is relative to the largest bin."""
+
+    label: str
+    count: int
+    percent: float
+
+
+class ColumnStats(TypedDict):
+    name: str
+    type: str
+    null_percent: float
+    approx_unique: int
+    min: str
+    max: str
+    histogram: list[HistogramBin]
+
+
+class TableStats(TypedDict):
+    """Column statistics for a table, computed over a sample of big tables.
+
+    error says why a table has no statistics, and is empty otherwise.
+    """
+
+    table: str
+    row_count: int
+    sample_rows: int
+    columns: list[ColumnStats]
+    error: str
+
+
+class _PooledConnection:
+    """A driver handed out to one browser session.
+
+    The session's statements all run on one execution cursor from the
+    driver, so temp tables, variables, USE and explicit transactions carry
+    over between runs. That connection holds one pending result at a time,
+    so only the latest result keeps its cursor open for paging. Schema,
+    statistics and profiling work uses the driver's other cursors.
+    """
+
+    def __init__(self, driver: drivers.Driver):
+        self.driver = driver
+        self.last_used = time.monotonic()
+        self.result_id = ""
+        # Set once the session ran a statement that may leave state only its
+        # own connection sees, such as a temp table, a variable, USE or an
+        # open transaction; its results are no longer shared with others.
+        self.has_private_state = False
+        # Set on a new connection replacing one that was evicted with private
+        # state, until the session has been told about it.
+        self.reset_notice = ""
+        self._execution = None
+
+    def execution_cursor(self, result_id: str) -> tuple[object, str]:
+        """Get the execution cursor for a new result.
+
+        Returns:
+            The cursor and the id of the result still open on it, which must
+            be closed before the new statement runs.
+        """
+        if self._execution is None:
+            self._execution = self.driver.session_cursor()
+        previous, self.result_id = self.result_id, result_id
+        return self._execution, previous
+
+    def close(self):
+        RESULT_CURSORS.close(self.result_id)
+        if self._execution is not None:
+            PREPARED_STATEMENTS.forget(drivers.arrow_connection(self._execution))
+        self.driver.close()
+
+
+class _SessionConnectionPool:
+    """Hands out one database driver per browser session.
+
+    By default a session gets a cursor on the shared DuckDB workspace, which
+    is in memory unless ORBIT_WORKSPACE_DATABASE names a file, so sessions
+    see the same catalog but execute independently.
+    Connecting a session to another database replaces only that session's
+    driver.
+
+    Sessions that are running or queueing a query, or still have a result
+    open, are never evicted. Nor are sessions that may hold private state,
+    such as temp tables or a transaction, until they have been idle for
+    SESSION_IDLE_TIMEOUT_SECONDS. A session evicted while connected to
+    another database gets a ClosedDriver when it comes back, rather than
+    being moved to the workspace behind its back; a workspace session that
+    lost private state is told so by its next run.
+    """
+
+    _shared: ClassVar["duckdb.DuckDBPyConnection | None"] = None
+    _workspace_ready: ClassVar[bool] = False
+    _workspace_lock: ClassVar[threading.Lock] = threading.Lock()
+    _sessions: ClassVar[OrderedDict[str, _PooledConnection]] = OrderedDict()
+    # The label of the database each evicted session was connected to, or
+    # None for a workspace session that lost private state.
+    _evicted: ClassVar[OrderedDict[str, str | None]] = OrderedDict()
+    _lock: ClassVar[threading.Lock] = threading.Lock()
+
+    @classmethod
+    def _shared_con(cls) -> "duckdb.DuckDBPyConnection":
+        if cls._shared is None:
+            cls._shared = duckdb.connect(database=WORKSPACE_DATABASE, read_only=False)
+        return cls._shared
+
+    @classmethod
+    def workspace(cls) -> "duckdb.DuckDBPyConnection":
+        """Get a new cursor on the shared workspace."""
+        with cls._lock:
+            return cls._shared_con().cursor()
+
+    @classmethod
+    def workspace_ready(cls) -> bool:
+        return cls._workspace_ready
+
+    @classmethod
+    def prepare_workspace(cls) -> bool:
+        """Load the sample data if the workspace has no tables yet.
+
+        Only the first call in a process looks at the workspace, so later page
+        loads cost nothing. A persistent workspace that already holds tables
+        is left as it is.
+
+        Returns:
+            Whether the sample data was loaded.
+        """
+        with cls._workspace_lock:
+            if cls._workspace_ready:
+                return False
+            con = cls.workspace()
+            try:
+                (tables,) = con.execute(
+                    "SELECT count(*) FROM duckdb_tables() WHERE NOT internal"
+                ).fetchone()
+                if not tables:
+                    con.execute(SAMPLE_DATA_SQL)
+            finally:
+                con.close()
+            cls._workspace_ready = True
+        if not tables:
+            DATA_VERSIONS.bump(WORKSPACE_CATALOG_KEY)
+        return not tables
+
+    @classmethod
+    def get(cls, session_token: str) -> drivers.Driver:
+        """Get the driver for a session, creating it on first use."""
+        with cls._lock:
+            return cls._pooled(session_token).driver
+
+    @classmethod
+    def execution_cursor(cls, session_token: str, result_id: str) -> tuple[object, str]:
+        """Get the cursor a session's statements run on, for a new result.
+
+        Returns:
+            The cursor and the id of the previous result still open on it.
+        """
+        with cls._lock:
+            return cls._pooled(session_token).execution_cursor(result_id)
+
+    @classmethod
+    def note_private_state(cls, session_token: str):
+        """Record that a session ran a statement that may change its own state."""
+        with cls._lock:
+            pooled = cls._sessions.get(session_token)
+            if pooled is not None:
+                pooled.has_private_state = True
+
+    @classmethod
+    def has_private_state(cls, session_token: str) -> bool:
+        with cls._lock:
+            pooled = cls._sessions.get(session_token)
+            return pooled is not None and pooled.has_private_state
+
+    @classmethod
+    def take_reset_notice(cls, session_token: str) -> str:
+        """Get, once, the notice that a session's connection lost its private state."""
+        with cls._lock:
+            pooled = cls._sessions.get(session_token)
+            if pooled is None:
+                return ""
+            notice, pooled.reset_notice = pooled.reset_notice, ""
+            return notice
+
+    @classmethod
+    def _pooled(cls, session_token: str) -> _PooledConnection:
+        cls._evict_idle()
+        pooled = cls._sessions.get(session_token)
+        if pooled is None:
+            was_reset = session_token in cls._evicted
+            label = cls._evicted.pop(session_token, None)
+            if label is not None:
+                driver = drivers.ClosedDriver(
+                    label,
+                    f"The connection to {label} was closed while the session "
+                    "was idle. Reconnect to continue.",
+                )
+            else:
+                driver = drivers.DuckDBDriver(
+                    cls._shared_con().cursor(),
+                    _workspace_label(),
+                    WORKSPACE_CATALOG_KEY,
+                )
+            pooled = _PooledConnection(driver)
+            if was_reset and label is None:
+                pooled.reset_notice = (
+                    "The session's connection was reset while it was idle, so "
+                    "its temp tables, variables and open transaction are gone."
+                )
+            cls._add(session_token, pooled)
+        else:
+            cls._sessions.move_to_end(session_token)
+        pooled.last_used = time.monotonic()
+        return pooled
+
+    @classmethod
+    def set(cls, session_token: str, driver: drivers.Driver):
+        """Replace the driver for a session, closing its previous one."""
+        with cls._lock:
+            previous = cls._sessions.pop(session_token, None)
+            cls._evicted.pop(session_token, None)
+            cls._add(session_token, _PooledConnection(driver))
+        if previous is not None:
+            previous.close()
+
+    @classmethod
+    def release(cls, session_token: str):
+        """Close and forget the driver for a session."""
+        with cls._lock:
+            pooled = cls._sessions.pop(session_token, None)
+            cls._evicted.pop(session_token, None)
+        if pooled is not None:
+            pooled.close()
+
+    @classmethod
+    def _add(cls, session_token: str, pooled: _PooledConnection):
+        cls._sessions[session_token] = pooled
+        excess = len(cls._sessions) - MAX_POOLED_SESSIONS
+        # Busy sessions and those with private state are skipped, so the pool
+        # can exceed its cap until they finish or go idle.
+        for token in list(cls._sessions)[:-1]:
+            if excess <= 0:
+                break
+            if cls._evict(token, keep_private_state=True):
+                excess -= 1
+
+    @classmethod
+    def _evict_idle(cls):
+        cutoff = time.monotonic() - SESSION_IDLE_TIMEOUT_SECONDS
+        for session_token, pooled in list(cls._sessions.items()):
+            if pooled.last_used >= cutoff:
+                break
+            cls._evict(session_token)
+
+    @classmethod
+    def _evict(cls, session_token: str, keep_private_state: bool = False) -> bool:
+        """Close a session's driver unless it is busy, returning whether it was."""
+        pooled = cls._sessions[session_token]
+        if (
+            RUNNING_QUERIES.is_running(session_token)
+            or QUERY_SCHEDULER.pending(session_token)
+            or RESULT_CURSORS.is_open(pooled.result_id)
+            or (keep_private_state and pooled.has_private_state)
+        ):
+            return False
+        del cls._sessions[session_token]
+        if not isinstance(pooled.driver, drivers.ClosedDriver):
+            if pooled.driver.catalog_key != WORKSPACE_CATALOG_KEY:
+                cls._evicted[session_token] = pooled.driver.label
+            elif pooled.has_private_state:
+                cls._evicted[session_token] = None
+        while len(cls._evicted) > MAX_TRACKED_EVICTIONS:
+            cls._evicted.popitem(last=False)
+        pooled.close()
+        return True
+
+
+DB_POOL = _SessionConnectionPool()
+
+
+def _workspace_label() -> str:
+    if WORKSPACE_DATABASE == ":memory:":
+        return "in-memory DuckDB"
+    return f"DuckDB workspace: {WORKSPACE_DATABASE}"
+
+
+def _schema_group(database: str, schema: str) -> str:
+    """Name a schema in the sidebar; other databases' schemas are "database.schema"."""
+    return f"{database}.{schema}" if database else schema
+
+
+def _group_columns(column_rows: list[drivers.ColumnRow]) -> list[Database]:
+    """Group flat (database, schema, table, column, type) rows into a schema tree."""
+    databases: dict[str, dict[str, Table]] = {}
+    for database, schema, table_name, column_name, column_type in column_rows:
+        tables = databases.setdefault(_schema_group(database, schema), {})
+        table = tables.setdefault(
+            table_name,
+            Table(name=table_name, database=database, schema=schema, columns=[]),
+        )
+        table["columns"].append(Column(name=column_name, type=column_type))
+    return [
+        Database(name=db_name, tables=list(tables.values()))
+        for db_name, tables in databases.items()
+    ]
+
+
+def _group_foreign_keys(
+    foreign_key_rows: list[drivers.ForeignKeyRow],
+) -> dict[str, list[tuple[str, str]]]:
+    """Group flat (database, table, referenced table) rows per database."""
+    foreign_keys: dict[str, list[tuple[str, str]]] = {}
+    for db_name, table_name, referenced_table in foreign_key_rows:
+        foreign_keys.setdefault(db_name, []).append((table_name, referenced_table))
+    return foreign_keys
+
+
+def _schema_fingerprint(
+    schema: list[Database], foreign_keys: dict[str, list[tuple[str, str]]]
+) -> str:
+    """Hash a schema so derived artifacts can be cached against it."""
+    payload = json.dumps([schema, foreign_keys], default=str).encode()
+    return hashlib.sha1(payload).hexdigest()
+
+
+def _make_catalog(
+    schema: list[Database], foreign_keys: dict[str, list[tuple[str, str]]]
+) -> Catalog:
+    return Catalog(
+        schema=schema,
+        foreign_keys=foreign_keys,
+        fingerprint=_schema_fingerprint(schema, foreign_keys),
+    )
+
+
+class _SchemaCache:
+    """Caches introspected catalogs until their fingerprint changes."""
+
+    _entries: ClassVar[OrderedDict[str, tuple[object, Catalog]]] = OrderedDict()
+    _lock: ClassVar[threading.Lock] = threading.Lock()
+
+    @classmethod
+    def get(cls, driver: drivers.Driver) -> Catalog:
+        """Get the catalog for a driver, reloading it only if it changed.
+
+        The returned catalog is shared between sessions and must not be mutated.
+        """
+        version = driver.catalog_version()
+        with cls._lock:
+            entry = cls._entries.get(driver.catalog_key)
+            if entry is not None and version is not None and entry[0] == version:
+                cls._entries.move_to_end(driver.catalog_key)
+                return entry[1]
+        catalog = _make_catalog(
+            _group_columns(driver.load_columns()),
+            _group_foreign_keys(driver.load_foreign_keys()),
+        )
+        cls._store(driver.catalog_key, version, catalog)
+        return catalog
+
+    @classmethod
+    def refresh_table(cls, driver: drivers.Driver, table_name: str) -> Catalog:
+        """Update one table in a cached catalog instead of reloading all of it."""
+        with cls._lock:
+            entry = cls._entries.get(driver.catalog_key)
+        column_rows = driver.load_table_columns(table_name)
+        if entry is None or not column_rows:
+            return cls.get(driver)
+        catalog = entry[1]
+        database, schema_name = column_rows[0][:2]
+        db_name = _schema_group(database, schema_name)
+        table = Table(
+            name=table_name,
+            database=database,
+            schema=schema_name,
+            columns=[Column(name=row[3], type=row[4]) for row in column_rows],
+        )
+        schema = [db for db in catalog["schema"] if db["name"] != db_name]
+        existing = next((db for db in catalog["schema"] if db["name"] == db_name), None)
+        tables = (
+            [t for t in existing["tables"] if t["name"] != table_name]
+            if existing
+            else []
+        )
+        schema.append(Database(name=db_name, tables=tables + [table]))
+        fingerprint = hashlib.sha1(
+            (catalog["fingerprint"] + json.dumps(table)).encode()
+        ).hexdigest()
+        refreshed = Catalog(
+            schema=schema,
+            foreign_keys=catalog["foreign_keys"],
+            fingerprint=fingerprint,
+        )
+        cls._store(driver.catalog_key, driver.catalog_version(), refreshed)
+        return refreshed
+
+    @classmethod
+    def _store(cls, catalog_key: str, version: object, catalog: Catalog):
+        with cls._lock:
+            cls._entries[catalog_key] = (version, catalog)
+            cls._entries.move_to_end(catalog_key)
+            while len(cls._entries) > MAX_CACHED_SCHEMAS:
+                cls._entries.popitem(last=False)
+
+
+SCHEMA_CACHE = _SchemaCache()
+
+
+def _build_table_index(schema: list[Database]) -> dict[str, list[tuple[str, str]]]:
+    """Index table names per database as sorted (lowercased name, name) pairs."""
+    return {
+        db["name"]: sorted(
+            (table["name"].lower(), table["name"]) for table in db["tables"]
+        )
+        for db in schema
+    }
+
+
+def _filter_tables(
+    index: list[tuple[str, str]], query: str, limit: int
+) -> tuple[list[str], int]:
+    """Find table names matching a filter, prefix matches first.
+
+    Returns:
+        Up to limit matching names and the number of matches left out.
+    """
+    query = query.strip().lower()
+    if not query:
+        return [name for _, name in index[:limit]], max(len(index) - limit, 0)
+    start = bisect.bisect_left(index, (query,))
+    end = bisect.bisect_left(index, (query + "\uffff",), lo=start)
+    prefix = index[start:end]
+    contains = [entry for entry in index[:start] + index[end:] if query in entry[0]]
+    matches = prefix + contains
+    return [name for _, name in matches[:limit]], max(len(matches) - limit, 0)
+
+
+def _quote_identifier(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _quote_literal(value: str) -> str:
+    return "'" + value.replace("'", "''") + "'"
+
+
+def _dataset_suffix(filename: str) -> str:
+    """Get a dataset's format suffix, looking through a trailing .gz."""
+    stem, suffix = os.path.splitext(filename.lower())
+    if suffix == ".gz":
+        return os.path.splitext(stem)[1]
+    return suffix
+
+
+def _dataset_table_name(filename: str) -> str:
+    """Derive a table name from a dataset's file name."""
+    stem = os.path.basename(filename).split(".")[0]
+    name = re.sub(r"\W+", "_", stem).strip("_").lower() or "dataset"
+    return f"t_{name}" if name[0].isdigit() else name
+
+
+def _load_dataset(
+    con: "duckdb.DuckDBPyConnection", path: str, table_name: str, reader: str
+) -> tuple[str, int]:
+    """Load a dataset file into a new table with DuckDB's native reader.
+
+    The workspace is shared, so an existing table is never replaced: the
+    name gets a numeric suffix instead.
+
+    Returns:
+        The name of the table created and its row count.
+    """
+    cursor = con.cursor()
+    try:
+        taken = {
+            name.lower()
+            for (name,) in cursor.execute(
+                "SELECT table_name FROM duckdb_tables() "
+                "WHERE database_name = current_database() "
+                "AND schema_name = current_schema() UNION ALL "
+                "SELECT view_name FROM duckdb_views() "
+                "WHERE database_name = current_database() "
+                "AND schema_name = current_schema()"
+            ).fetchall()
+        }
+        name, suffix = table_name, 1
+        while name in taken:
+            suffix += 1
+            name = f"{table_name}_{suffix}"
+        cursor.execute(
+            f"CREATE TABLE {_quote_identifier(name)} AS "
+            f"SELECT * FROM {reader}({_quote_literal(path)})"
+        )
+        (row_count,) = cursor.execute(
+            f"SELECT count(*) FROM {_quote_identifier(name)}"
+        ).fetchone()
+        return name, row_count
+    finally:
+        cursor.close()
+
+
+def _mermaid_word(value: str) -> str:
+    """Make a type or column name safe to use as a Mermaid attribute token."""
+    return re.sub(r"\W", "_", value) or "_"
+
+
+def _heuristic_relationships(db_schema: Database) -> list[tuple[str, str]]:
+    """Guess (table, target) relationships from columns named like target_id."""
+    relationships = []
+    table_names = {table["name"] for table in db_schema["tables"]}
+    for table in db_schema["tables"]:
+        for column in table["columns"]:
+            if column["name"].endswith("_id") and column["name"] not in [
+                "id",
+                f"{table['name'].rstrip('s')}_id",
+            ]:
+                fk_target_table_singular = column["name"].replace("_id", "")
+                fk_target_table_plural = f"{fk_target_table_singular}s"
+                if fk_target_table_plural in table_names:
+                    relationships.append((table["name"], fk_target_table_plural))
+                elif fk_target_table_singular in table_names:
+                    relationships.append((table["name"], fk_target_table_singular))
+    return relationships
+
+
+def _neighborhood(
+    focus: str, relationships: list[tuple[str, str]], hops: int
+) -> set[str]:
+    """Find the tables within a number of relationship hops of a table."""
+    neighbors: dict[str, set[str]] = {}
+    for a, b in relationships:
+        neighbors.setdefault(a, set()).add(b)
+        neighbors.setdefault(b, set()).add(a)
+    seen = {focus}
+    frontier = {focus}
+    for _ in range(hops):
+        frontier = {n for t in frontier for n in neighbors.get(t, ())} - seen
+        seen |= frontier
+    return seen
+
+
+def _build_er_diagram(
+    db_schema: Database,
+    foreign_keys: list[tuple[str, str]],
+    focus: str | None,
+    hops: int,
+) -> str:
+    """Render a Mermaid ER diagram for a database, or a neighborhood of it.
+
+    Declared foreign keys are drawn as referenced ||--o{ referencing. Only if
+    the database declares none are relationships guessed from column names.
+    """
+    if foreign_keys:
+        relationships = [(ref, table) for table, ref in foreign_keys]
+    else:
+        relationships = _heuristic_relationships(db_schema)
+    tables = db_schema["tables"]
+    if hops and focus:
+        included = _neighborhood(focus, relationships, hops)
+        tables = [table for table in tables if table["name"] in included]
+    if len(tables) > ER_DIAGRAM_MAX_TABLES:
+        return f"""mermaid
+graph TD
+    A[{len(tables)} tables are too many to draw. Select a table and show its neighborhood.]
+"""
+    table_names = {table["name"] for table in tables}
+    lines = ["erDiagram"]
+    for table in tables:
+        lines.append(f"    {table['name']} {{")
+        lines.extend(
+            f"        {_mermaid_word(column['type'])} {_mermaid_word(column['name'])}"
+            for column in table["columns"]
+        )
+        lines.append("    }")
+    lines.extend(
+        f'    "{a}" ||--o{{ "{b}" : "has"'
+        for a, b in dict.fromkeys(relationships)
+        if a in table_names and b in table_names
+    )
+    return "mermaid\n" + "\n".join(lines) + "\n"
+
+
+class _ERDiagramCache:
+    """Caches rendered ER diagrams by schema fingerprint and view."""
+
+    _entries: ClassVar[OrderedDict[tuple, str]] = OrderedDict()
+    _lock: ClassVar[threading.Lock] = threading.Lock()
+
+    @classmethod
+    def get(cls, catalog: Catalog, db_name: str, focus: str | None, hops: int) -> str:
+        """Get the diagram for a database view, rendering it on a cache miss."""
+        key = (catalog["fingerprint"], db_name, focus if hops else None, hops)
+        with cls._lock:
+            if key in cls._entries:
+                cls._entries.move_to_end(key)
+                return cls._entries[key]
+        db_schema = next(
+            (db for db in catalog["schema"] if db["name"] == db_name), None
+        )
+        if not db_schema:
+            return """mermaid
+graph TD
+    A[Database not found or empty]
+"""
+        diagram = _build_er_diagram(
+            db_schema, catalog["foreign_keys"].get(db_name, []), focus, hops
+        )
+        with cls._lock:
+            cls._entries[key] = diagram
+            while len(cls._entries) > MAX_CACHED_ER_DIAGRAMS:
+                cls._entries.popitem(last=False)
+        return diagram
+
+
+ER_DIAGRAMS = _ERDiagramCache()
+
+
+class _NLRule:
+    """A natural-language pattern and the SQL template it translates to.
+
+    Named groups in the pattern fill the template's placeholders according
+    to params: "table" groups must name a table in the schema, "column"
+    groups a column of the rule's table, "int" groups a number and
+    "literal" groups any value, which is quoted. Tables the template
+    always needs are listed in tables and fill placeholders of their name.
+    """
+
+    def __init__(
+        self,
+        keywords: tuple[str, ...],
+        pattern: str,
+        template: str,
+        params: dict[str, Literal["table", "column", "int", "literal"]] | None = None,
+        tables: tuple[str, ...] = (),
+    ):
+        self.keywords = keywords
+        self.regex = re.compile(pattern, re.IGNORECASE)
+        self.template = template
+        self.params = params or {}
+        self.tables = tables
+
+    def render(
+        self, text: str, tables: dict[str, Table], quote: Callable[[str], str]
+    ) -> str | None:
+        """Translate text with this rule, or None if it doesn't apply to the schema."""
+        match = self.regex.search(text)
+        if match is None:
+            return None
+        values = {}
+        for name in self.tables:
+            table = _resolve_table(tables, name)
+            if table is None:
+                return None
+            values[name] = _qualified_name(table, quote)
+        table = None
+        for name, kind in self.params.items():
+            value = match.group(name)
+            if kind == "table":
+                table = _resolve_table(tables, value.lower())
+                if table is None:
+                    return None
+                values[name] = _qualified_name(table, quote)
+            elif kind == "column":
+                column = next(
+                    (
+                        c["name"]
+                        for c in (table["columns"] if table else [])
+                        if c["name"].lower() == value.lower()
+                    ),
+                    None,
+                )
+                if column is None:
+                    return None
+                values[name] = quote(column)
+            elif kind == "int":
+                values[name] = str(int(value))
+            else:
+                if len(value) > 1 and value[0] == value[-1] and value[0] in "'\"":
+                    value = value[1:-1].replace(value[0] * 2, value[0])
+                values[name] = _quote_literal(value)
+        return self.template.format(**values)
+
+
+def _resolve_table(tables: dict[str, Table], name: str) -> Table | None:
+    """Find a table by name, allowing for a singular or plural spelling."""
+    for candidate in (name, f"{name}s", name.removesuffix("s")):
+        if candidate in tables:
+            return tables[candidate]
+    return None
+
+
+def _schema_tables(catalog: Catalog | None, db_name: str | None) -> dict[str, Table]:
+    """Index a database's tables by their lowercased names."""
+    db_schema = (
+        next((db for db in catalog["schema"] if db["name"] == db_name), None)
+        if catalog
+        else None
+    )
+    return {t["name"].lower(): t for t in db_schema["tables"]} if db_schema else {}
+
+
+def _dialect_quote(dialect: str) -> Callable[[str], str]:
+    if dialect == "mysql":
+        return lambda name: "`" + name.replace("`", "``") + "`"
+    return _quote_identifier
+
+
+def _qualified_name(table: Table, quote: Callable[[str], str]) -> str:
+    """Quote a table's name with its database and schema, so it resolves anywhere."""
+    # Schema snapshots saved before tables were qualified only have a name.
+    parts = (table.get("database", ""), table.get("schema", ""), table["name"])
+    return ".".join(quote(part) for part in parts if part)
+
+
+class _NLTranslator:
+    """Translates output("...") requests to SQL with keyword-indexed rules.
+
+    Rules are indexed by their keywords, so a request is only matched
+    against the rules sharing a word with it, in the order they were
+    registered. Translations are cached per schema fingerprint.
+    """
+
+    _rules: ClassVar[list[_NLRule]] = []
+    _index: ClassVar[dict[str, list[int]]] = {}
+    _cache: ClassVar[OrderedDict[tuple, str | None]] = OrderedDict()
+    _lock: ClassVar[threading.Lock] = threading.Lock()
+
+    @classmethod
+    def register(cls, rule: _NLRule):
+        """Add a rule; it is tried after the rules registered before it."""
+        with cls._lock:
+            cls._rules.append(rule)
+            for keyword in rule.keywords:
+                cls._index.setdefault(keyword, []).append(len(cls._rules) - 1)
+            cls._cache.clear()
+
+    @classmethod
+    def translate(
+        cls, request: str, catalog: Catalog | None, db_name: str | None, dialect: str
+    ) -> str | None:
+        """Translate a request against a database's tables, or None if no rule fits."""
+        text = " ".join(request.split())
+        fingerprint = catalog["fingerprint"] if catalog else ""
+        key = (text, fingerprint, db_name, dialect)
+        with cls._lock:
+            if key in cls._cache:
+                cls._cache.move_to_end(key)
+                return cls._cache[key]
+            candidates = sorted(
+                {
+                    i
+                    for word in set(re.findall(r"\w+", text.lower()))
+                    for i in cls._index.get(word, ())
+                }
+            )
+            rules = [cls._rules[i] for i in candidates]
+        tables = _schema_tables(catalog, db_name)
+        quote = _dialect_quote(dialect)
+        sql = None
+        for rule in rules:
+            sql = rule.render(text, tables, quote)
+            if sql is not None:
+                break
+        with cls._lock:
+            cls._cache[key] = sql
+            while len(cls._cache) > MAX_CACHED_TRANSLATIONS:
+                cls._cache.popitem(last=False)
+        return sql
+
+
+NL_TRANSLATOR = _NLTranslator()
+_DEFAULT_NL_RULES = [
+    _NLRule(
+        ("products",),
+        r"\ball users\b.*\bproducts\b",
+        "SELECT u.name, u.email, p.name AS product_name, p.price FROM {users} u "
+        "JOIN {sales} s ON u.id = s.user_id "
+        "JOIN {products} p ON s.product_id = p.product_id;",
+        tables=("users", "sales", "products"),
+    ),
+    _NLRule(
+        ("first",),
+        r"\bfirst (?P<limit>\d+) rows? (?:from|of|in) (?P<table>\w+)",
+        "SELECT * FROM {table} LIMIT {limit};",
+        {"limit": "int", "table": "table"},
+    ),
+    _NLRule(
+        ("count", "many"),
+        r"\b(?:count|how many)\b.*\b(?:from|of|in) (?P<table>\w+)",
+        "SELECT count(*) AS row_count FROM {table};",
+        {"table": "table"},
+    ),
+    _NLRule(
+        ("where",),
+        r"\b(?:all|rows) (?:from |in )?(?P<table>\w+) where (?P<column>\w+) "
+        r"(?:is|=|equals) (?P<value>.+?)[.?!]?$",
+        "SELECT * FROM {table} WHERE {column} = {value};",
+        {"table": "table", "column": "column", "value": "literal"},
+    ),
+    _NLRule(
+        ("all",),
+        r"\ball (?P<table>\w+)",
+        "SELECT * FROM {table};",
+        {"table": "table"},
+    ),
+]
+for rule in _DEFAULT_NL_RULES:
+    NL_TRANSLATOR.register(rule)
+
+
+def _elapsed_ms(started: float) -> float:
+    return round((time.perf_counter() - started) * 1000, 3)
+
+
+def _format_duration(seconds: float) -> str:
+    if seconds < 1:
+        return f"{seconds * 1000:.1f} ms"
+    return f"{seconds:.2f} s"
+
+
+def _to_cell(value) -> str | int | float | bool | None:
+    """Convert a fetched value into something the frontend can render."""
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    return str(value)
+
+
+_KIND_PLACEHOLDERS = {"int": 0, "float": 0.0, "bool": False, "str": "", "dict": 0}
+
+
+def _fits_kind(kind: str, value) -> bool:
+    if kind == "bool":
+        return isinstance(value, bool)
+    if kind == "int":
+        return isinstance(value, int) and not isinstance(value, bool)
+    if kind == "float":
+        return isinstance(value, (int, float)) and not isinstance(value, bool)
+    if kind == "dict":
+        return isinstance(value, str)
+    return True
+
+
+def _column_kind(cells: list) -> str:
+    """Pick the narrowest column kind that holds every non-null cell."""
+    values = [v for v in cells if v is not None]
+    for kind in ("bool", "int", "float"):
+        if values and all(_fits_kind(kind, v) for v in values):
+            return kind
+    if all(_fits_kind("dict", v) for v in values) and len(set(values)) <= min(
+        DICT_ENCODING_MAX_VALUES, len(cells) // 2
+    ):
+        return "dict"
+    return "str"
+
+
+def _decode_nulls(nulls: bytearray, first: int, last: int) -> list[bool]:
+    """Read the null flags of rows first..last from a null bitmap."""
+    if not nulls:
+        return [False] * (last - first)
+    return [
+        i // 8 < len(nulls) and bool(nulls[i // 8] & (1 << (i % 8)))
+        for i in range(first, last)
+    ]
+
+
+def _new_result_column(name: str, cells: list) -> ResultColumn:
+    column = ResultColumn(
+        name=name,
+        kind=_column_kind(cells),
+        values=[],
+        dictionary=[],
+        nulls=bytearray(),
+    )
+    _append_cells(column, 0, cells)
+    return column
+
+
+def _reencode_column(column: ResultColumn, row_count: int, cells: list):
+    """Re-encode a column and the cells appended to it under a kind fitting both."""
+    previous = _decode_column(column, 0, row_count)
+    column.update(
+        kind=_column_kind(previous + cells),
+        values=[],
+        dictionary=[],
+        nulls=bytearray(),
+    )
+    _append_cells(column, 0, previous + cells)
+
+
+def _append_cells(column: ResultColumn, row_count: int, cells: list):
+    """Encode cells onto the end of a column that already holds row_count rows."""
+    kind = column["kind"]
+    if any(v is not None and not _fits_kind(kind, v) for v in cells):
+        # A later page did not fit the kind guessed from the earlier ones, so
+        # the column widens, say from int to float or from all nulls to int.
+        _reencode_column(column, row_count, list(cells))
+        return
+    placeholder = _KIND_PLACEHOLDERS[kind]
+    if kind == "dict":
+        codes = {value: i for i, value in enumerate(column["dictionary"])}
+        for v in cells:
+            if v is not None and v not in codes:
+                codes[v] = len(column["dictionary"])
+                column["dictionary"].append(v)
+        if len(column["dictionary"]) > DICT_ENCODING_MAX_VALUES:
+            _reencode_column(column, row_count, list(cells))
+            return
+        values = [placeholder if v is None else codes[v] for v in cells]
+    elif kind == "str":
+        values = [placeholder if v is None else str(v) for v in cells]
+    elif kind == "float":
+        values = [placeholder if v is None else float(v) for v in cells]
+    else:
+        values = [placeholder if v is None else v for v in cells]
+    column["values"].extend(values)
+    nulls = column["nulls"]
+    for i, v in enumerate(cells, start=row_count):
+        if v is None:
+            if i // 8 >= len(nulls):
+                nulls.extend(bytes(i // 8 + 1 - len(nulls)))
+            nulls[i // 8] |= 1 << (i % 8)
+
+
+def _decode_column(column: ResultColumn, first: int, last: int) -> list:
+    """Decode rows first..last of a column back into Python values."""
+    flags = _decode_nulls(column["nulls"], first, last)
+    values = column["values"][first:last]
+    if column["kind"] == "dict":
+        dictionary = column["dictionary"]
+        return [
+            None if is_null else dictionary[code]
+            for code, is_null in zip(values, flags)
+        ]
+    return [None if is_null else v for v, is_null in zip(values, flags)]
+
+
+def _build_result(names: list[str], cells: list[list], has_more: bool) -> QueryResult:
+    """Encode a page of column cells as a columnar QueryResult."""
+    row_count = len(cells[0]) if cells else 0
+    return {
+        "columns": [_new_result_column(n, c) for n, c in zip(names, cells)],
+        "row_count": row_count,
+        "has_more": has_more,
+    }
+
+
+def _append_page(result: QueryResult, cells: list[list], has_more: bool):
+    """Encode another page of column cells onto the end of a result."""
+    for column, column_cells in zip(result["columns"], cells):
+        _append_cells(column, result["row_count"], column_cells)
+    result["row_count"] += len(cells[0]) if cells else 0
+    result["has_more"] = has_more
+
+
+def _message_result(title: str, message: str) -> QueryResult:
+    return _build_result([title], [[message]], False)
+
+
+def _result_rows(result: QueryResult, first: int, last: int) -> list[list]:
+    """Decode rows first..last of a result into row-major lists."""
+    last = min(last, result["row_count"])
+    if first >= last:
+        return []
+    columns = [_decode_column(column, first, last) for column in result["columns"]]
+    return [list(row) for row in zip(*columns)]
+
+
+def _result_from_rows(columns: list[str], rows: list[list]) -> QueryResult:
+    """Encode a row-major result, such as one saved by an older session file."""
+    cells = [[row[i] for row in rows] for i in range(len(columns))]
+    return _build_result(columns, cells, False)
+
+
+def _copy_result(result: QueryResult) -> QueryResult:
+    """Copy a result into plain lists, detached from any state proxy."""
+    return {
+        "columns": [
+            ResultColumn(
+                name=column["name"],
+                kind=column["kind"],
+                values=list(column["values"]),
+                dictionary=list(column["dictionary"]),
+                nulls=bytearray(column["nulls"]),
+            )
+            for column in result["columns"]
+        ],
+        "row_count": result["row_count"],
+        "has_more": result["has_more"],
+    }
+
+
+def _is_plain_arrow_type(data_type: "pa.DataType") -> bool:
+    return (
+        pa.types.is_integer(data_type)
+        or pa.types.is_floating(data_type)
+        or pa.types.is_boolean(data_type)
+        or pa.types.is_string(data_type)
+        or pa.types.is_large_string(data_type)
+        or pa.types.is_null(data_type)
+    )
+
+
+def _format_interval(value) -> str | None:
+    if value is None:
+        return None
+    parts = []
+    if value.months:
+        parts.append(f"{value.months} months")
+    if value.days:
+        parts.append(f"{value.days} days")
+    if value.nanoseconds or not parts:
+        parts.append(str(datetime.timedelta(microseconds=value.nanoseconds // 1000)))
+    return " ".join(parts)
+
+
+def _arrow_column_cells(column: "pa.ChunkedArray") -> list:
+    """Convert one Arrow column into renderable Python values."""
+    if _is_plain_arrow_type(column.type):
+        return column.to_pylist()
+    if pa.types.is_date(column.type) or pa.types.is_decimal(column.type):
+        return pc.cast(column, pa.string()).to_pylist()
+    if column.type == pa.month_day_nano_interval():
+        return [_format_interval(v) for v in column.to_pylist()]
+    return [_to_cell(v) for v in column.to_pylist()]
+
+
+def _arrow_columns(table: "pa.Table") -> list[list]:
+    """Convert an Arrow table into lists of cells, one per column."""
+    return [_arrow_column_cells(column) for column in table.columns]
+
+
+class _RowPager:
+    """Reads pages of rows from a DB-API cursor, returned column by column.
+
+    Each page read is spooled to an anonymous temp file rather than kept in
+    memory, so the grid, the rows route and the result stream can each go
+    back to any page read so far while only the page in hand is loaded. A
+    pager closes its cursor and drops its spool when it is closed.
+    """
+
+    def __init__(self, cursor):
+        self.cursor = cursor
+        self.columns = [col[0] for col in cursor.description]
+        self.shown = 0
+        self.exhausted = False
+        self.closed = False
+        self.lock = threading.RLock()
+        self._spool = tempfile.TemporaryFile()
+        self._offsets: list[tuple[int, int]] = []
+
+    def _read_page(self):
+        rows = self.cursor.fetchmany(RESULT_PAGE_SIZE)
+        if not rows:
+            return None
+        return [[_to_cell(v) for v in column] for column in zip(*rows)]
+
+    def _row_count(self, page) -> int:
+        return len(page[0])
+
+    def _dump(self, page) -> bytes:
+        return json.dumps(page).encode()
+
+    def _load(self, data: bytes):
+        return json.loads(data)
+
+    def cells(self, page) -> list[list]:
+        """Convert a page into lists of cells, one per column."""
+        return page
+
+    def table(self, page) -> "pa.Table":
+        """Convert a page into an Arrow table."""
+        return pa.Table.from_pydict(dict(zip(self.columns, page)))
+
+    @property
+    def pages_read(self) -> int:
+        return len(self._offsets)
+
+    def page(self, index: int):
+        """Get a page by position, reading up to it if needed, or None past the end."""
+        with self.lock:
+            while len(self._offsets) <= index and not self.exhausted:
+                if self.closed:
+                    raise RuntimeError("The result was closed before it was read.")
+                page = self._read_page()
+                if page is None:
+                    self.exhausted = True
+                    break
+                # A short page is the last one, as both readers fill pages fully.
+                self.exhausted = self._row_count(page) < RESULT_PAGE_SIZE
+                data = self._dump(page)
+                offset = self._spool.seek(0, os.SEEK_END)
+                self._spool.write(data)
+                self._offsets.append((offset, len(data)))
+                if len(self._offsets) > index:
+                    return page
+            return self.spooled(index)
+
+    def spooled(self, index: int):
+        """Get a page that was already read, or None; never reads the cursor."""
+        with self.lock:
+            if self.closed or index >= len(self._offsets):
+                return None
+            offset, size = self._offsets[index]
+            self._spool.seek(offset)
+            return self._load(self._spool.read(size))
+
+    def fetch(self) -> list[list]:
+        """Get the next page for the grid."""
+        with self.lock:
+            page = self.page(self.shown)
+            if page is None:
+                return [[] for _ in self.columns]
+            self.shown += 1
+        return self.cells(page)
+
+    def keep(self, result_id: str):
+        """Write the pages read so far to RESULT_STORE, so they outlive the cursor."""
+        with self.lock:
+            if self.closed or not self._offsets:
+                return
+            pages = (self.spooled(index) for index in range(len(self._offsets)))
+            cells = [[] for _ in self.columns]
+            for page in pages:
+                for column, column_cells in zip(cells, page):
+                    column.extend(column_cells)
+            RESULT_STORE.put(
+                result_id, _build_result(self.columns, cells, not self.exhausted)
+            )
+
+    def close(self):
+        with self.lock:
+            self.closed = True
+            self._spool.close()
+            self._release()
+
+    def _release(self):
+        self.cursor.close()
+
+
+class _ArrowPager(_RowPager):
+    """Reads pages of rows from a DuckDB result as a stream of Arrow batches.
+
+    The result stays columnar in DuckDB and Arrow; only the rows of the page
+    being fetched are converted to Python values, and pages are spooled and
+    kept as Arrow IPC.
+    """
+
+    def __init__(self, cursor: "duckdb.DuckDBPyConnection"):
+        super().__init__(cursor)
+        self.reader = cursor.to_arrow_reader(RESULT_PAGE_SIZE)
+        self.pending: "pa.RecordBatch | None" = None
+
+    def _read_page(self) -> "pa.Table | None":
+        batches = []
+        count = 0
+        while count < RESULT_PAGE_SIZE:
+            batch = self.pending
+            self.pending = None
+            if batch is None:
+                try:
+                    batch = self.reader.read_next_batch()
+                except StopIteration:
+                    break
+            if count + batch.num_rows > RESULT_PAGE_SIZE:
+                self.pending = batch.slice(RESULT_PAGE_SIZE - count)
+                batch = batch.slice(0, RESULT_PAGE_SIZE - count)
+            batches.append(batch)
+            count += batch.num_rows
+        if not count:
+            return None
+        return pa.Table.from_batches(batches)
+
+    def _row_count(self, page: "pa.Table") -> int:
+        return page.num_rows
+
+    def _dump(self, page: "pa.Table") -> bytes:
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, page.schema) as writer:
+            writer.write_table(page)
+        return sink.getvalue().to_pybytes()
+
+    def _load(self, data: bytes) -> "pa.Table":
+        return pa.ipc.open_stream(data).read_all()
+
+    def cells(self, page: "pa.Table") -> list[list]:
+        return _arrow_columns(page)
+
+    def table(self, page: "pa.Table") -> "pa.Table":
+        return page
+
+    def keep(self, result_id: str):
+        with self.lock:
+            if self.closed or not self._offsets:
+                return
+            schema = self.spooled(0).schema.with_metadata(
+                {"has_more": json.dumps(not self.exhausted)}
+            )
+            RESULT_STORE.put_tables(
+                result_id,
+                schema,
+                (self.spooled(index) for index in range(len(self._offsets))),
+            )
+
+    def _release(self):
+        self.reader.close()
+        super()._release()
+
+
+class _ResultCursorManager:
+    """Keeps server-side result cursors open so pages can be fetched on demand.
+
+    A result whose cursor is closed while it may still be on screen, because
+    it was read to its end, replaced or evicted, first has the rows read so
+    far written to RESULT_STORE, which serves them from then on.
+    """
+
+    _pagers: ClassVar[OrderedDict[str, _RowPager]] = OrderedDict()
+    _lock: ClassVar[threading.Lock] = threading.Lock()
+
+    @classmethod
+    def open(
+        cls,
+        result_id: str,
+        cursor,
+        sql: str,
+        timings: QueryTimings,
+        replaces: str = "",
+    ) -> tuple[list[str], list[list], bool]:
+        """Execute a query on a cursor and return its column names and first page.
+
+        This blocks until the database has produced the first page, so it is
+        run on QUERY_EXECUTOR rather than on the event loop. The plan, execute
+        and fetch phases are timed into timings. replaces names a result
+        still open on the same cursor, which is closed first.
+        """
+        cls.close(replaces, keep_rows=True)
+        try:
+            started = time.perf_counter()
+            if cls._prepare(cursor, sql):
+                timings["plan"] = _elapsed_ms(started)
+                started = time.perf_counter()
+                cursor.execute("EXECUTE orbit_query")
+            else:
+                cursor.execute(sql)
+            timings["execute"] = _elapsed_ms(started)
+        except Exception:
+            cursor.close()
+            raise
+        return cls._first_page(result_id, cursor, timings)
+
+    @classmethod
+    def open_prepared(
+        cls,
+        result_id: str,
+        session_token: str,
+        cursor,
+        sql: str,
+        params: dict[str, str],
+        timings: QueryTimings,
+        replaces: str = "",
+    ) -> tuple[list[str], list[list], bool]:
+        """Execute a parameterized query through the session's prepared statements.
+
+        Like open, this blocks and is run on QUERY_EXECUTOR, and the cursor
+        is the session's DuckDB execution cursor.
+        """
+        cls.close(replaces, keep_rows=True)
+        try:
+            PREPARED_STATEMENTS.execute(
+                session_token, drivers.arrow_connection(cursor), sql, params, timings
+            )
+        except Exception:
+            cursor.close()
+            raise
+        return cls._first_page(result_id, cursor, timings)
+
+    @classmethod
+    def _first_page(
+        cls, result_id: str, cursor, timings: QueryTimings
+    ) -> tuple[list[str], list[list], bool]:
+        if cursor.description is None:
+            cursor.close()
+            return [], [], False
+        columns = [col[0] for col in cursor.description]
+        if drivers.arrow_connection(cursor) is not None:
+            pager = _ArrowPager(cursor)
+        else:
+            pager = _RowPager(cursor)
+        with cls._lock:
+            cls._pagers[result_id] = pager
+            excess = list(cls._pagers)[:-MAX_OPEN_RESULT_CURSORS]
+        for evicted_id in excess:
+            cls.close(evicted_id, keep_rows=True)
+        started = time.perf_counter()
+        cells, has_more = cls.fetch_page(result_id)
+        timings["fetch"] = _elapsed_ms(started)
+        return columns, cells, has_more
+
+    @staticmethod
+    def _prepare(cursor, sql: str) -> bool:
+        """Prepare a single read-only DuckDB statement so planning can be timed."""
+        con = drivers.arrow_connection(cursor)
+        if con is None or not _is_read_only(_normalize_sql(sql)):
+            return False
+        try:
+            statements = con.extract_statements(sql)
+            if len(statements) != 1:
+                return False
+            con.execute(f"PREPARE orbit_query AS {statements[0].query}")
+        except duckdb.InterruptException:
+            raise
+        except duckdb.Error:
+            # Let the plain execute report the error, or run what PREPARE can't.
+            return False
+        return True
+
+    @classmethod
+    def fetch_page(cls, result_id: str) -> tuple[list[list], bool]:
+        """Fetch the next page of a result as column cells, closing it once exhausted.
+
+        Returns:
+            The page and whether more rows may follow. has_more is only False
+            once the result was read to its end.
+
+        Raises:
+            LookupError: If the result's cursor was closed or evicted.
+            Exception: Whatever reading the cursor raised; the result is
+                closed, so it can't be paged any further.
+        """
+        with cls._lock:
+            pager = cls._pagers.get(result_id)
+            if pager is None:
+                raise LookupError("The result's cursor is no longer open.")
+            cls._pagers.move_to_end(result_id)
+        try:
+            cells = pager.fetch()
+        except Exception:
+            cls.close(result_id, keep_rows=True)
+            raise
+        has_more = bool(cells) and len(cells[0]) == RESULT_PAGE_SIZE
+        if not has_more:
+            cls.close(result_id, keep_rows=True)
+        return cells, has_more
+
+    @classmethod
+    def is_open(cls, result_id: str) -> bool:
+        with cls._lock:
+            return result_id in cls._pagers
+
+    @classmethod
+    def pager(cls, result_id: str) -> _RowPager | None:
+        """Get the pager of a result that is still open, to stream it."""
+        with cls._lock:
+            return cls._pagers.get(result_id)
+
+    @classmethod
+    def close(cls, result_id: str, keep_rows: bool = False):
+        """Close the cursor for a result if it is still open.
+
+        With keep_rows, the rows read so far are stored before the pager is
+        let go, so the result can be read without a gap.
+        """
+        with cls._lock:
+            pager = cls._pagers.get(result_id)
+        if pager is None:
+            return
+        if keep_rows:
+            try:
+                pager.keep(result_id)
+            except Exception:
+                logger.exception("Could not store the rows of %s", result_id)
+        with cls._lock:
+            cls._pagers.pop(result_id, None)
+        pager.close()
+
+
+RESULT_CURSORS = _ResultCursorManager()
+
+# A PostgreSQL dollar-quoted string such as $$...$$ or $body$...$body$.
+# Other $ signs, such as $name parameters, stay part of the word around them.
+_DOLLAR_QUOTE = r"\$(?P<tag>(?:[A-Za-z_]\w*)?)\$.*?\$(?P=tag)\$"
+_DOLLAR_QUOTE_PATTERN = re.compile(_DOLLAR_QUOTE, re.DOTALL)
+_WORD_CHAR = r"(?:[^'\"`;\s/$-]|\$(?!(?:[A-Za-z_]\w*)?\$))"
+_SQL_TOKEN_PATTERN = re.compile(
+    rf"'(?:[^']|'')*'|\"(?:[^\"]|\"\")*\"|{_DOLLAR_QUOTE}|\s+|{_WORD_CHAR}+|.",
+    re.DOTALL,
+)
+_WRITE_PATTERN = re.compile(
+    r"\b(insert|update|delete|merge|create|drop|alter|copy|attach|detach)\b"
+)
+_VOLATILE_PATTERN = re.compile(
+    r"\b(random|uuid|gen_random_uuid|now|current_timestamp|current_date|"
+    r"current_time|today|get_current_timestamp|nextval|setseed|getvariable|"
+    r"current_setting|current_schema|current_user)\b"
+)
+
+
+def _tokens(pattern: re.Pattern, sql: str) -> list[str]:
+    return [match.group() for match in pattern.finditer(sql)]
+
+
+def _is_quoted(token: str) -> bool:
+    """Whether a token is a quoted string or name, including dollar quotes."""
+    return token[0] in "'\"`" or bool(_DOLLAR_QUOTE_PATTERN.fullmatch(token))
+
+
+def _normalize_sql(sql: str) -> str:
+    """Normalize SQL for cache lookups without touching quoted literals."""
+    parts = []
+    for token in _tokens(_SQL_TOKEN_PATTERN, sql.strip().rstrip(";").strip()):
+        if _is_quoted(token):
+            parts.append(token)
+        elif token.isspace():
+            parts.append(" ")
+        else:
+            parts.append(token.lower())
+    return "".join(parts)
+
+
+class _StatementParser:
+    """Classifies SQL with DuckDB's parser on a private connection."""
+
+    _con: ClassVar["duckdb.DuckDBPyConnection | None"] = None
+    _lock: ClassVar[threading.Lock] = threading.Lock()
+
+    @classmethod
+    def statement_types(cls, sql: str) -> list | None:
+        """Get the type of each statement in sql, or None if DuckDB can't parse it."""
+        with cls._lock:
+            if cls._con is None:
+                cls._con = duckdb.connect()
+            try:
+                return [
+                    statement.type for statement in cls._con.extract_statements(sql)
+                ]
+            except duckdb.Error:
+                return None
+
+
+STATEMENT_PARSER = _StatementParser()
+
+
+def _is_read_only(normalized_sql: str) -> bool:
+    """Whether a normalized text is exactly one statement that only reads data.
+
+    SQL that DuckDB can't parse, such as MySQL's backquoted names, falls
+    back to checking the keywords of its single statement.
+    """
+    types = STATEMENT_PARSER.statement_types(normalized_sql)
+    if types is not None:
+        return types == [duckdb.StatementType.SELECT]
+    statements = _split_statements(normalized_sql)
+    if len(statements) != 1:
+        return False
+    unquoted = re.sub(r"'(?:[^']|'')*'", "''", statements[0])
+    words = unquoted.split(None, 1)
+    return (
+        bool(words)
+        and words[0] in READ_ONLY_KEYWORDS
+        and not _WRITE_PATTERN.search(unquoted)
+    )
+
+
+_STATEMENT_TOKEN_PATTERN = re.compile(
+    r"'(?:[^']|'')*'|\"(?:[^\"]|\"\")*\"|`(?:[^`]|``)*`"
+    rf"|{_DOLLAR_QUOTE}|--[^\n]*|/\*.*?\*/|;|\s+|{_WORD_CHAR}+|.",
+    re.DOTALL,
+)
+_NL_REQUEST_PATTERN = re.compile('output\\("(.*)"\\)')
+
+
+def _split_statements(script: str) -> list[str]:
+    """Split a script on the semicolons outside quotes and comments.
+
+    Statements that are empty or only hold comments are dropped.
+    """
+    statements = []
+    tokens: list[str] = []
+    has_code = False
+    for token in _tokens(_STATEMENT_TOKEN_PATTERN, script):
+        if token == ";":
+            if has_code:
+                statements.append("".join(tokens).strip())
+            tokens, has_code = [], False
+            continue
+        tokens.append(token)
+        if not (token.isspace() or token.startswith(("--", "/*"))):
+            has_code = True
+    if has_code:
+        statements.append("".join(tokens).strip())
+    return statements
+
+
+_PARAMETER_PATTERN = re.compile(r"(?<![\w$])\$([A-Za-z_]\w*)")
+
+
+def _is_code_token(token: str) -> bool:
+    return not (_is_quoted(token) or token.startswith(("--", "/*")))
+
+
+def _query_parameters(sql: str) -> list[str]:
+    """List the $name placeholders outside quotes and comments, in order."""
+    names: list[str] = []
+    for token in _tokens(_STATEMENT_TOKEN_PATTERN, sql):
+        if _is_code_token(token):
+            names.extend(
+                name for name in _PARAMETER_PATTERN.findall(token) if name not in names
+            )
+    return names
+
+
+_NUMBER_LITERAL_PATTERN = re.compile(r"[+-]?(0|[1-9]\d*)(\.\d+)?([eE][+-]?\d+)?")
+
+
+def _parameter_literal(value: str) -> str:
+    """Turn a parameter value into a SQL literal of the type it looks like.
+
+    Numbers, true, false and NULL are passed as such and anything else as
+    text. A value in single quotes is always text, so '42' is a string and
+    '' an empty one. Numbers with leading zeros stay text, like zip codes.
+    """
+    text = value.strip()
+    if _NUMBER_LITERAL_PATTERN.fullmatch(text):
+        return text
+    if text.upper() in ("TRUE", "FALSE", "NULL"):
+        return text.upper()
+    if len(text) >= 2 and text[0] == text[-1] == "'":
+        return _quote_literal(text[1:-1])
+    return _quote_literal(value)
+
+
+def _missing_parameters(sql: str, params: dict[str, str]) -> list[str]:
+    """List the $name placeholders in sql that have no value set, in order."""
+    return [name for name in _query_parameters(sql) if not params.get(name, "").strip()]
+
+
+def _bind_parameters(sql: str, params: dict[str, str]) -> str:
+    """Inline parameter values as SQL literals, leaving unset placeholders as is.
+
+    The bound SQL is what the history, the result cache and result streams
+    see, so a result can be told apart from, and re-run without, its values.
+    """
+    return "".join(
+        (
+            _PARAMETER_PATTERN.sub(
+                lambda m: (
+                    _parameter_literal(params[m.group(1)])
+                    if params.get(m.group(1), "").strip()
+                    else m.group(0)
+                ),
+                token,
+            )
+            if _is_code_token(token)
+            else token
+        )
+        for token in _tokens(_STATEMENT_TOKEN_PATTERN, sql)
+    )
+
+
+class _SessionStatements:
+    def __init__(self, connection: "duckdb.DuckDBPyConnection"):
+        self.connection = connection
+        self.names: OrderedDict[str, str] = OrderedDict()
+
+
+class _PreparedStatementCache:
+    """Prepared statements for parameterized queries, kept per session.
+
+    A DuckDB prepared statement belongs to the connection that prepared it,
+    so statements are prepared on the session's execution connection, where
+    they also see its temp tables and variables. Running a statement again
+    with other values executes the prepared plan instead of parsing and
+    planning the SQL again. Values are passed to EXECUTE as literals of the
+    type they look like, so a statement whose parameter types DuckDB cannot
+    infer, such as SELECT $a + 1, still binds a number as a number.
+
+    A session's statements live as long as its pooled connection; closing
+    the connection deallocates them, and forget drops their names.
+    """
+
+    _sessions: ClassVar[dict[str, _SessionStatements]] = {}
+    _lock: ClassVar[threading.Lock] = threading.Lock()
+    _next_id: ClassVar[int] = 0
+
+    @classmethod
+    def execute(
+        cls,
+        session_token: str,
+        con: "duckdb.DuckDBPyConnection",
+        sql: str,
+        params: dict[str, str],
+        timings: QueryTimings,
+    ):
+        """Execute a statement with parameter values, preparing it on first use.
+
+        con is the session's execution connection. Its statements are
+        forgotten when the session moves to another connection.
+        """
+        with cls._lock:
+            entry = cls._sessions.get(session_token)
+            if entry is None or entry.connection is not con:
+                entry = _SessionStatements(con)
+                cls._sessions[session_token] = entry
+        key = _normalize_sql(sql)
+        name = entry.names.get(key)
+        started = time.perf_counter()
+        if name is None:
+            with cls._lock:
+                cls._next_id += 1
+                name = f"orbit_stmt_{cls._next_id}"
+            con.execute(f"PREPARE {name} AS {sql.strip().rstrip(';')}")
+            entry.names[key] = name
+            while len(entry.names) > MAX_PREPARED_STATEMENTS:
+                _, evicted = entry.names.popitem(last=False)
+                con.execute(f"DEALLOCATE {evicted}")
+            timings["plan"] = _elapsed_ms(started)
+            started = time.perf_counter()
+        else:
+            entry.names.move_to_end(key)
+        arguments = ", ".join(
+            f"{param} := {_parameter_literal(params[param])}"
+            for param in _query_parameters(sql)
+        )
+        con.execute(f"EXECUTE {name}({arguments})")
+        timings["execute"] = _elapsed_ms(started)
+
+    @classmethod
+    def forget(cls, con: "duckdb.DuckDBPyConnection | None"):
+        """Drop the statements of the session whose connection is being closed."""
+        with cls._lock:
+            for session_token, entry in list(cls._sessions.items()):
+                if entry.connection is con:
+                    del cls._sessions[session_token]
+
+
+PREPARED_STATEMENTS = _PreparedStatementCache()
+
+
+def _estimate_result_bytes(result: QueryResult) -> int:
+    """Roughly estimate the memory held by a result's columns."""
+    size = 64
+    for column in result["columns"]:
+        size += 64 + len(column["nulls"]) + 8 * len(column["values"])
+        strings = column["values"] if column["kind"] == "str" else column["dictionary"]
+        size += sum(len(value) + 49 for value in strings)
+    return size
+
+
+class _DataVersions:
+    """Counts writes per catalog so cached results can be invalidated."""
+
+    _versions: ClassVar[dict[str, int]] = {}
+    _lock: ClassVar[threading.Lock] = threading.Lock()
+
+    @classmethod
+    def get(cls, catalog_key: str) -> int:
+        with cls._lock:
+            return cls._versions.get(catalog_key, 0)
+
+    @classmethod
+    def bump(cls, catalog_key: str):
+        """Record that data in a catalog may have changed."""
+        with cls._lock:
+            cls._versions[catalog_key] = cls._versions.get(catalog_key, 0) + 1
+
+
+DATA_VERSIONS = _DataVersions()
+
+
+class _ResultCache:
+    """An LRU cache of complete query results bounded by an estimated byte size.
+
+    Sessions on the same catalog share results, except a session that may
+    hold state of its own, whose results are kept apart under its token.
+    """
+
+    _entries: ClassVar[OrderedDict[tuple, tuple[QueryResult, int]]] = OrderedDict()
+    _bytes: ClassVar[int] = 0
+    _lock: ClassVar[threading.Lock] = threading.Lock()
+
+    @classmethod
+    def key(cls, driver: drivers.Driver, sql: str, session_token: str) -> tuple | None:
+        """Build the cache key for a statement, or None if it must not be cached."""
+        if not driver.caches_results:
+            return None
+        normalized = _normalize_sql(sql)
+        if not _is_read_only(normalized) or _VOLATILE_PATTERN.search(normalized):
+            return None
+        return (
+            driver.catalog_key,
+            session_token if DB_POOL.has_private_state(session_token) else "",
+            DATA_VERSIONS.get(driver.catalog_key),
+            normalized,
+        )
+
+    @classmethod
+    def get(cls, key: tuple) -> QueryResult | None:
+        with cls._lock:
+            entry = cls._entries.get(key)
+            if entry is None:
+                return None
+            cls._entries.move_to_end(key)
+        return _copy_result(entry[0])
+
+    @classmethod
+    def put(cls, key: tuple, result: QueryResult):
+        """Cache a complete result if it fits in the byte budget."""
+        size = _estimate_result_bytes(result)
+        if size > RESULT_CACHE_MAX_BYTES:
+            return
+        with cls._lock:
+            previous = cls._entries.pop(key, None)
+            if previous is not None:
+                cls._bytes -= previous[1]
+            cls._entries[key] = (result, size)
+            cls._bytes += size
+            while cls._bytes > RESULT_CACHE_MAX_BYTES:
+                _, (_, evicted_size) = cls._entries.popitem(last=False)
+                cls._bytes -= evicted_size
+
+
+RESULT_CACHE = _ResultCache()
+
+# Arrow type factories by result column kind; ints are left for Arrow to infer.
+_ARROW_KIND_TYPES = {
+    "float": "float64",
+    "bool": "bool_",
+    "str": "string",
+    "dict": "string",
+}
+
+
+def _result_to_arrow(result: QueryResult) -> "pa.Table":
+    """Convert a columnar QueryResult into an Arrow table."""
+    arrays = []
+    for column in result["columns"]:
+        cells = _decode_column(column, 0, result["row_count"])
+        type_factory = _ARROW_KIND_TYPES.get(column["kind"])
+        array = pa.array(
+            cells, type=getattr(pa, type_factory)() if type_factory else None
+        )
+        arrays.append(array.dictionary_encode() if column["kind"] == "dict" else array)
+    names = [column["name"] for column in result["columns"]]
+    metadata = {"has_more": json.dumps(result["has_more"])}
+    return pa.Table.from_arrays(arrays, names=names, metadata=metadata)
+
+
+def _result_from_arrow(table: "pa.Table") -> QueryResult:
+    """Convert an Arrow table written by _result_to_arrow back into a QueryResult."""
+    metadata = table.schema.metadata or {}
+    return _build_result(
+        table.column_names,
+        _arrow_columns(table),
+        json.loads(metadata.get(b"has_more", b"false")),
+    )
+
+
+def _even_batches(tables, rows: int):
+    """Re-cut a stream of Arrow tables into record batches of the given size.
+
+    Only the last batch may be shorter; a stream with no rows yields nothing.
+    """
+    pending = None
+    for table in tables:
+        pending = table if pending is None else pa.concat_tables([pending, table])
+        while pending.num_rows >= rows:
+            yield from pending.slice(0, rows).combine_chunks().to_batches()
+            pending = pending.slice(rows)
+    if pending is not None and pending.num_rows:
+        yield from pending.combine_chunks().to_batches()
+
+
+class _ResultStore:
+    """An LRU store of query results spilled to Arrow IPC files on local disk.
+
+    Only the result on screen lives in session state; the others are written
+    here and read back when their history entry is opened again. Files are
+    evicted, least recently used first, once RESULT_STORE_MAX_BYTES is reached.
+    """
+
+    _files: ClassVar[OrderedDict[str, int]] = OrderedDict()
+    _bytes: ClassVar[int] = 0
+    _scanned: ClassVar[bool] = False
+    _archived: ClassVar[dict[str, tuple[str, str]]] = {}
+    _lock: ClassVar[threading.Lock] = threading.Lock()
+
+    @staticmethod
+    def _path(result_id: str) -> str:
+        # Imported sessions supply their own ids, so never use them as paths.
+        name = hashlib.sha1(result_id.encode()).hexdigest()
+        return os.path.join(RESULT_STORE_DIR, f"{name}.arrow")
+
+    @classmethod
+    def _scan(cls):
+        """Index files left by an earlier process, oldest first."""
+        os.makedirs(RESULT_STORE_DIR, exist_ok=True)
+        entries = sorted(
+            (entry for entry in os.scandir(RESULT_STORE_DIR) if entry.is_file()),
+            key=lambda entry: entry.stat().st_mtime,
+        )
+        for entry in entries:
+            cls._files[entry.path] = entry.stat().st_size
+            cls._bytes += entry.stat().st_size
+        cls._scanned = True
+
+    @classmethod
+    def put(cls, result_id: str, result: QueryResult):
+        """Write a result to disk, evicting old results beyond the size cap."""
+        cls.put_arrow(result_id, _result_to_arrow(result))
+
+    @classmethod
+    def put_arrow(cls, result_id: str, table: "pa.Table"):
+        cls.put_tables(result_id, table.schema, [table])
+
+    @classmethod
+    def put_tables(cls, result_id: str, schema: "pa.Schema", tables):
+        """Write a result given as Arrow tables, holding only a batch's worth at a time.
+
+        Every record batch but the last has RESULT_STORE_BATCH_ROWS rows, as
+        the file's metadata says, so a reader can find a row's batch directly.
+        """
+        path = cls._path(result_id)
+        with cls._lock:
+            if not cls._scanned:
+                cls._scan()
+        schema = schema.with_metadata(
+            {
+                **(schema.metadata or {}),
+                RESULT_STORE_BATCH_ROWS_KEY: str(RESULT_STORE_BATCH_ROWS).encode(),
+            }
+        )
+        # Written aside and moved into place, so readers never see half a file.
+        partial = f"{path}.{uuid.uuid4().hex}.partial"
+        options = pa.ipc.IpcWriteOptions(compression="zstd")
+        try:
+            with pa.ipc.new_file(partial, schema, options=options) as writer:
+                for batch in _even_batches(tables, RESULT_STORE_BATCH_ROWS):
+                    writer.write_batch(batch)
+            os.replace(partial, path)
+        except BaseException:
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(partial)
+            raise
+        size = os.path.getsize(path)
+        with cls._lock:
+            cls._bytes += size - cls._files.pop(path, 0)
+            cls._files[path] = size
+            evicted = []
+            while cls._bytes > RESULT_STORE_MAX_BYTES and len(cls._files) > 1:
+                evicted_path, evicted_size = cls._files.popitem(last=False)
+                cls._bytes -= evicted_size
+                evicted.append(evicted_path)
+        for evicted_path in evicted:
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(evicted_path)
+
+    @classmethod
+    def get(cls, result_id: str) -> QueryResult | None:
+        """Read a stored result back, or None if it was evicted."""
+        table = cls.get_arrow(result_id)
+        return None if table is None else _result_from_arrow(table)
+
+    @classmethod
+    def get_arrow(cls, result_id: str) -> "pa.Table | None":
+        reader = cls.open_file(result_id)
+        return None if reader is None else reader.read_all()
+
+    @classmethod
+    def open_file(cls, result_id: str) -> "pa.ipc.RecordBatchFileReader | None":
+        """Open a stored result to read it a record batch at a time."""
+        path = cls._path(result_id)
+        with cls._lock:
+            if not cls._scanned:
+                cls._scan()
+            archived = cls._archived.get(result_id)
+            stored = path in cls._files
+            if stored:
+                cls._files.move_to_end(path)
+        if not stored and (
+            archived is None or cls._load_archived(result_id, *archived) is None
+        ):
+            return None
+        try:
+            return pa.ipc.open_file(pa.memory_map(path))
+        except FileNotFoundError:
+            with cls._lock:
+                cls._bytes -= cls._files.pop(path, 0)
+            return None
+
+    @classmethod
+    def contains(cls, result_id: str) -> bool:
+        with cls._lock:
+            return cls._path(result_id) in cls._files or result_id in cls._archived
+
+    @classmethod
+    def discard(cls, result_id: str):
+        """Delete a stored result that is no longer referenced."""
+        path = cls._path(result_id)
+        with cls._lock:
+            cls._bytes -= cls._files.pop(path, 0)
+            cls._archived.pop(result_id, None)
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(path)
+
+    @classmethod
+    def add_archived(cls, result_id: str, archive_path: str, member: str):
+        """Note that a result can be read from an imported .orb archive.
+
+        Nothing is read until the result is first requested; it is then
+        copied into the store like any other spilled result.
+        """
+        with cls._lock:
+            cls._archived[result_id] = (archive_path, member)
+
+    @classmethod
+    def _load_archived(cls, result_id: str, archive_path: str, member: str):
+        try:
+            with zipfile.ZipFile(archive_path) as archive:
+                with archive.open(member) as f:
+                    table = pq.ParquetFile(f).read()
+        except FileNotFoundError:
+            return None
+        cls.put_arrow(result_id, table)
+        return table
+
+    @classmethod
+    def release_archive(cls, archive_path: str):
+        """Forget an imported archive's results and delete the archive."""
+        with cls._lock:
+            for result_id, (path, _) in list(cls._archived.items()):
+                if path == archive_path:
+                    del cls._archived[result_id]
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(archive_path)
+
+
+RESULT_STORE = _ResultStore()
+
+
+def _write_session_archive(
+    path: str, session_data: dict, unstored: dict[str, QueryResult]
+):
+    """Write a v2 .orb archive: a JSON manifest plus one Parquet file per result.
+
+    Results are read from RESULT_STORE and written into the archive one at a
+    time, so exporting never holds more than one result in memory.
+
+    Args:
+        path: Where to write the archive.
+        session_data: The manifest, with one metadata item per history entry.
+        unstored: Results that are only in session state, by id.
+    """
+    with zipfile.ZipFile(path, "w") as archive:
+        for i, item in enumerate(session_data["query_history"]):
+            if item["id"] in unstored:
+                table = _result_to_arrow(unstored[item["id"]])
+            else:
+                table = RESULT_STORE.get_arrow(item["id"])
+            item["result_file"] = None
+            if table is None:
+                continue
+            name = f"results/{i:05d}.parquet"
+            with archive.open(name, "w", force_zip64=True) as out:
+                pq.write_table(table, out, compression="zstd")
+            item["result_file"] = name
+        archive.writestr(
+            SESSION_MANIFEST_NAME,
+            json.dumps(session_data),
+            compress_type=zipfile.ZIP_DEFLATED,
+        )
+
+
+def _read_session_file(path: str) -> tuple[dict, bool]:
+    """Read an .orb file's manifest and make its results available by id.
+
+    A v2 archive is only indexed: its results stay in the archive until they
+    are opened, so the archive must be kept until then. A v1 file stores its
+    results inline, so they are moved into RESULT_STORE straight away.
+    Every history item gets a new result id, so a file imported by several
+    sessions, or one naming ids already in use, cannot replace or share
+    another session's results.
+
+    Returns:
+        The session data, with history items as metadata only, and whether
+        the file is an archive that results will be read from.
+    """
+    if not zipfile.is_zipfile(path):
+        with open(path, "rb") as f:
+            session_data = json.load(f)
+        for item in session_data.get("query_history", []):
+            item["id"] = str(uuid.uuid4())
+            results = item.pop("results", None)
+            if results is None:
+                continue
+            if "rows" in results:
+                results = _result_from_rows(results["columns"], results["rows"])
+            item["row_count"] = results["row_count"]
+            RESULT_STORE.put(item["id"], results)
+        return session_data, False
+    with zipfile.ZipFile(path) as archive:
+        session_data = json.loads(archive.read(SESSION_MANIFEST_NAME))
+    for item in session_data.get("query_history", []):
+        item["id"] = str(uuid.uuid4())
+        name = item.pop("result_file", None)
+        if name is not None:
+            RESULT_STORE.add_archived(item["id"], path, name)
+    return session_data, True
+
+
+def _schema_changes(
+    before: list[Database], after: list[Database]
+) -> tuple[int, int, int]:
+    """Count the tables missing, added and changed between two schemas."""
+
+    def tables(schema: list[Database]) -> dict[tuple[str, str], list]:
+        return {
+            (db["name"], table["name"]): [
+                (column["name"], column["type"]) for column in table["columns"]
+            ]
+            for db in schema
+            for table in db["tables"]
+        }
+
+    old, new = tables(before), tables(after)
+    changed = sum(1 for key in old.keys() & new.keys() if old[key] != new[key])
+    return len(old.keys() - new.keys()), len(new.keys() - old.keys()), changed
+
+
+class _SessionExports:
+    """Exported session files waiting to be downloaded once."""
+
+    _paths: ClassVar[OrderedDict[str, str]] = OrderedDict()
+    _lock: ClassVar[threading.Lock] = threading.Lock()
+
+    @classmethod
+    def add(cls, path: str) -> str:
+        """Register an exported file, returning the id to download it by."""
+        export_id = str(uuid.uuid4())
+        with cls._lock:
+            cls._paths[export_id] = path
+            evicted = []
+            while len(cls._paths) > MAX_PENDING_SESSION_EXPORTS:
+                evicted.append(cls._paths.popitem(last=False)[1])
+        for evicted_path in evicted:
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(evicted_path)
+        return export_id
+
+    @classmethod
+    def pop(cls, export_id: str) -> str | None:
+        """Take an exported file for download; the caller deletes it afterwards."""
+        with cls._lock:
+            return cls._paths.pop(export_id, None)
+
+
+SESSION_EXPORTS = _SessionExports()
+
+QUERY_EXECUTOR = ThreadPoolExecutor(
+    max_workers=QUERY_WORKERS, thread_name_prefix="orbit-query"
+)
+METADATA_EXECUTOR = ThreadPoolExecutor(
+    max_workers=METADATA_WORKERS, thread_name_prefix="orbit-metadata"
+)
+
+
+class _RunningQueryRegistry:
+    """Tracks the cursor each session is currently executing on."""
+
+    _running: ClassVar[dict[str, "duckdb.DuckDBPyConnection"]] = {}
+    _lock: ClassVar[threading.Lock] = threading.Lock()
+
+    @classmethod
+    def register(cls, session_token: str, cursor):
+        """Record the cursor a session's query is running on."""
+        with cls._lock:
+            cls._running[session_token] = cursor
+
+    @classmethod
+    def unregister(cls, session_token: str):
+        """Forget a session's running query once it has finished."""
+        with cls._lock:
+            cls._running.pop(session_token, None)
+
+    @classmethod
+    def is_running(cls, session_token: str) -> bool:
+        with cls._lock:
+            return session_token in cls._running
+
+    @classmethod
+    def interrupt(cls, session_token: str) -> bool:
+        """Interrupt a session's running query, returning whether one was found."""
+        with cls._lock:
+            cursor = cls._running.get(session_token)
+        if cursor is None:
+            return False
+        cursor.interrupt()
+        return True
+
+
+RUNNING_QUERIES = _RunningQueryRegistry()
+
+
+class _QueryTicket:
+    """A query waiting for, or holding, a slot from the scheduler."""
+
+    def __init__(self, session_token: str, preview: bool):
+        self.session_token = session_token
+        self.preview = preview
+        self.granted = asyncio.Event()
+        self.cancelled = False
+
+
+class _QueryScheduler:
+    """Decides when each session's queries may run.
+
+    A session runs one query at a time, in the order it submitted them. At
+    most MAX_CONCURRENT_QUERIES run across all sessions, handed out to the
+    waiting sessions round-robin so a session with a long queue can't
+    starve the others. Table previews skip ahead of queued queries and may
+    use PREVIEW_QUERY_SLOTS more slots. It is only used from the event
+    loop, so it takes no lock.
+    """
+
+    _queues: ClassVar[OrderedDict[str, deque[_QueryTicket]]] = OrderedDict()
+    _previews: ClassVar[deque[_QueryTicket]] = deque()
+    _running: ClassVar[dict[str, _QueryTicket]] = {}
+
+    @classmethod
+    def submit(cls, session_token: str, preview: bool) -> _QueryTicket | None:
+        """Queue a query, or return None if the session's queue is full."""
+        if cls.pending(session_token) >= MAX_QUEUED_QUERIES_PER_SESSION:
+            return None
+        ticket = _QueryTicket(session_token, preview)
+        if preview:
+            cls._previews.append(ticket)
+        else:
+            cls._queues.setdefault(session_token, deque()).append(ticket)
+        cls._dispatch()
+        return ticket
+
+    @classmethod
+    def release(cls, ticket: _QueryTicket):
+        """Give up a ticket's place or slot, letting the next query start."""
+        if cls._running.get(ticket.session_token) is ticket:
+            del cls._running[ticket.session_token]
+        else:
+            cls._discard(ticket)
+        cls._dispatch()
+
+    @classmethod
+    def cancel(cls, session_token: str) -> int:
+        """Cancel a session's queued queries, returning how many there were."""
+        tickets = [t for t in cls._previews if t.session_token == session_token]
+        tickets.extend(cls._queues.get(session_token, ()))
+        for ticket in tickets:
+            cls._discard(ticket)
+            ticket.cancelled = True
+            ticket.granted.set()
+        return len(tickets)
+
+    @classmethod
+    def pending(cls, session_token: str) -> int:
+        """Count a session's running and queued queries."""
+        return (
+            (session_token in cls._running)
+            + len(cls._queues.get(session_token, ()))
+            + sum(t.session_token == session_token for t in cls._previews)
+        )
+
+    @classmethod
+    def position(cls, session_token: str) -> int:
+        """Get how many queries start before the session's next one, plus one.
+
+        Returns 0 if the session has nothing queued.
+        """
+        for position, ticket in enumerate(cls._dispatch_order(), start=1):
+            if ticket.session_token == session_token:
+                return position
+        return 0
+
+    @classmethod
+    def _dispatch_order(cls):
+        """Yield queued tickets in the order they would start if slots were free."""
+        yield from cls._previews
+        queues = [list(queue) for queue in cls._queues.values()]
+        for turn in range(max(map(len, queues), default=0)):
+            for queue in queues:
+                if turn < len(queue):
+                    yield queue[turn]
+
+    @classmethod
+    def _discard(cls, ticket: _QueryTicket):
+        if ticket.preview:
+            with contextlib.suppress(ValueError):
+                cls._previews.remove(ticket)
+            return
+        queue = cls._queues.get(ticket.session_token)
+        if queue is not None and ticket in queue:
+            queue.remove(ticket)
+            if not queue:
+                del cls._queues[ticket.session_token]
+
+    @classmethod
+    def _grant(cls, ticket: _QueryTicket):
+        cls._running[ticket.session_token] = ticket
+        ticket.granted.set()
+
+    @classmethod
+    def _dispatch(cls):
+        for ticket in list(cls._previews):
+            if len(cls._running) >= MAX_CONCURRENT_QUERIES + PREVIEW_QUERY_SLOTS:
+                return
+            if ticket.session_token not in cls._running:
+                cls._previews.remove(ticket)
+                cls._grant(ticket)
+        for session_token in list(cls._queues):
+            if len(cls._running) >= MAX_CONCURRENT_QUERIES:
+                return
+            if session_token in cls._running:
+                continue
+            queue = cls._queues.pop(session_token)
+            cls._grant(queue.popleft())
+            if queue:
+                # Back of the rotation, behind the sessions still waiting.
+                cls._queues[session_token] = queue
+
+
+QUERY_SCHEDULER = _QueryScheduler()
+
+
+async def _scheduled_call(session_token: str, fn: Callable, *args):
+    """Run blocking database work once the scheduler grants the session a slot.
+
+    This is for work other than the editor's queries, such as table
+    statistics, profiles, imports and result streams, so it counts against
+    the same limits. It waits in the session's queue like a query; the
+    preview lane is left to table previews.
+
+    Raises:
+        drivers.QueryCancelled: If the session cancelled it while it was queued.
+        RuntimeError: If the session's queue is full.
+    """
+    ticket = QUERY_SCHEDULER.submit(session_token, preview=False)
+    if ticket is None:
+        raise RuntimeError("Too many queries are queued.")
+    try:
+        await ticket.granted.wait()
+        if ticket.cancelled:
+            raise drivers.QueryCancelled()
+        return await asyncio.get_running_loop().run_in_executor(
+            QUERY_EXECUTOR, fn, *args
+        )
+    finally:
+        QUERY_SCHEDULER.release(ticket)
+
+
+class _ResultStreamRegistry:
+    """Remembers which session produced each recent result, so it can be streamed.
+
+    The result stream route never runs the statement again: it reads a
+    result that is still open from its pager and any other one from
+    RESULT_STORE, where complete results are written.
+    """
+
+    _results: ClassVar[OrderedDict[str, str]] = OrderedDict()
+    _lock: ClassVar[threading.Lock] = threading.Lock()
+
+    @classmethod
+    def register(cls, result_id: str, session_token: str):
+        """Make a result streamable."""
+        with cls._lock:
+            cls._results[result_id] = session_token
+            while len(cls._results) > MAX_STREAMABLE_RESULTS:
+                cls._results.popitem(last=False)
+
+    @classmethod
+    def get(cls, result_id: str) -> str | None:
+        """Get the token of the session a result belongs to."""
+        with cls._lock:
+            return cls._results.get(result_id)
+
+    @classmethod
+    def contains(cls, result_id: str) -> bool:
+        with cls._lock:
+            return result_id in cls._results
+
+
+RESULT_STREAMS = _ResultStreamRegistry()
+
+
+def _flatten_profile(node: dict, depth: int, operators: list[ProfileOperator]):
+    """Flatten a DuckDB JSON profile tree into operators in plan order."""
+    for child in node.get("children", []):
+        if child.get("operator_type") == "EXPLAIN_ANALYZE":
+            _flatten_profile(child, depth, operators)
+            continue
+        operators.append(
+            ProfileOperator(
+                name=child.get("operator_name") or child.get("operator_type", ""),
+                depth=depth,
+                time_ms=round(child.get("operator_timing", 0.0) * 1000, 3),
+                rows=child.get("operator_cardinality", 0),
+            )
+        )
+        _flatten_profile(child, depth + 1, operators)
+
+
+def _profile_query(
+    driver: drivers.Driver, sql: str
+) -> tuple[str, list[ProfileOperator]]:
+    """Run a read-only statement under EXPLAIN ANALYZE.
+
+    Returns:
+        A summary or the database's plan text, and, on DuckDB, the operators
+        of its JSON profile.
+    """
+    statement = sql.strip().rstrip(";")
+    cursor = driver.cursor()
+    try:
+        if isinstance(cursor, duckdb.DuckDBPyConnection):
+            cursor.execute(f"EXPLAIN (ANALYZE, FORMAT JSON) {statement}")
+            profile = json.loads(cursor.fetchall()[0][1])
+            operators: list[ProfileOperator] = []
+            _flatten_profile(profile, 0, operators)
+            summary = (
+                f"Total {profile.get('latency', 0.0) * 1000:.3f} ms, "
+                f"CPU {profile.get('cpu_time', 0.0) * 1000:.3f} ms, "
+                f"{profile.get('cumulative_rows_scanned', 0)} rows scanned"
+            )
+            return summary, operators
+        cursor.execute(f"EXPLAIN ANALYZE {statement}")
+        rows = cursor.fetchmany(10000)
+        return "\n".join(" ".join(str(v) for v in row) for row in rows), []
+    finally:
+        cursor.close()
+
+
+_BINNABLE_TYPE_PATTERN = re.compile(
+    r"^(U?(TINYINT|SMALLINT|INTEGER|BIGINT|HUGEINT)|FLOAT|DOUBLE|DECIMAL.*"
+    r"|DATE|TIMESTAMP(_S|_MS|_NS)?)$"
+)
 
-    name: str
-    columns: list[Column]
 
+def _histogram_bins(histogram: dict | None) -> list[HistogramBin]:
+    if not histogram:
+        return []
+    largest = max(histogram.values()) or 1
+    return [
+        HistogramBin(
+            label=str(_to_cell(value)),
+            count=count,
+            percent=round(count * 100 / largest, 1),
+        )
+        for value, count in histogram.items()
+    ]
 
-class Database(TypedDict):
-    """A database with its tables."""
 
-    name: str
-    tables: list[Table]
+def _table_stats(driver: drivers.Driver, table_info: Table) -> TableStats:
+    """Summarize a DuckDB table's columns, over a reservoir sample if it is big.
 
+    Numeric and temporal columns get equal-width histograms; other columns
+    get one bar per value when they have few distinct values. Each histogram
+    is its own query, so a column DuckDB cannot bin just goes without one.
+    """
+    table = _qualified_name(table_info, _quote_identifier)
+    cursor = driver.cursor()
+    try:
+        (row_count,) = cursor.execute(f"SELECT count(*) FROM {table}").fetchone()
+        source = table
+        sample_rows = 0
+        if row_count > TABLE_STATS_SAMPLE_THRESHOLD_ROWS:
+            # A temp table, so the sample is drawn once for all the queries below.
+            cursor.execute(
+                "CREATE OR REPLACE TEMP TABLE orbit_stats_sample AS "
+                f"SELECT * FROM {table} USING SAMPLE {TABLE_STATS_SAMPLE_ROWS} "
+                f"ROWS (reservoir, {TABLE_STATS_SAMPLE_SEED})"
+            )
+            source = "orbit_stats_sample"
+            sample_rows = TABLE_STATS_SAMPLE_ROWS
+        summary = cursor.execute(f"SUMMARIZE SELECT * FROM {source}").fetchall()
+        histograms: dict[str, str] = {}
+        for name, column_type, low, high, approx_unique, *_ in summary:
+            column = _quote_identifier(name)
+            if low is None:
+                continue
+            if _BINNABLE_TYPE_PATTERN.match(column_type):
+                bounds = ", ".join(
+                    f"CAST({_quote_literal(bound)} AS {column_type})"
+                    for bound in (low, high)
+                )
+                histograms[name] = (
+                    f"histogram({column}, equi_width_bins({bounds}, "
+                    f"{TABLE_STATS_HISTOGRAM_BINS}, true))"
+                )
+            elif approx_unique <= TABLE_STATS_HISTOGRAM_BINS:
+                histograms[name] = f"histogram({column})"
+        by_column = {}
+        for name, histogram in histograms.items():
+            try:
+                (by_column[name],) = cursor.execute(
+                    f"SELECT {histogram} FROM {source}"
+                ).fetchone()
+            except duckdb.Error:
+                logger.exception(
+                    "Could not build a histogram for %s of %s", name, table
+                )
+        if sample_rows:
+            cursor.execute("DROP TABLE orbit_stats_sample")
+    finally:
+        cursor.close()
+    return TableStats(
+        table=table_info["name"],
+        row_count=row_count,
+        sample_rows=sample_rows,
+        columns=[
+            ColumnStats(
+                name=name,
+                type=column_type,
+                null_percent=float(null_percent or 0),
+                approx_unique=approx_unique or 0,
+                min="" if low is None else low,
+                max="" if high is None else high,
+                histogram=_histogram_bins(by_column.get(name)),
+            )
+            for name, column_type, low, high, approx_unique, *_, null_percent in summary
+        ],
+        error="",
+    )
 
-class QueryResult(TypedDict):
-    columns: list[str]
-    rows: list[list[str | int | float | bool | None]]
 
+def _stats_error(table: str, error: str) -> TableStats:
+    return TableStats(table=table, row_count=0, sample_rows=0, columns=[], error=error)
 
-class QueryHistoryItem(TypedDict):
-    id: str
-    natural_language: str
-    generated_sql: str
-    results: QueryResult
-    execution_time: float
-    timestamp: str
 
+class _TableStatsCache:
+    """Caches table statistics until the data in their catalog changes."""
 
-class _DBConnectionManager:
-    """Manages the database connection."""
+    _entries: ClassVar[OrderedDict[tuple, TableStats]] = OrderedDict()
+    _lock: ClassVar[threading.Lock] = threading.Lock()
 
-    _con: ClassVar[duckdb.DuckDBPyConnection | None] = None
+    @classmethod
+    def key(cls, driver: drivers.Driver, table: Table) -> tuple:
+        return (
+            driver.catalog_key,
+            DATA_VERSIONS.get(driver.catalog_key),
+            _qualified_name(table, _quote_identifier),
+        )
 
     @classmethod
-    def get_con(cls):
-        """Get the database connection."""
-        if cls._con is None:
-            cls._con = duckdb.connect(database=":memory:", read_only=False)
-        return cls._con
+    def get(cls, key: tuple) -> TableStats | None:
+        with cls._lock:
+            stats = cls._entries.get(key)
+            if stats is not None:
+                cls._entries.move_to_end(key)
+            return stats
 
     @classmethod
-    def set_con(cls, con):
-        """Set the database connection."""
-        cls._con = con
+    def put(cls, key: tuple, stats: TableStats):
+        with cls._lock:
+            cls._entries[key] = stats
+            cls._entries.move_to_end(key)
+            while len(cls._entries) > MAX_CACHED_TABLE_STATS:
+                cls._entries.popitem(last=False)
 
 
-DB_SESSION = _DBConnectionManager()
+TABLE_STATS = _TableStatsCache()
+
+
+def _column_widths(columns: list[str], rows: list[list]) -> list[int]:
+    """Estimate fixed pixel widths for result columns from a sample of rows."""
+    widths = []
+    for i, name in enumerate(columns):
+        chars = max([len(str(name))] + [len(str(row[i])) for row in rows])
+        widths.append(min(max(chars * 8 + 32, 80), 320))
+    return widths
 
 
 class UIState(rx.State):
@@ -104,6 +2739,8 @@ class UIState(rx.State):
     @rx.event
     def set_active_editor_tab(self, tab_name: str):
         self.active_editor_tab = tab_name
+        if tab_name == "column_stats":
+            return DBState.load_selected_table_stats
 
     @rx.event
     def set_active_menu(self, menu_name: str):
@@ -118,109 +2755,321 @@ class UIState(rx.State):
 
 
 class DBState(rx.State):
-    """The state for managing database connections and schema."""
+    """The state for managing database connections and schema.
 
-    schema: list[Database] = []
+    The full schema is kept in backend-only vars; the client only receives
+    database names, a bounded page of table names for the open database and
+    the columns of the table that is expanded in the sidebar.
+    """
+
+    _schema: list[Database] = rx.field(default_factory=list)
+    _catalog: Catalog | None = None
+    _table_index: dict[str, list[tuple[str, str]]] = rx.field(default_factory=dict)
+    database_names: list[str] = rx.field(default_factory=list)
+    sidebar_tables: list[str] = rx.field(default_factory=list)
+    hidden_table_count: int = 0
+    table_filter: str = ""
+    expanded_table: str = ""
+    expanded_columns: list[Column] = rx.field(default_factory=list)
+    stats_table: str = ""
+    table_stats: TableStats = rx.field(default_factory=lambda: _stats_error("", ""))
+    is_loading_table_stats: bool = False
+    _selected_stats_table: tuple[str, str] = ("", "")
     is_connecting: bool = False
-    supported_db_types: list[str] = ["duckdb", "mysql", "postgresql", "sqlite"]
-    db_form_data: dict[str, str] = {
-        "db_type": "duckdb",
-        "host": "",
-        "port": "",
-        "user": "",
-        "password": "",
-        "database": ":memory:",
-    }
+    supported_db_types: list[str] = rx.field(
+        default_factory=lambda: ["duckdb", "mysql", "postgresql", "sqlite"]
+    )
+    db_form_data: dict[str, str] = rx.field(
+        default_factory=lambda: {
+            "db_type": "duckdb",
+            "host": "",
+            "port": "",
+            "user": "",
+            "password": "",
+            "database": ":memory:",
+        }
+    )
 
     @rx.event(background=True)
     async def initialize_db(self):
-        """Initialize the in-memory database with sample data."""
+        """Connect a page load to the workspace, loading sample data on first boot.
+
+        A session that already has a schema, such as on a reload, is left as
+        it is.
+        """
         async with self:
-            ui_state = await self.get_state(UIState)
-            ui_state.status_text = "Initializing in-memory database..."
-        con = DB_SESSION.get_con()
-        users_df = pd.DataFrame(
-            [
-                {
-                    "id": 1,
-                    "name": "Alice",
-                    "email": "alice@example.com",
-                    "created_at": "2024-01-15 10:00:00",
-                },
-                {
-                    "id": 2,
-                    "name": "Bob",
-                    "email": "bob@example.com",
-                    "created_at": "2024-01-16 11:30:00",
-                },
-                {
-                    "id": 3,
-                    "name": "Charlie",
-                    "email": "charlie@example.com",
-                    "created_at": "2024-01-17 14:00:00",
-                },
-            ]
-        )
-        products_df = pd.DataFrame(
-            [
-                {"product_id": 101, "name": "Laptop", "price": 1200.0, "stock": 50},
-                {"product_id": 102, "name": "Mouse", "price": 25.0, "stock": 200},
-                {"product_id": 103, "name": "Keyboard", "price": 75.0, "stock": 150},
-            ]
-        )
-        sales_df = pd.DataFrame(
-            [
-                {
-                    "sale_id": 1001,
-                    "product_id": 101,
-                    "user_id": 1,
-                    "amount": 1200.0,
-                    "sale_date": "2024-05-01",
-                },
-                {
-                    "sale_id": 1002,
-                    "product_id": 102,
-                    "user_id": 1,
-                    "amount": 25.0,
-                    "sale_date": "2024-05-01",
-                },
-                {
-                    "sale_id": 1003,
-                    "product_id": 103,
-                    "user_id": 2,
-                    "amount": 75.0,
-                    "sale_date": "2024-05-02",
-                },
-            ]
-        )
-        con.execute("CREATE OR REPLACE TABLE users AS SELECT * FROM users_df")
-        con.execute("CREATE OR REPLACE TABLE products AS SELECT * FROM products_df")
-        con.execute("CREATE OR REPLACE TABLE sales AS SELECT * FROM sales_df")
+            if self._catalog is not None:
+                return
+        if not DB_POOL.workspace_ready():
+            async with self:
+                ui_state = await self.get_state(UIState)
+                ui_state.status_text = "Initializing workspace..."
+            await asyncio.get_running_loop().run_in_executor(
+                METADATA_EXECUTOR, DB_POOL.prepare_workspace
+            )
+        driver = DB_POOL.get(self.router.session.client_token)
         async with self:
             ui_state = await self.get_state(UIState)
-            ui_state.status_text = "Connected to in-memory DuckDB"
+            ui_state.status_text = f"Connected to {driver.label}"
         yield DBState.load_schema
 
-    @rx.event
+    @rx.event(background=True)
     async def load_schema(self):
         """Load the schema from the current database connection."""
-        con = DB_SESSION.get_con()
-        self.schema = []
-        db_name = "main"
-        tables_result = con.execute("SHOW TABLES").fetchall()
-        tables = []
-        for (table_name,) in tables_result:
-            columns_result = con.execute(
-                f"PRAGMA table_info('{table_name}')"
-            ).fetchall()
-            columns = [Column(name=col[1], type=col[2]) for col in columns_result]
-            tables.append(Table(name=table_name, columns=columns))
-        self.schema.append(Database(name=db_name, tables=tables))
+        driver = DB_POOL.get(self.router.session.client_token)
+        try:
+            catalog = await asyncio.get_running_loop().run_in_executor(
+                METADATA_EXECUTOR, SCHEMA_CACHE.get, driver
+            )
+        except Exception as e:
+            logger.exception("Error loading schema")
+            async with self:
+                ui_state = await self.get_state(UIState)
+                ui_state.status_text = f"Error: Could not load the schema: {e}"
+            return
+        async with self:
+            self._set_catalog(catalog)
+            query_state = await self.get_state(QueryState)
+            # Open the connection's own database rather than an attached one.
+            default_db = next(
+                (
+                    db
+                    for db in self._schema
+                    if db["tables"] and not db["tables"][0]["database"]
+                ),
+                None,
+            )
+            if default_db is not None:
+                query_state.active_db = default_db["name"]
+                query_state.active_table = default_db["tables"][0]["name"]
+            self._refresh_sidebar_tables(query_state.active_db)
+
+    def _set_catalog(self, catalog: Catalog):
+        self._catalog = catalog
+        schema = catalog["schema"]
+        self._schema = schema
+        self._table_index = _build_table_index(schema)
+        self.database_names = [db["name"] for db in schema]
+        self.expanded_table = ""
+        self.expanded_columns = []
+
+    def _refresh_sidebar_tables(self, db_name: str | None):
+        self.sidebar_tables, self.hidden_table_count = _filter_tables(
+            self._table_index.get(db_name or "", []),
+            self.table_filter,
+            SIDEBAR_TABLE_LIMIT,
+        )
+
+    @rx.event
+    async def open_database(self):
+        """Load the table names of the active database into the sidebar."""
+        query_state = await self.get_state(QueryState)
+        self._refresh_sidebar_tables(query_state.active_db)
+
+    @rx.event
+    async def set_table_filter(self, value: str):
+        """Filter the sidebar's table names on the server."""
+        self.table_filter = value
+        query_state = await self.get_state(QueryState)
+        self._refresh_sidebar_tables(query_state.active_db)
+
+    @rx.event
+    async def toggle_table_columns(self, table_name: str):
+        """Expand a table in the sidebar to show its columns, or collapse it."""
+        if self.expanded_table == table_name:
+            self.expanded_table = ""
+            self.expanded_columns = []
+            return
         query_state = await self.get_state(QueryState)
-        if self.schema and self.schema[0]["tables"]:
-            query_state.active_db = self.schema[0]["name"]
-            if self.schema[0]["tables"]:
-                query_state.active_table = self.schema[0]["tables"][0]["name"]
+        db = next((d for d in self._schema if d["name"] == query_state.active_db), None)
+        table = (
+            next((t for t in db["tables"] if t["name"] == table_name), None)
+            if db
+            else None
+        )
+        self.expanded_table = table_name
+        self.expanded_columns = table["columns"] if table else []
+
+    @rx.event
+    async def select_stats_table(self, db_name: str, table_name: str):
+        """Remember the selected table.
+
+        Its statistics are only computed if they are on screen.
+        """
+        self._selected_stats_table = (db_name, table_name)
+        ui_state = await self.get_state(UIState)
+        if ui_state.active_editor_tab == "column_stats":
+            return DBState.load_table_stats(db_name, table_name)
+
+    @rx.event
+    def load_selected_table_stats(self):
+        db_name, table_name = self._selected_stats_table
+        if table_name:
+            return DBState.load_table_stats(db_name, table_name)
+
+    @rx.event(background=True)
+    async def load_table_stats(self, db_name: str, table_name: str):
+        """Compute a table's column statistics, reusing them until its data changes."""
+        driver = DB_POOL.get(self.router.session.client_token)
+        async with self:
+            self.stats_table = table_name
+            table = _schema_tables(self._catalog, db_name).get(table_name.lower())
+            if isinstance(driver, drivers.ClosedDriver):
+                error = driver.reason
+            elif not isinstance(driver, drivers.DuckDBDriver):
+                error = "Column statistics need a DuckDB connection."
+            elif table is None:
+                error = f"{table_name} is not in the loaded schema. Reload it and try again."
+            else:
+                error = ""
+            if error:
+                self.table_stats = _stats_error(table_name, error)
+                return
+        key = TABLE_STATS.key(driver, table)
+        stats = TABLE_STATS.get(key)
+        if stats is None:
+            async with self:
+                self.is_loading_table_stats = True
+            try:
+                stats = await _scheduled_call(
+                    self.router.session.client_token, _table_stats, driver, table
+                )
+            except Exception as e:
+                logger.exception("Error computing table statistics")
+                async with self:
+                    if self.stats_table == table_name:
+                        self.table_stats = _stats_error(
+                            table_name, f"Could not compute statistics: {e}"
+                        )
+                        self.is_loading_table_stats = False
+                        ui_state = await self.get_state(UIState)
+                        ui_state.status_text = (
+                            f"Error: Could not compute statistics for {table_name}."
+                        )
+                return
+            TABLE_STATS.put(key, stats)
+        async with self:
+            # A table selected since this one started takes precedence.
+            if self.stats_table == table_name:
+                self.table_stats = stats
+                self.is_loading_table_stats = False
+
+    async def _set_import_status(self, text: str):
+        async with self:
+            ui_state = await self.get_state(UIState)
+            ui_state.status_text = text
+
+    async def _import_dataset(self, filename: str, read_chunk):
+        """Stream a dataset to a temp file in chunks and load it into DuckDB.
+
+        Args:
+            filename: The dataset's original file name, used for its format.
+            read_chunk: An async callable returning the next chunk of bytes.
+        """
+        reader = DATASET_READERS.get(_dataset_suffix(filename))
+        if reader is None:
+            raise ValueError(f"Unsupported dataset format: {filename}")
+        driver = DB_POOL.get(self.router.session.client_token)
+        if isinstance(driver, drivers.ClosedDriver):
+            raise drivers.ConnectionClosed(driver.reason)
+        if not isinstance(driver, drivers.DuckDBDriver):
+            raise ValueError("Datasets can only be imported into DuckDB.")
+        loop = asyncio.get_running_loop()
+        suffix = filename[filename.index(".") :] if "." in filename else ""
+        fd, path = tempfile.mkstemp(prefix="orbit-import-", suffix=suffix)
+        try:
+            received = 0
+            with os.fdopen(fd, "wb") as out:
+                while chunk := await read_chunk():
+                    await loop.run_in_executor(None, out.write, chunk)
+                    received += len(chunk)
+                    await self._set_import_status(
+                        f"Receiving {filename}: {received / 1024 / 1024:.1f} MB..."
+                    )
+            await self._set_import_status(f"Loading {filename} into DuckDB...")
+            table_name, row_count = await _scheduled_call(
+                self.router.session.client_token,
+                _load_dataset,
+                driver.con,
+                path,
+                _dataset_table_name(filename),
+                reader,
+            )
+        finally:
+            os.remove(path)
+        DATA_VERSIONS.bump(driver.catalog_key)
+        catalog = await loop.run_in_executor(
+            METADATA_EXECUTOR, SCHEMA_CACHE.refresh_table, driver, table_name
+        )
+        async with self:
+            self._set_catalog(catalog)
+            query_state = await self.get_state(QueryState)
+            # Show the schema the table landed in, even if none was open.
+            query_state.active_db = next(
+                (
+                    db["name"]
+                    for db in catalog["schema"]
+                    for table in db["tables"]
+                    if table["name"] == table_name and not table["database"]
+                ),
+                query_state.active_db,
+            )
+            query_state.active_table = table_name
+            self._refresh_sidebar_tables(query_state.active_db)
+            ui_state = await self.get_state(UIState)
+            ui_state.show_import_modal = False
+            ui_state.status_text = f"Imported {row_count} rows into {table_name}."
+
+    @rx.event(background=True)
+    async def handle_dataset_upload(self, files: list[rx.UploadFile]):
+        """Import an uploaded CSV, Parquet or JSON file as a table."""
+        if not files:
+            return
+        upload = files[0]
+        try:
+            await self._import_dataset(
+                upload.filename or "dataset.csv",
+                lambda: upload.read(IMPORT_CHUNK_BYTES),
+            )
+        except Exception as e:
+            logger.exception("Failed to import dataset")
+            await self._set_import_status(f"Import failed: {e}")
+
+    @rx.event(background=True)
+    async def import_dataset_from_url(self):
+        """Download a CSV, Parquet or JSON file from a URL and import it as a table."""
+        async with self:
+            ui_state = await self.get_state(UIState)
+            url = ui_state.import_url.strip()
+        loop = asyncio.get_running_loop()
+        try:
+            if not url.startswith(("http://", "https://")):
+                raise ValueError("Enter an http(s) URL.")
+            response = await loop.run_in_executor(
+                None,
+                functools.partial(
+                    urllib.request.urlopen, url, timeout=DATASET_URL_TIMEOUT_SECONDS
+                ),
+            )
+            with response:
+                filename = os.path.basename(urllib.parse.urlparse(url).path)
+                await self._import_dataset(
+                    filename or "dataset.csv",
+                    lambda: loop.run_in_executor(
+                        None, response.read, IMPORT_CHUNK_BYTES
+                    ),
+                )
+        except Exception as e:
+            logger.exception("Failed to import dataset")
+            # urlopen wraps a connect timeout in a URLError; reads raise it.
+            if isinstance(getattr(e, "reason", e), TimeoutError):
+                message = (
+                    f"{url} did not respond within "
+                    f"{DATASET_URL_TIMEOUT_SECONDS} seconds."
+                )
+            else:
+                message = str(e)
+            await self._set_import_status(f"Import failed: {message}")
 
     @rx.event
     def set_db_form_value(self, field: str, value: str):
@@ -234,28 +3083,20 @@ class DBState(rx.State):
             self.is_connecting = True
             ui_state = await self.get_state(UIState)
             ui_state.status_text = f"Connecting to {self.db_form_data['db_type']}..."
-        import asyncio
-
-        await asyncio.sleep(1)
+            form = dict(self.db_form_data)
         try:
-            if self.db_form_data["db_type"] == "duckdb":
-                con = duckdb.connect(
-                    database=self.db_form_data["database"], read_only=False
-                )
-                DB_SESSION.set_con(con)
-                status = f"Connected to DuckDB file: {self.db_form_data['database']}"
-                should_load_schema = True
-            else:
-                status = f"Successfully connected to {self.db_form_data['db_type']} (Simulated)"
-                should_load_schema = False
+            driver = await asyncio.get_running_loop().run_in_executor(
+                METADATA_EXECUTOR, drivers.connect, form
+            )
+            DB_POOL.set(self.router.session.client_token, driver)
+            status = f"Connected to {driver.label}"
             async with self:
                 ui_state = await self.get_state(UIState)
                 ui_state.status_text = status
                 ui_state.show_connect_db_modal = False
-            if should_load_schema:
-                yield DBState.load_schema
+            yield DBState.load_schema
         except Exception as e:
-            logging.exception(f"Error connecting to DB: {e}")
+            logger.exception("Error connecting to DB")
             async with self:
                 ui_state = await self.get_state(UIState)
                 ui_state.status_text = f"Connection failed: {e}"
@@ -263,43 +3104,216 @@ class DBState(rx.State):
             async with self:
                 self.is_connecting = False
 
+    @rx.event(background=True)
+    async def revalidate_schema(self):
+        """Reconnect with the current form and check the schema against the catalog.
+
+        Used after importing a session, whose schema snapshot may be stale.
+        The live schema replaces the snapshot either way.
+        """
+        async with self:
+            form = dict(self.db_form_data)
+            snapshot = list(self._schema)
+            ui_state = await self.get_state(UIState)
+            ui_state.status_text = "Re-validating schema..."
+        session_token = self.router.session.client_token
+        loop = asyncio.get_running_loop()
+        try:
+            if form.get("db_type") != "duckdb" or form.get("database") not in (
+                "",
+                ":memory:",
+            ):
+                driver = await loop.run_in_executor(
+                    METADATA_EXECUTOR, drivers.connect, form
+                )
+                DB_POOL.set(session_token, driver)
+            else:
+                driver = DB_POOL.get(session_token)
+            catalog = await loop.run_in_executor(
+                METADATA_EXECUTOR, SCHEMA_CACHE.get, driver
+            )
+        except Exception as e:
+            logger.exception("Error re-validating schema")
+            async with self:
+                ui_state = await self.get_state(UIState)
+                ui_state.status_text = f"Schema re-validation failed: {e}"
+            return
+        missing, added, changed = _schema_changes(snapshot, catalog["schema"])
+        if missing or added or changed:
+            status = (
+                f"Schema changed since export: {missing} tables missing, "
+                f"{added} new, {changed} changed."
+            )
+        else:
+            status = "Schema matches the imported snapshot."
+        async with self:
+            self._set_catalog(catalog)
+            query_state = await self.get_state(QueryState)
+            self._refresh_sidebar_tables(query_state.active_db)
+            ui_state = await self.get_state(UIState)
+            ui_state.status_text = status
+
 
 class SessionState(rx.State):
-    query_history: list[QueryHistoryItem] = []
+    query_history: list[QueryHistoryItem] = rx.field(default_factory=list)
+    active_result_id: str = ""
+    # The result on screen stays on the backend; the grid reads the rows in
+    # view from the rows route, and the rest of the UI only gets its size.
+    _active_result: QueryResult = rx.field(
+        default_factory=lambda: {"columns": [], "row_count": 0, "has_more": False}
+    )
+    result_row_count: int = 0
+    result_has_more: bool = False
+    # False once the cursor of the result on screen is gone before its end.
+    result_pageable: bool = True
+    _unpageable_results: dict[str, bool] = rx.field(default_factory=dict)
+    revalidate_schema_on_import: bool = False
+    _session_archive: str = ""
 
     @rx.event
-    async def export_session(self) -> rx.event.EventSpec:
-        db_state = await self.get_state(DBState)
-        session_data = {
-            "manifest": {
-                "version": "1.0",
-                "created": datetime.datetime.now(datetime.timezone.utc).isoformat(),
-                "title": "Orbit Session",
-            },
-            "connection": db_state.db_form_data,
-            "schema_snapshot": db_state.schema,
-            "query_history": self.query_history,
-        }
-        filename = (
-            f"orbit-session-{datetime.datetime.now().strftime('%Y%m%d%H%M%S')}.orb"
+    def toggle_revalidate_schema_on_import(self):
+        self.revalidate_schema_on_import = not self.revalidate_schema_on_import
+
+    def _active_entry(self) -> QueryHistoryItem | None:
+        """The history entry whose result is on screen."""
+        for item in self.query_history:
+            if item["id"] == self.active_result_id:
+                return item
+        return None
+
+    def _activate_result(
+        self, result_id: str, result: QueryResult
+    ) -> tuple[str, QueryResult] | None:
+        """Put a result on screen, returning the previous one so it can be spilled."""
+        previous = None
+        if self.active_result_id:
+            previous = (self.active_result_id, _copy_result(self._active_result))
+        self.active_result_id = result_id
+        self._active_result = result
+        self._sync_result_size()
+        return previous
+
+    def _clear_result(self):
+        """Take the result off screen without keeping it."""
+        self.active_result_id = ""
+        self._active_result = {"columns": [], "row_count": 0, "has_more": False}
+        self._sync_result_size()
+
+    def _sync_result_size(self):
+        """Publish the size of the result on screen after it changed."""
+        self.result_row_count = self._active_result["row_count"]
+        self.result_has_more = self._active_result["has_more"]
+        self.result_pageable = self.active_result_id not in self._unpageable_results
+
+    def _append_history(self, item: QueryHistoryItem) -> list[str]:
+        """Add a history entry, returning the ids of entries dropped to fit."""
+        self.query_history.append(item)
+        dropped = [old["id"] for old in self.query_history[:-MAX_HISTORY_ITEMS]]
+        for result_id in dropped:
+            self._unpageable_results.pop(result_id, None)
+        if dropped:
+            self.query_history = self.query_history[-MAX_HISTORY_ITEMS:]
+        return dropped
+
+    @rx.event(background=True)
+    async def open_history_item(self, result_id: str):
+        """Show an earlier result again, reading it back from the result store."""
+        async with self:
+            if result_id == self.active_result_id:
+                return
+        loop = asyncio.get_running_loop()
+        result = await loop.run_in_executor(None, RESULT_STORE.get, result_id)
+        async with self:
+            ui_state = await self.get_state(UIState)
+            if result is None:
+                ui_state.status_text = "That result is no longer stored. Run it again."
+                return
+            previous = self._activate_result(result_id, result)
+            ui_state.active_editor_tab = "query"
+            ui_state.status_text = f"Showing {result['row_count']} stored rows."
+        if previous is not None:
+            await loop.run_in_executor(None, RESULT_STORE.put, *previous)
+        yield rx.call_script(
+            f"document.getElementById('{RESULTS_SCROLL_ID}')?.scrollTo(0, 0)"
         )
-        return rx.download(data=json.dumps(session_data, indent=2), filename=filename)
+
+    @rx.event(background=True)
+    async def export_session(self):
+        """Write the session to a v2 .orb archive and download it."""
+        async with self:
+            db_state = await self.get_state(DBState)
+            session_data = {
+                "manifest": {
+                    "version": SESSION_FORMAT_VERSION,
+                    "created": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+                    "title": "Orbit Session",
+                },
+                "connection": dict(db_state.db_form_data),
+                "schema_snapshot": db_state._schema,
+                "query_history": [dict(item) for item in self.query_history],
+            }
+            unstored = {}
+            if self.active_result_id:
+                unstored[self.active_result_id] = _copy_result(self._active_result)
+            ui_state = await self.get_state(UIState)
+            ui_state.status_text = "Exporting session..."
+        created = datetime.datetime.now().strftime("%Y%m%d%H%M%S")
+        fd, path = tempfile.mkstemp(prefix=f"orbit-session-{created}-", suffix=".orb")
+        os.close(fd)
+        try:
+            await asyncio.get_running_loop().run_in_executor(
+                None, _write_session_archive, path, session_data, unstored
+            )
+        except Exception:
+            logger.exception("Failed to export session")
+            os.remove(path)
+            async with self:
+                ui_state = await self.get_state(UIState)
+                ui_state.status_text = "Error: Failed to export session."
+            return
+        export_id = SESSION_EXPORTS.add(path)
+        async with self:
+            ui_state = await self.get_state(UIState)
+            ui_state.status_text = "Session exported."
+        url = f"{rx.config.get_config().api_url}{SESSION_EXPORT_PATH}/{export_id}"
+        yield rx.call_script(f"window.location.assign({json.dumps(url)})")
 
     @rx.event(background=True)
     async def handle_session_upload(self, files: list[rx.UploadFile]):
+        """Import an .orb file, showing its history before any result is read.
+
+        Results in a v2 archive are read when their entry is opened, apart
+        from the latest one, which is loaded once the history is on screen.
+        """
         if not files:
             return
+        loop = asyncio.get_running_loop()
+        fd, path = tempfile.mkstemp(prefix="orbit-session-", suffix=".orb")
+        # Set once the session holds on to the file as its archive; until then
+        # the file, and whatever results it indexed, are released at the end.
+        adopted = False
         try:
-            file_content = await files[0].read()
-            session_data = json.loads(file_content)
+            with os.fdopen(fd, "wb") as out:
+                while chunk := await files[0].read(IMPORT_CHUNK_BYTES):
+                    await loop.run_in_executor(None, out.write, chunk)
+            session_data, keep_archive = await loop.run_in_executor(
+                None, _read_session_file, path
+            )
+            history = session_data.get("query_history", [])[-MAX_HISTORY_ITEMS:]
             async with self:
-                self.query_history = session_data.get("query_history", [])
+                self.query_history = history
+                self._clear_result()
+                revalidate = self.revalidate_schema_on_import
                 db_state = await self.get_state(DBState)
                 db_state.db_form_data = session_data.get(
                     "connection", db_state.db_form_data
                 )
-                db_state.schema = session_data.get("schema_snapshot", db_state.schema)
+                if "schema_snapshot" in session_data:
+                    db_state._set_catalog(
+                        _make_catalog(session_data["schema_snapshot"], {})
+                    )
                 query_state = await self.get_state(QueryState)
+                db_state._refresh_sidebar_tables(query_state.active_db)
                 if self.query_history:
                     query_state.query_input = self.query_history[-1]["natural_language"]
                 ui_state = await self.get_state(UIState)
@@ -307,26 +3321,58 @@ class SessionState(rx.State):
                 ui_state.status_text = (
                     f"Successfully imported session from {files[0].filename}"
                 )
-        except Exception as e:
-            logging.exception(f"Failed to import session: {e}")
+                previous_archive = self._session_archive
+                self._session_archive = path if keep_archive else ""
+                adopted = keep_archive
+            if previous_archive:
+                await loop.run_in_executor(
+                    None, RESULT_STORE.release_archive, previous_archive
+                )
+            if revalidate:
+                yield DBState.revalidate_schema
+            if history:
+                results = await loop.run_in_executor(
+                    None, RESULT_STORE.get, history[-1]["id"]
+                )
+                async with self:
+                    if results is not None and not self.active_result_id:
+                        self._activate_result(history[-1]["id"], results)
+        except Exception:
+            logger.exception("Failed to import session")
             async with self:
                 ui_state = await self.get_state(UIState)
                 ui_state.status_text = f"Error: Failed to import session file."
+        finally:
+            if not adopted:
+                await loop.run_in_executor(None, RESULT_STORE.release_archive, path)
 
 
 class QueryState(rx.State):
     query_input: str = 'output("show me all users and their corresponding products")'
     is_running: bool = False
+    queue_position: int = 0
+    script_mode: bool = False
+    stop_on_error: bool = True
+    query_params: dict[str, str] = rx.field(default_factory=dict)
     active_db: str | None = None
     active_table: str | None = None
+    er_neighborhood_hops: int = 0
+    cache_hits: int = 0
+    cache_misses: int = 0
+    is_profiling: bool = False
+    profile_result_id: str = ""
+    profile_summary: str = ""
+    profile_operators: list[ProfileOperator] = rx.field(default_factory=list)
+    _pending_cache_keys: dict[str, tuple] = rx.field(default_factory=dict)
+    _fetching_result_id: str = ""
 
     @rx.var
-    async def active_db_tables(self) -> list[Table]:
-        db_state = await self.get_state(DBState)
-        if not self.active_db or not db_state.schema:
-            return []
-        db = next((d for d in db_state.schema if d["name"] == self.active_db), None)
-        return db["tables"] if db else []
+    def query_parameters(self) -> list[QueryParameter]:
+        """The $name placeholders in the editor, with the values set for them."""
+        return [
+            QueryParameter(name=name, value=self.query_params.get(name, ""))
+            for name in _query_parameters(self.query_input)
+        ]
 
     @rx.var
     async def er_diagram_markdown(self) -> str:
@@ -336,143 +3382,540 @@ class QueryState(rx.State):
 graph TD
     A[Select a database to see ER Diagram]
 """
-        db_schema = next(
-            (db for db in db_state.schema if db["name"] == self.active_db), None
-        )
-        if not db_schema:
+        if db_state._catalog is None:
             return """mermaid
 graph TD
     A[Database not found or empty]
 """
-        mermaid_string = """erDiagram
-"""
-        relationships = set()
-        table_names = {table["name"] for table in db_schema["tables"]}
-        for table in db_schema["tables"]:
-            mermaid_string += f"    {table['name']} {{\n"
-            for column in table["columns"]:
-                mermaid_string += f"        {column['type']} {column['name']}\n"
-                if column["name"].endswith("_id") and column["name"] not in [
-                    "id",
-                    f"{table['name'].rstrip('s')}_id",
-                ]:
-                    fk_target_table_singular = column["name"].replace("_id", "")
-                    fk_target_table_plural = f"{fk_target_table_singular}s"
-                    if fk_target_table_plural in table_names:
-                        relationships.add(
-                            f'''    "{table['name']}" ||--o{{ "{fk_target_table_plural}" : "has"'''
-                        )
-                    elif fk_target_table_singular in table_names:
-                        relationships.add(
-                            f'''    "{table['name']}" ||--o{{ "{fk_target_table_singular}" : "has"'''
-                        )
-            mermaid_string += """    }
-"""
-        for rel in relationships:
-            mermaid_string += f"{rel}\n"
-        return f"mermaid\n{mermaid_string}"
+        return ER_DIAGRAMS.get(
+            db_state._catalog,
+            self.active_db,
+            self.active_table,
+            self.er_neighborhood_hops,
+        )
+
+    @rx.var
+    async def results_layout(self) -> ResultLayout:
+        """The grid's columns, sized from the first rows of the current result."""
+        ss = await self.get_state(SessionState)
+        results = ss._active_result
+        columns = [column["name"] for column in results["columns"]]
+        widths = _column_widths(
+            columns, _result_rows(results, 0, COLUMN_WIDTH_SAMPLE_ROWS)
+        )
+        return {
+            "columns": columns,
+            "grid_template": " ".join(f"{w}px" for w in widths),
+        }
+
+    @rx.var
+    async def result_rows_url(self) -> str:
+        """Where the grid reads the rows in view of the current result."""
+        ss = await self.get_state(SessionState)
+        if not ss.result_row_count:
+            return ""
+        return (
+            f"{rx.config.get_config().api_url}{RESULT_STREAM_PATH}/"
+            f"{ss.active_result_id}/rows"
+        )
 
     @rx.var
-    async def current_results(self) -> QueryResult:
+    async def last_query_time(self) -> str:
         ss = await self.get_state(SessionState)
         if not ss.query_history:
-            return {"columns": [], "rows": []}
-        return ss.query_history[-1]["results"]
+            return _format_duration(0.0)
+        return _format_duration(ss.query_history[-1]["execution_time"])
+
+    @rx.var
+    async def selected_query_sql(self) -> str:
+        """The SQL behind the result on screen."""
+        ss = await self.get_state(SessionState)
+        entry = ss._active_entry()
+        return entry["generated_sql"] if entry else ""
+
+    @rx.var
+    async def selected_phase_timings(self) -> list[PhaseTiming]:
+        """How long each phase of the query on screen took."""
+        ss = await self.get_state(SessionState)
+        entry = ss._active_entry()
+        if entry is None or "timings" not in entry:
+            return []
+        total = sum(entry["timings"].values()) or 1.0
+        return [
+            PhaseTiming(
+                name=name.replace("_", "-"), ms=ms, percent=round(ms * 100 / total, 1)
+            )
+            for name, ms in entry["timings"].items()
+        ]
 
     @rx.var
-    async def last_query_time(self) -> float:
+    async def last_query_cached(self) -> bool:
         ss = await self.get_state(SessionState)
         if not ss.query_history:
-            return 0.0
-        return ss.query_history[-1]["execution_time"]
+            return False
+        return ss.query_history[-1].get("cache_hit", False)
+
+    @rx.var
+    async def result_stream_url(self) -> str:
+        """Where the full current result can be streamed as Arrow IPC, if anywhere."""
+        ss = await self.get_state(SessionState)
+        result_id = ss.active_result_id
+        if not RESULT_STREAMS.contains(result_id):
+            return ""
+        return f"{rx.config.get_config().api_url}{RESULT_STREAM_PATH}/{result_id}"
+
+    @rx.event
+    def set_er_neighborhood_hops(self, value: str):
+        """Limit the ER diagram to tables within this many hops (0 for all)."""
+        self.er_neighborhood_hops = int(value)
 
     @rx.event
     def select_db(self, db_name: str):
         self.active_db = db_name
         self.active_table = None
+        return DBState.open_database
 
     @rx.event
-    def select_table(self, table_name: str):
-        self.active_table = table_name
-        self.query_input = f'output("show first 10 rows from {table_name}")'
-        return QueryState.run_query
+    async def select_table(self, table_name: str):
+        """Preview a table of the active database, quoting its name for the driver."""
+        db_state = await self.get_state(DBState)
+        table = _schema_tables(db_state._catalog, self.active_db).get(
+            table_name.lower()
+        )
+        if table is None:
+            return
+        driver = DB_POOL.get(self.router.session.client_token)
+        quote = _dialect_quote(driver.dialect if driver else "")
+        self.active_table = table["name"]
+        self.query_input = f"SELECT * FROM {_qualified_name(table, quote)} LIMIT 10"
+        return [
+            QueryState.run_preview,
+            DBState.select_stats_table(self.active_db, table["name"]),
+        ]
 
     @rx.event
     def set_query_input(self, value: str):
         self.query_input = value
 
+    @rx.event
+    def set_query_param(self, name: str, value: str):
+        self.query_params[name] = value
+
+    @rx.event
+    def toggle_script_mode(self):
+        self.script_mode = not self.script_mode
+
+    @rx.event
+    def toggle_stop_on_error(self):
+        self.stop_on_error = not self.stop_on_error
+
+    @rx.event(background=True)
+    async def fetch_next_page(self):
+        """Fetch the next page of the current result from its server-side cursor.
+
+        The fetch runs outside the state lock so Cancel and other events are
+        not held up while the database reads the page.
+        """
+        async with self:
+            ss = await self.get_state(SessionState)
+            result_id = ss.active_result_id
+            if (
+                not ss.result_has_more
+                or not ss.result_pageable
+                or self._fetching_result_id == result_id
+            ):
+                return
+            self._fetching_result_id = result_id
+        try:
+            cells, has_more = await asyncio.get_running_loop().run_in_executor(
+                METADATA_EXECUTOR, RESULT_CURSORS.fetch_page, result_id
+            )
+        except Exception:
+            logger.exception("Could not fetch the next page of %s", result_id)
+            async with self:
+                # The rows read so far stay, but the result is not complete,
+                # so it is neither cached nor stored as if it were.
+                self._pending_cache_keys.pop(result_id, None)
+                ss = await self.get_state(SessionState)
+                ss._unpageable_results[result_id] = True
+                if ss.active_result_id == result_id:
+                    ss._sync_result_size()
+                    ui_state = await self.get_state(UIState)
+                    ui_state.status_text = (
+                        "This result can no longer be paged. "
+                        "Run the query again to see more rows."
+                    )
+            return
+        finally:
+            async with self:
+                self._fetching_result_id = ""
+        async with self:
+            ss = await self.get_state(SessionState)
+            if ss.active_result_id != result_id:
+                return
+            _append_page(ss._active_result, cells, has_more)
+            ss._sync_result_size()
+            for item in ss.query_history:
+                if item["id"] == result_id:
+                    item["row_count"] = ss.result_row_count
+            cache_key = self._pending_cache_keys.pop(result_id, None)
+            if cache_key is not None and not has_more:
+                RESULT_CACHE.put(cache_key, _copy_result(ss._active_result))
+            elif cache_key is not None:
+                self._pending_cache_keys[result_id] = cache_key
+
+    @rx.event
+    def handle_results_scroll(self, metrics: list[int]):
+        """Load another page once the grid is scrolled near its end.
+
+        The grid works out which rows are in view on the client, so this is
+        only told where the scroll position is to decide on paging.
+
+        Args:
+            metrics: The scroll container's scrollTop, clientHeight and scrollHeight.
+        """
+        scroll_top, client_height, scroll_height = metrics
+        if scroll_top + client_height >= scroll_height - 10 * ROW_HEIGHT_PX:
+            return QueryState.fetch_next_page
+
+    @rx.event
+    async def cancel_query(self):
+        """Interrupt the query this session is running and drop its queued ones."""
+        session_token = self.router.session.client_token
+        dropped = QUERY_SCHEDULER.cancel(session_token)
+        if (self.is_running and RUNNING_QUERIES.interrupt(session_token)) or dropped:
+            ui_state = await self.get_state(UIState)
+            ui_state.status_text = "Cancelling query..."
+
     @rx.event(background=True)
     async def run_query(self):
+        async for event in self._run_scheduled(preview=False):
+            yield event
+
+    @rx.event(background=True)
+    async def run_preview(self):
+        """Run a table preview in the scheduler's priority lane."""
+        async for event in self._run_scheduled(preview=True):
+            yield event
+
+    async def _run_scheduled(self, preview: bool):
+        """Queue the query in the editor and run it once the scheduler allows."""
+        session_token = self.router.session.client_token
         async with self:
-            if self.is_running:
+            query_input = self.query_input
+            query_params = dict(self.query_params)
+            ticket = QUERY_SCHEDULER.submit(session_token, preview)
+            if ticket is None:
+                ui_state = await self.get_state(UIState)
+                ui_state.status_text = "Error: Too many queries are queued."
                 return
             self.is_running = True
+        try:
+            position = 0
+            while not ticket.granted.is_set():
+                if QUERY_SCHEDULER.position(session_token) != position:
+                    position = QUERY_SCHEDULER.position(session_token)
+                    async with self:
+                        self.queue_position = position
+                        ui_state = await self.get_state(UIState)
+                        ui_state.status_text = f"Queued: position {position}."
+                with contextlib.suppress(asyncio.TimeoutError):
+                    await asyncio.wait_for(
+                        ticket.granted.wait(), QUEUE_STATUS_INTERVAL_SECONDS
+                    )
+            if ticket.cancelled:
+                async with self:
+                    ui_state = await self.get_state(UIState)
+                    ui_state.status_text = "Queued query cancelled."
+                return
+            async with self:
+                self.queue_position = QUERY_SCHEDULER.position(session_token)
+                script_mode, stop_on_error = self.script_mode, self.stop_on_error
+            statements = [query_input]
+            if script_mode and not _NL_REQUEST_PATTERN.match(query_input.strip()):
+                statements = _split_statements(query_input) or [query_input]
+            succeeded = 0
+            for number, statement in enumerate(statements, start=1):
+                progress = ""
+                if len(statements) > 1:
+                    progress = f"[{number}/{len(statements)}] "
+                    async with self:
+                        ui_state = await self.get_state(UIState)
+                        ui_state.status_text = f"{progress}Running statement..."
+                status = await self._execute_query(
+                    statement, session_token, progress, query_params
+                )
+                yield rx.call_script(
+                    f"document.getElementById('{RESULTS_SCROLL_ID}')?.scrollTo(0, 0)"
+                )
+                succeeded += status == "success"
+                if status == "cancelled" or (status == "error" and stop_on_error):
+                    break
+            if len(statements) > 1:
+                async with self:
+                    ui_state = await self.get_state(UIState)
+                    if number < len(statements):
+                        ui_state.status_text += f" Script stopped at statement {number} of {len(statements)}."
+                    else:
+                        ui_state.status_text = (
+                            f"Script finished: {succeeded} of {len(statements)} "
+                            "statements succeeded."
+                        )
+            if notice := DB_POOL.take_reset_notice(session_token):
+                async with self:
+                    ui_state = await self.get_state(UIState)
+                    ui_state.status_text = f"{notice} {ui_state.status_text}"
+        finally:
+            QUERY_SCHEDULER.release(ticket)
+            async with self:
+                self.is_running = QUERY_SCHEDULER.pending(session_token) > 0
+                self.queue_position = QUERY_SCHEDULER.position(session_token)
+
+    async def _execute_query(
+        self,
+        query_input: str,
+        session_token: str,
+        progress: str = "",
+        query_params: dict[str, str] | None = None,
+    ) -> str:
+        """Run one query or statement and put its result in the history.
+
+        A statement with $name placeholders runs as a prepared statement with
+        the values in query_params; the history records it with them inlined.
+
+        Returns:
+            The status recorded in the history: success, error or cancelled.
+        """
+        async with self:
             sql_to_run = ""
-        start_time = asyncio.get_event_loop().time()
-        query_result: QueryResult = {"columns": [], "rows": []}
+            bound_sql = ""
+            db_state = await self.get_state(DBState)
+            catalog = db_state._catalog
+        start_time = time.perf_counter()
+        timings = QueryTimings(
+            translate=0.0,
+            plan=0.0,
+            execute=0.0,
+            fetch=0.0,
+            serialize=0.0,
+            state_sync=0.0,
+        )
+        result_id = str(uuid.uuid4())
+        query_result: QueryResult = {"columns": [], "row_count": 0, "has_more": False}
         status_text = ""
+        status = "success"
+        cache_hit = False
+        cache_key = None
         try:
-            match = re.match('output\\("(.*)"\\)', self.query_input.strip())
+            driver = DB_POOL.get(session_token)
+            match = _NL_REQUEST_PATTERN.match(query_input.strip())
             if match:
-                natural_lang = match.group(1).lower()
-                if "all users" in natural_lang and "products" in natural_lang:
-                    sql_to_run = "SELECT u.name, u.email, p.name as product_name, p.price FROM users u JOIN sales s ON u.id = s.user_id JOIN products p ON s.product_id = p.product_id;"
-                elif "all users" in natural_lang:
-                    sql_to_run = "SELECT * FROM users;"
-                elif "all products" in natural_lang:
-                    sql_to_run = "SELECT * FROM products;"
-                elif "all sales" in natural_lang:
-                    sql_to_run = "SELECT * FROM sales;"
-                elif m := re.match("show first (\\d+) rows from (\\w+)", natural_lang):
-                    limit, table = m.groups()
-                    sql_to_run = f"SELECT * FROM {table} LIMIT {limit};"
-                else:
-                    sql_to_run = "SELECT 'Invalid natural language query' as Error;"
+                sql_to_run = (
+                    NL_TRANSLATOR.translate(
+                        match.group(1), catalog, self.active_db, driver.dialect
+                    )
+                    or ""
+                )
             else:
-                sql_to_run = self.query_input
-            con = DB_SESSION.get_con()
-            if con and sql_to_run and ("Invalid" not in sql_to_run):
-                result_df = con.execute(sql_to_run).fetchdf()
-                query_result = {
-                    "columns": result_df.columns.tolist(),
-                    "rows": result_df.values.tolist(),
-                }
-                status_text = f"Success: {len(query_result['rows'])} rows returned."
+                sql_to_run = query_input
+            parameters = _query_parameters(sql_to_run)
+            missing = _missing_parameters(sql_to_run, query_params or {})
+            bound_sql = (
+                _bind_parameters(sql_to_run, query_params or {})
+                if parameters
+                else sql_to_run
+            )
+            timings["translate"] = _elapsed_ms(start_time)
+            if driver and sql_to_run and not missing:
+                cache_key = RESULT_CACHE.key(driver, bound_sql, session_token)
+                cached = RESULT_CACHE.get(cache_key) if cache_key else None
             else:
-                query_result = {
-                    "columns": ["Error"],
-                    "rows": [["Could not execute query or invalid syntax."]],
-                }
+                cached = None
+            if cached is not None:
+                query_result = cached
+                cache_hit = True
+                status_text = f"Success: {cached['row_count']} rows returned (cached)."
+            elif missing:
+                names = ", ".join(f"${name}" for name in missing)
+                message = f"Set a value for {names}. Write '' for an empty string."
+                query_result = _message_result("Error", message)
+                status_text = f"Error: {message}"
+                status = "error"
+            elif driver and parameters and not isinstance(driver, drivers.DuckDBDriver):
+                query_result = _message_result(
+                    "Error", "Query parameters need a DuckDB connection."
+                )
+                status_text = "Error: Query parameters need a DuckDB connection."
+                status = "error"
+            elif parameters and len(_split_statements(sql_to_run)) > 1:
+                message = (
+                    "Query parameters work in one statement at a time. "
+                    "Turn on script mode to run the statements separately."
+                )
+                query_result = _message_result("Error", message)
+                status_text = f"Error: {message}"
+                status = "error"
+            elif driver and sql_to_run:
+                if cache_key is None:
+                    DATA_VERSIONS.bump(driver.catalog_key)
+                    DB_POOL.note_private_state(session_token)
+                cursor, previous_id = DB_POOL.execution_cursor(session_token, result_id)
+                if parameters:
+                    run = functools.partial(
+                        RESULT_CURSORS.open_prepared,
+                        result_id,
+                        session_token,
+                        cursor,
+                        sql_to_run,
+                        query_params or {},
+                        timings,
+                        previous_id,
+                    )
+                else:
+                    run = functools.partial(
+                        RESULT_CURSORS.open,
+                        result_id,
+                        cursor,
+                        sql_to_run,
+                        timings,
+                        previous_id,
+                    )
+                RUNNING_QUERIES.register(session_token, cursor)
+                loop = asyncio.get_running_loop()
+                try:
+                    columns, cells, has_more = await loop.run_in_executor(
+                        QUERY_EXECUTOR, run
+                    )
+                finally:
+                    RUNNING_QUERIES.unregister(session_token)
+                    if cache_key is None:
+                        # Bump again so reads that raced the write are not reused.
+                        DATA_VERSIONS.bump(driver.catalog_key)
+                serialize_started = time.perf_counter()
+                query_result = _build_result(columns, cells, has_more)
+                timings["serialize"] = _elapsed_ms(serialize_started)
+                if cache_key is not None and not has_more:
+                    RESULT_CACHE.put(cache_key, _copy_result(query_result))
+                if has_more:
+                    status_text = (
+                        f"Success: showing first {query_result['row_count']} rows."
+                    )
+                else:
+                    status_text = f"Success: {query_result['row_count']} rows returned."
+            elif match:
+                query_result = _message_result(
+                    "Error", "No rule translates this request for the current schema."
+                )
+                status_text = "Error: Could not translate the request."
+                status = "error"
+            else:
+                query_result = _message_result(
+                    "Error", "Could not execute query or invalid syntax."
+                )
                 status_text = "Error: Query failed."
+                status = "error"
+        except (duckdb.InterruptException, drivers.QueryCancelled):
+            query_result = _message_result("Error", "Query was cancelled.")
+            status_text = "Query cancelled."
+            status = "cancelled"
         except Exception as e:
-            logging.exception(f"Error running query: {e}")
-            query_result = {"columns": ["Error"], "rows": [[str(e)]]}
+            logger.exception("Error running query")
+            query_result = _message_result("Error", str(e))
             status_text = f"Error: {e}"
+            status = "error"
         finally:
-            end_time = asyncio.get_event_loop().time()
-            query_time = round(end_time - start_time, 2)
+            sync_started = time.perf_counter()
+            if status == "success" and query_result["columns"]:
+                RESULT_STREAMS.register(result_id, session_token)
             async with self:
-                self.is_running = False
+                if cache_key is not None and status == "success":
+                    if cache_hit:
+                        self.cache_hits += 1
+                    else:
+                        self.cache_misses += 1
+                        if query_result["has_more"]:
+                            self._pending_cache_keys[result_id] = cache_key
                 ss = await self.get_state(SessionState)
-                ss.query_history.append(
+                previous = ss._activate_result(result_id, query_result)
+                timings["state_sync"] = _elapsed_ms(sync_started)
+                dropped = ss._append_history(
                     {
-                        "id": str(uuid.uuid4()),
-                        "natural_language": self.query_input,
-                        "generated_sql": sql_to_run,
-                        "results": query_result,
-                        "execution_time": query_time,
+                        "id": result_id,
+                        "natural_language": query_input,
+                        "generated_sql": bound_sql,
+                        "row_count": query_result["row_count"],
+                        "execution_time": round(time.perf_counter() - start_time, 6),
                         "timestamp": datetime.datetime.now(
                             datetime.timezone.utc
                         ).isoformat(),
+                        "status": status,
+                        "cache_hit": cache_hit,
+                        "timings": timings,
                     }
                 )
                 ui_state = await self.get_state(UIState)
-                ui_state.status_text = status_text
+                ui_state.status_text = f"{progress}{status_text}"
+            for dropped_id in dropped:
+                RESULT_CURSORS.close(dropped_id)
+            loop = asyncio.get_running_loop()
+            if previous is not None:
+                await loop.run_in_executor(None, RESULT_STORE.put, *previous)
+            if (
+                query_result["columns"]
+                and not query_result["has_more"]
+                and not RESULT_STORE.contains(result_id)
+            ):
+                # The grid and the stream read complete results from the store;
+                # those read from a cursor were stored as it closed.
+                await loop.run_in_executor(
+                    None, RESULT_STORE.put, result_id, query_result
+                )
+            for dropped_id in dropped:
+                await loop.run_in_executor(None, RESULT_STORE.discard, dropped_id)
+        return status
+
+    @rx.event(background=True)
+    async def profile_query(self):
+        """Profile the query on screen with EXPLAIN ANALYZE."""
+        async with self:
+            ss = await self.get_state(SessionState)
+            entry = ss._active_entry()
+            if self.is_profiling or entry is None:
+                return
+            result_id, sql = entry["id"], entry["generated_sql"]
+            self.is_profiling = True
+        if _is_read_only(_normalize_sql(sql)):
+            driver = DB_POOL.get(self.router.session.client_token)
+            try:
+                summary, operators = await _scheduled_call(
+                    self.router.session.client_token, _profile_query, driver, sql
+                )
+            except Exception as e:
+                logger.exception("Error profiling query")
+                summary, operators = f"Could not profile query: {e}", []
+        else:
+            summary = (
+                "Only read-only queries can be profiled: EXPLAIN ANALYZE runs them."
+            )
+            operators = []
+        async with self:
+            self.is_profiling = False
+            self.profile_result_id = result_id
+            self.profile_summary = summary
+            self.profile_operators = operators
 
     @rx.event
     async def new_session(self):
         self.query_input = ""
         ss = await self.get_state(SessionState)
+        for item in ss.query_history:
+            RESULT_CURSORS.close(item["id"])
+            RESULT_STORE.discard(item["id"])
         ss.query_history = []
+        if ss._session_archive:
+            RESULT_STORE.release_archive(ss._session_archive)
+            ss._session_archive = ""
+        ss._clear_result()
+        self._pending_cache_keys = {}
         ui_state = await self.get_state(UIState)
         ui_state.status_text = "New session started."
\ No newline at end of file
@@ -0,0 +1,146 @@
+// Renders the rows in view of the results grid. The Reflex state only
+// carries the result's size and columns; the rows themselves are read in
+// blocks from the rows route named by the grid's data-rows-url, so they
+// never pass through the state. Blocks are cached per result, least
+// recently used first out.
+(() => {
+  const GRID_SELECTOR = "[data-rows-url]";
+  const BODY_SELECTOR = "[data-results-body]";
+  const MAX_CACHED_BLOCKS = 64;
+  const RETRY_DELAY_MS = 250;
+  const MAX_RETRIES = 20;
+  const grids = new WeakMap();
+
+  function gridState(scroller) {
+    const url = scroller.dataset.rowsUrl;
+    let grid = grids.get(scroller);
+    if (!grid || grid.url !== url) {
+      grid = { url, blocks: new Map(), loading: new Set(), failures: new Map(), frame: 0 };
+      grids.set(scroller, grid);
+    }
+    return grid;
+  }
+
+  function schedule(scroller) {
+    const grid = gridState(scroller);
+    if (!grid.frame) {
+      grid.frame = requestAnimationFrame(() => {
+        grid.frame = 0;
+        render(scroller, grid);
+      });
+    }
+  }
+
+  function load(scroller, grid, key, first, last) {
+    grid.loading.add(key);
+    fetch(`${grid.url}?first=${first}&last=${last}`)
+      .then((response) => (response.ok ? response.json() : Promise.reject(response.status)))
+      .then((body) => {
+        grid.blocks.set(key, body.rows);
+        while (grid.blocks.size > MAX_CACHED_BLOCKS) {
+          grid.blocks.delete(grid.blocks.keys().next().value);
+        }
+      })
+      .catch(() => {
+        // The result may be moving from its cursor to the result store.
+        grid.failures.set(key, (grid.failures.get(key) || 0) + 1);
+        return new Promise((resolve) => setTimeout(resolve, RETRY_DELAY_MS));
+      })
+      .finally(() => {
+        grid.loading.delete(key);
+        if (gridState(scroller) === grid) {
+          schedule(scroller);
+        }
+      });
+  }
+
+  function rowElement(cells, columnCount, template, rowHeight, rowClass, cellClass) {
+    const row = document.createElement("div");
+    row.className = rowClass;
+    row.setAttribute("role", "row");
+    row.style.display = "grid";
+    row.style.gridTemplateColumns = template;
+    row.style.height = `${rowHeight}px`;
+    for (let i = 0; i < columnCount; i++) {
+      const cell = document.createElement("div");
+      cell.className = cellClass;
+      cell.setAttribute("role", "gridcell");
+      cell.textContent = cells ? JSON.stringify(cells[i]) : "";
+      row.appendChild(cell);
+    }
+    return row;
+  }
+
+  function render(scroller, grid) {
+    const body = scroller.querySelector(BODY_SELECTOR);
+    if (!body || !grid.url) {
+      return;
+    }
+    const data = scroller.dataset;
+    const rowCount = Number(data.rowCount) || 0;
+    const rowHeight = Number(data.rowHeight);
+    const blockRows = Number(data.blockRows);
+    const overscan = Number(data.overscanRows);
+    const template = data.gridTemplate || "";
+    const columnCount = template ? template.split(" ").length : 0;
+    const first = Math.max(Math.floor(scroller.scrollTop / rowHeight) - overscan, 0);
+    const visible = Math.ceil(scroller.clientHeight / rowHeight) + 1;
+    const last = Math.min(first + visible + 2 * overscan, rowCount);
+    const rows = [];
+    for (let start = first - (first % blockRows); start < last; start += blockRows) {
+      const end = Math.min(start + blockRows, rowCount);
+      // The last block of a result that is still being paged grows.
+      const key = `${start}:${end}`;
+      const block = grid.blocks.get(key);
+      if (block) {
+        grid.blocks.delete(key);
+        grid.blocks.set(key, block);
+      } else if (!grid.loading.has(key) && (grid.failures.get(key) || 0) < MAX_RETRIES) {
+        load(scroller, grid, key, start, end);
+      }
+      for (let row = Math.max(start, first); row < Math.min(end, last); row++) {
+        rows.push(block ? block[row - start] : null);
+      }
+    }
+    let view = body.firstElementChild;
+    if (!view) {
+      view = document.createElement("div");
+      body.appendChild(view);
+    }
+    view.style.transform = `translateY(${first * rowHeight}px)`;
+    view.replaceChildren(
+      ...rows.map((cells) =>
+        rowElement(cells, columnCount, template, rowHeight, data.rowClass, data.cellClass)
+      )
+    );
+  }
+
+  function renderAll() {
+    document.querySelectorAll(GRID_SELECTOR).forEach(schedule);
+  }
+
+  document.addEventListener(
+    "scroll",
+    (event) => {
+      if (event.target instanceof Element && event.target.matches(GRID_SELECTOR)) {
+        schedule(event.target);
+      }
+    },
+    true
+  );
+  window.addEventListener("resize", renderAll);
+  // Re-render when React mounts a grid or a new result or page arrives.
+  const mountsGrid = (node) =>
+    node instanceof Element && (node.matches(GRID_SELECTOR) || node.querySelector(GRID_SELECTOR));
+  new MutationObserver((mutations) => {
+    if (mutations.some((m) => m.type === "attributes" || [...m.addedNodes].some(mountsGrid))) {
+      renderAll();
+    }
+  }).observe(document.documentElement, {
+    subtree: true,
+    childList: true,
+    attributes: true,
+    attributeFilter: ["data-rows-url", "data-row-count", "data-grid-template"],
+  });
+  renderAll();
+})();
\ No newline at end of file
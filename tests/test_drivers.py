@@ -0,0 +1,190 @@
+"""Driver tests.
+
+DuckDB and SQLite run everywhere. The PostgreSQL and MySQL tests run against
+a local server named by ORBIT_TEST_POSTGRES_URL or ORBIT_TEST_MYSQL_URL, for
+example postgresql://postgres@localhost:5432/postgres, and are skipped
+otherwise.
+"""
+
+import os
+import threading
+import urllib.parse
+
+import pytest
+
+from app import drivers
+
+
+def _server_form(variable: str) -> dict[str, str]:
+    url = os.environ.get(variable)
+    if not url:
+        pytest.skip(f"{variable} is not set")
+    parts = urllib.parse.urlparse(url)
+    return {
+        "db_type": parts.scheme,
+        "host": parts.hostname or "",
+        "port": str(parts.port or ""),
+        "user": urllib.parse.unquote(parts.username or ""),
+        "password": urllib.parse.unquote(parts.password or ""),
+        "database": parts.path.lstrip("/"),
+    }
+
+
+@pytest.fixture(params=["ORBIT_TEST_POSTGRES_URL", "ORBIT_TEST_MYSQL_URL"])
+def server_driver(request):
+    driver = drivers.connect(_server_form(request.param))
+    yield driver
+    driver.close()
+
+
+def _run(cursor, sql: str) -> list:
+    cursor.execute(sql)
+    return cursor.fetchmany(1000) if cursor.description else []
+
+
+@pytest.mark.parametrize(
+    "sql, in_transaction, expected",
+    [
+        ("BEGIN", False, True),
+        ("-- load\nstart transaction", False, True),
+        ("INSERT INTO t VALUES (1)", True, True),
+        ("COMMIT;", True, False),
+        ("ROLLBACK TO SAVEPOINT a", True, True),
+        ("rollback", True, False),
+        ("SELECT 1", False, False),
+    ],
+)
+def test_in_transaction_after(sql, in_transaction, expected):
+    assert drivers._in_transaction_after(sql, in_transaction) is expected
+
+
+@pytest.mark.parametrize(
+    "sql, expected",
+    [
+        ("SELECT 1", True),
+        ("/* report */ WITH x AS (SELECT 1) SELECT * FROM x", True),
+        ("SHOW search_path", False),
+        ("EXPLAIN ANALYZE SELECT 1", False),
+        ("INSERT INTO t VALUES (1)", False),
+    ],
+)
+def test_declares_cursor(sql, expected):
+    assert drivers._declares_cursor(sql) is expected
+
+
+def test_duckdb_session_cursor_keeps_connection_state():
+    driver = drivers.DuckDBDriver.connect({"database": ":memory:"})
+    try:
+        session = driver.session_cursor()
+        _run(session, "SET VARIABLE v = 5")
+        _run(session, "CREATE TEMP TABLE tt AS SELECT 42 AS x")
+        session.close()
+        assert _run(session, "SELECT getvariable('v'), (SELECT x FROM tt)") == [(5, 42)]
+        assert drivers.arrow_connection(session) is driver.con
+    finally:
+        driver.close()
+
+
+def test_sqlite_session_cursor_transactions(tmp_path):
+    driver = drivers.SQLiteDriver.connect({"database": str(tmp_path / "t.sqlite")})
+    try:
+        session = driver.session_cursor()
+        for sql in [
+            "CREATE TABLE t (id INTEGER)",
+            "BEGIN",
+            "INSERT INTO t VALUES (1)",
+            "COMMIT",
+            "BEGIN",
+            "INSERT INTO t VALUES (2)",
+            "ROLLBACK",
+        ]:
+            _run(session, sql)
+        assert _run(session, "SELECT count(*) FROM t") == [(1,)]
+        assert drivers.arrow_connection(session) is None
+    finally:
+        driver.close()
+
+
+def test_server_session_transactions(server_driver):
+    session = server_driver.session_cursor()
+    _run(session, "DROP TABLE IF EXISTS orbit_test_accounts")
+    _run(session, "CREATE TABLE orbit_test_accounts (id INTEGER)")
+    try:
+        for sql in [
+            "BEGIN",
+            "INSERT INTO orbit_test_accounts VALUES (1)",
+            "COMMIT",
+            "BEGIN",
+            "INSERT INTO orbit_test_accounts VALUES (2)",
+            "ROLLBACK",
+        ]:
+            _run(session, sql)
+        other = server_driver.cursor()
+        try:
+            assert _run(other, "SELECT count(*) FROM orbit_test_accounts") == [(1,)]
+        finally:
+            other.close()
+    finally:
+        _run(session, "DROP TABLE orbit_test_accounts")
+        session.close()
+
+
+def test_server_session_keeps_temp_tables(server_driver):
+    session = server_driver.session_cursor()
+    _run(session, "CREATE TEMPORARY TABLE orbit_test_tmp AS SELECT 42 AS x")
+    assert _run(session, "SELECT x FROM orbit_test_tmp") == [(42,)]
+    session.close()
+
+
+def test_server_streams_partially_read_results(server_driver):
+    session = server_driver.session_cursor()
+    session.execute(
+        "WITH RECURSIVE g (n) AS (SELECT 1 UNION ALL SELECT n + 1 FROM g WHERE n < 500)"
+        " SELECT n FROM g"
+    )
+    assert len(session.fetchmany(1)) == 1
+    # Running the next statement ends the partially read result.
+    assert _run(session, "SELECT 7") == [(7,)]
+    session.close()
+
+
+def test_server_show_and_explain(server_driver):
+    cursor = server_driver.cursor()
+    try:
+        if server_driver.dialect == "postgresql":
+            assert _run(cursor, "SHOW search_path")
+        else:
+            assert _run(cursor, "SHOW TABLES") is not None
+        assert _run(cursor, "EXPLAIN SELECT 1")
+    finally:
+        cursor.close()
+
+
+def test_server_pool_waits_for_a_free_connection(server_driver):
+    held = [server_driver.cursor() for _ in range(drivers.DRIVER_POOL_SIZE)]
+    got = []
+    waiter = threading.Thread(target=lambda: got.append(server_driver.cursor()))
+    waiter.start()
+    waiter.join(0.5)
+    assert not got
+    held.pop().close()
+    waiter.join(5)
+    assert got
+    for cursor in held + got:
+        cursor.close()
+
+
+def test_server_introspection(server_driver):
+    session = server_driver.session_cursor()
+    _run(session, "DROP TABLE IF EXISTS orbit_test_columns")
+    _run(session, "CREATE TABLE orbit_test_columns (id INTEGER, name VARCHAR(20))")
+    try:
+        columns = [
+            row[2:4]
+            for row in server_driver.load_columns()
+            if row[2] == "orbit_test_columns"
+        ]
+        assert columns == [("orbit_test_columns", "id"), ("orbit_test_columns", "name")]
+    finally:
+        _run(session, "DROP TABLE orbit_test_columns")
+        session.close()
\ No newline at end of file
@@ -0,0 +1,423 @@
+"""Tests for app.state.
+
+Covers the SQL helpers, the query scheduler, results and their caches,
+session files and the result routes.
+"""
+
+import asyncio
+import json
+import uuid
+
+import duckdb
+import pyarrow as pa
+import pytest
+from starlette.testclient import TestClient
+
+from app import drivers, state
+from app.api import results_api
+
+
+@pytest.mark.parametrize(
+    "script, expected",
+    [
+        ("SELECT 1; SELECT 2;", ["SELECT 1", "SELECT 2"]),
+        ("SELECT 'a;b'; SELECT \"c;d\"", ["SELECT 'a;b'", 'SELECT "c;d"']),
+        ("SELECT 1 -- one; two\n; /* ; */ ;", ["SELECT 1 -- one; two"]),
+        ("SELECT `a;b` FROM t", ["SELECT `a;b` FROM t"]),
+        (
+            "CREATE FUNCTION f() RETURNS int AS $$ SELECT 1; $$ LANGUAGE sql; SELECT f()",
+            [
+                "CREATE FUNCTION f() RETURNS int AS $$ SELECT 1; $$ LANGUAGE sql",
+                "SELECT f()",
+            ],
+        ),
+        (
+            "SELECT $body$a;$$;b$body$; SELECT 2",
+            ["SELECT $body$a;$$;b$body$", "SELECT 2"],
+        ),
+        ("SELECT $a; SELECT $1", ["SELECT $a", "SELECT $1"]),
+        ("  ;; -- nothing\n", []),
+    ],
+)
+def test_split_statements(script, expected):
+    assert state._split_statements(script) == expected
+
+
+@pytest.mark.parametrize(
+    "sql, expected",
+    [
+        ("SELECT * FROM t WHERE a = $a AND b > $b OR a < $a", ["a", "b"]),
+        ("SELECT '$a', \"$b\", $$ $c $$, $t$ $d $t$ -- $e\n, $f", ["f"]),
+        ("SELECT a$b, $1, $$$$", []),
+    ],
+)
+def test_query_parameters(sql, expected):
+    assert state._query_parameters(sql) == expected
+
+
+def test_bind_parameters_quotes_values_outside_literals():
+    sql = "SELECT $name, '$name', $$ $name $$, $missing"
+    assert state._bind_parameters(sql, {"name": "O'Brien"}) == (
+        "SELECT 'O''Brien', '$name', $$ $name $$, $missing"
+    )
+    assert state._missing_parameters(sql, {"name": "O'Brien", "missing": " "}) == [
+        "missing"
+    ]
+
+
+@pytest.mark.parametrize(
+    "value, expected",
+    [
+        ("42", "42"),
+        (" -1.5e3 ", "-1.5e3"),
+        ("007", "'007'"),
+        ("True", "TRUE"),
+        ("null", "NULL"),
+        ("'42'", "'42'"),
+        ("''", "''"),
+        ("it's", "'it''s'"),
+    ],
+)
+def test_parameter_literal(value, expected):
+    assert state._parameter_literal(value) == expected
+
+
+@pytest.mark.parametrize(
+    "sql, expected",
+    [
+        ("SELECT * FROM t", True),
+        ("with x as (select 1) select * from x", True),
+        ("FROM t", True),
+        ("SELECT $$a;b$$", True),
+        ("select * from t; set threads=1", False),
+        ("from t; install httpfs", False),
+        ("select 1; select 2", False),
+        ("INSERT INTO t VALUES (1)", False),
+        ("CREATE TABLE t AS SELECT 1", False),
+        ("SET threads = 1", False),
+        ("SELECT `a` FROM t", True),
+        ("SELECT `a` FROM t; DELETE FROM t", False),
+    ],
+)
+def test_is_read_only(sql, expected):
+    assert state._is_read_only(state._normalize_sql(sql)) is expected
+
+
+def test_normalize_sql_keeps_quoted_text():
+    assert state._normalize_sql("SELECT 'A', \"B\", $$C$$, D;") == (
+        "select 'A', \"B\", $$C$$, d"
+    )
+
+
+@pytest.fixture
+def scheduler():
+    yield state._QueryScheduler
+    state._QueryScheduler._queues.clear()
+    state._QueryScheduler._previews.clear()
+    state._QueryScheduler._running.clear()
+
+
+def test_scheduler_runs_one_query_per_session(scheduler):
+    first = scheduler.submit("a", preview=False)
+    second = scheduler.submit("a", preview=False)
+    assert first.granted.is_set()
+    assert not second.granted.is_set()
+    assert scheduler.position("a") == 1
+    scheduler.release(first)
+    assert second.granted.is_set()
+    scheduler.release(second)
+    assert scheduler.pending("a") == 0
+
+
+def test_scheduler_round_robins_sessions(scheduler):
+    running = [
+        scheduler.submit(f"busy{i}", preview=False)
+        for i in range(state.MAX_CONCURRENT_QUERIES)
+    ]
+    a1 = scheduler.submit("a", preview=False)
+    a2 = scheduler.submit("a", preview=False)
+    b1 = scheduler.submit("b", preview=False)
+    assert not any(t.granted.is_set() for t in (a1, a2, b1))
+    scheduler.release(running[0])
+    assert a1.granted.is_set()
+    scheduler.release(running[1])
+    assert b1.granted.is_set() and not a2.granted.is_set()
+
+
+def test_scheduler_previews_use_the_extra_slots(scheduler):
+    for i in range(state.MAX_CONCURRENT_QUERIES):
+        scheduler.submit(f"busy{i}", preview=False)
+    queued = scheduler.submit("a", preview=False)
+    preview = scheduler.submit("a", preview=True)
+    assert preview.granted.is_set()
+    assert not queued.granted.is_set()
+    other = scheduler.submit("b", preview=True)
+    assert not other.granted.is_set()
+    assert scheduler.position("b") == 1
+
+
+def test_scheduler_cancel_and_queue_limit(scheduler):
+    running = scheduler.submit("a", preview=False)
+    queued = [
+        scheduler.submit("a", preview=False)
+        for _ in range(state.MAX_QUEUED_QUERIES_PER_SESSION - 1)
+    ]
+    assert scheduler.submit("a", preview=False) is None
+    assert scheduler.cancel("a") == len(queued)
+    assert all(t.cancelled and t.granted.is_set() for t in queued)
+    assert scheduler.pending("a") == 1
+    scheduler.release(running)
+    assert scheduler.pending("a") == 0
+
+
+def test_scheduled_call_waits_in_the_session_queue(scheduler):
+    async def scenario():
+        running = [
+            scheduler.submit(f"busy{i}", preview=False)
+            for i in range(state.MAX_CONCURRENT_QUERIES)
+        ]
+        call = asyncio.ensure_future(state._scheduled_call("a", lambda: "done"))
+        await asyncio.sleep(0)
+        assert not call.done()
+        preview = scheduler.submit("b", preview=True)
+        assert preview.granted.is_set()
+        scheduler.release(preview)
+        scheduler.release(running[0])
+        return await call
+
+    assert asyncio.run(scenario()) == "done"
+
+
+@pytest.fixture
+def session():
+    """A session connected to its own in-memory DuckDB database."""
+    driver = drivers.DuckDBDriver.connect({"database": ":memory:"})
+    session_token = f"test-{uuid.uuid4()}"
+    state.DB_POOL.set(session_token, driver)
+    yield driver, session_token
+    state.DB_POOL.release(session_token)
+
+
+@pytest.fixture
+def result_ids():
+    """Fresh result ids, whose stored rows are discarded afterwards."""
+    ids = []
+
+    def new_id() -> str:
+        ids.append(str(uuid.uuid4()))
+        return ids[-1]
+
+    yield new_id
+    for result_id in ids:
+        state.RESULT_STORE.discard(result_id)
+
+
+def _timings() -> state.QueryTimings:
+    return state.QueryTimings(
+        translate=0.0, plan=0.0, execute=0.0, fetch=0.0, serialize=0.0, state_sync=0.0
+    )
+
+
+def test_result_cache_keeps_private_sessions_apart(session):
+    driver, session_token = session
+    shared = state.RESULT_CACHE.key(driver, "SELECT * FROM t", session_token)
+    assert shared == state.RESULT_CACHE.key(driver, "select * from t;", "other")
+    assert state.RESULT_CACHE.key(driver, "CREATE TABLE u (a INT)", "other") is None
+
+    state.DB_POOL.note_private_state(session_token)
+    private = state.RESULT_CACHE.key(driver, "SELECT * FROM t", session_token)
+    assert private != shared
+    state.RESULT_CACHE.put(private, state._build_result(["a"], [[1, 2]], False))
+    assert state.RESULT_CACHE.get(shared) is None
+
+    cached = state.RESULT_CACHE.get(private)
+    cached["columns"][0]["values"].append(3)
+    assert state._result_rows(state.RESULT_CACHE.get(private), 0, 5) == [[1], [2]]
+
+
+def test_fetch_page_tells_the_end_from_a_closed_cursor(session, result_ids):
+    driver, _ = session
+    page = state.RESULT_PAGE_SIZE
+    finished, closed = result_ids(), result_ids()
+
+    columns, cells, has_more = state.RESULT_CURSORS.open(
+        finished,
+        driver.session_cursor(),
+        f"SELECT * FROM range({page + 5})",
+        _timings(),
+    )
+    assert columns == ["range"] and len(cells[0]) == page and has_more
+    cells, has_more = state.RESULT_CURSORS.fetch_page(finished)
+    assert len(cells[0]) == 5 and not has_more
+    assert not state.RESULT_CURSORS.is_open(finished)
+    with pytest.raises(LookupError):
+        state.RESULT_CURSORS.fetch_page(finished)
+
+    state.RESULT_CURSORS.open(
+        closed, driver.session_cursor(), f"SELECT * FROM range({page * 3})", _timings()
+    )
+    state.RESULT_CURSORS.close(closed, keep_rows=True)
+    with pytest.raises(LookupError):
+        state.RESULT_CURSORS.fetch_page(closed)
+    kept = state.RESULT_STORE.get(closed)
+    assert kept["row_count"] == page and kept["has_more"]
+
+
+def test_columnar_results_round_trip_and_widen():
+    result = state._build_result(
+        ["i", "s", "n"], [[1, None, 3], ["a", "a", None], [None, None, None]], True
+    )
+    assert [column["kind"] for column in result["columns"][:2]] == ["int", "dict"]
+    state._append_page(result, [[2.5, None], ["b", "c"], [7, None]], False)
+    assert [column["kind"] for column in result["columns"]] == ["float", "dict", "int"]
+    rows = [[1, "a", None], [None, "a", None], [3, None, None], [2.5, "b", 7]]
+    assert state._result_rows(result, 0, 4) == rows
+    assert state._result_rows(result, 4, 9) == [[None, "c", None]]
+    assert not result["has_more"]
+
+    copy = state._copy_result(result)
+    copy["columns"][0]["nulls"][0] = 0
+    assert state._result_rows(result, 0, 5) == state._result_rows(
+        state._copy_result(result), 0, 5
+    )
+
+
+def test_session_archive_round_trip(tmp_path, result_ids):
+    result = state._build_result(["a", "b"], [[1, 2], ["x", None]], False)
+    stored, unstored = result_ids(), result_ids()
+    state.RESULT_STORE.put(stored, result)
+    session_data = {
+        "query_history": [
+            {"id": stored, "natural_language": "stored"},
+            {"id": unstored, "natural_language": "unstored"},
+            {"id": result_ids(), "natural_language": "gone"},
+        ]
+    }
+    path = str(tmp_path / "session.orb")
+    state._write_session_archive(path, session_data, {unstored: result})
+
+    imported, keep_archive = state._read_session_file(path)
+    try:
+        assert keep_archive
+        items = imported["query_history"]
+        assert [item["natural_language"] for item in items] == [
+            "stored",
+            "unstored",
+            "gone",
+        ]
+        assert not {item["id"] for item in items} & {stored, unstored}
+        for item in items[:2]:
+            restored = state.RESULT_STORE.get(item["id"])
+            assert state._result_rows(restored, 0, 5) == [[1, "x"], [2, None]]
+        assert state.RESULT_STORE.get(items[2]["id"]) is None
+    finally:
+        state.RESULT_STORE.release_archive(path)
+        for item in imported["query_history"]:
+            state.RESULT_STORE.discard(item["id"])
+
+
+def test_session_file_v1_stores_inline_results(tmp_path):
+    path = tmp_path / "session.orb"
+    path.write_text(
+        json.dumps(
+            {
+                "query_history": [
+                    {"id": "a", "results": {"columns": ["x"], "rows": [[1], [2]]}},
+                    {"id": "b", "status": "error"},
+                ]
+            }
+        )
+    )
+    imported, keep_archive = state._read_session_file(str(path))
+    first, second = imported["query_history"]
+    try:
+        assert not keep_archive
+        assert first["row_count"] == 2 and "results" not in first
+        assert state._result_rows(state.RESULT_STORE.get(first["id"]), 0, 2) == [
+            [1],
+            [2],
+        ]
+        assert state.RESULT_STORE.get(second["id"]) is None
+    finally:
+        state.RESULT_STORE.discard(first["id"])
+
+
+def test_prepared_statements_are_reused_and_capped(monkeypatch):
+    monkeypatch.setattr(state, "MAX_PREPARED_STATEMENTS", 2)
+    con = duckdb.connect()
+    session_token = f"test-{uuid.uuid4()}"
+    statements = state.PREPARED_STATEMENTS
+    try:
+        statements.execute(
+            session_token, con, "SELECT $a + 1 AS x", {"a": "41"}, _timings()
+        )
+        assert con.fetchall() == [(42,)]
+        names = statements._sessions[session_token].names
+        first = names[state._normalize_sql("SELECT $a + 1 AS x")]
+        statements.execute(
+            session_token, con, "select $a + 1 as x", {"a": "1.5"}, _timings()
+        )
+        assert float(con.fetchall()[0][0]) == 2.5
+        assert list(names.values()) == [first]
+
+        for sql in ("SELECT $a::VARCHAR", "SELECT $a IS NULL"):
+            statements.execute(session_token, con, sql, {"a": "NULL"}, _timings())
+        assert first not in names.values() and len(names) == 2
+        with pytest.raises(duckdb.Error):
+            con.execute(f"EXECUTE {first}(a := 1)")
+    finally:
+        statements.forget(con)
+        con.close()
+    assert session_token not in statements._sessions
+
+
+def test_table_stats(monkeypatch):
+    driver = drivers.DuckDBDriver.connect({"database": ":memory:"})
+    driver.con.execute(
+        "CREATE TABLE t AS SELECT i, 'v' || (i % 2) AS s, "
+        "TIMESTAMPTZ '2024-01-01 00:00:00+00' + to_hours(i) AS ts, "
+        "NULL::INTEGER AS n FROM range(100) r(i)"
+    )
+    table = state.Table(name="t", database="", schema="", columns=[])
+    try:
+        stats = state._table_stats(driver, table)
+        assert (stats["row_count"], stats["sample_rows"], stats["error"]) == (
+            100,
+            0,
+            "",
+        )
+        columns = {column["name"]: column for column in stats["columns"]}
+        assert sum(b["count"] for b in columns["i"]["histogram"]) == 100
+        assert sorted(b["label"] for b in columns["s"]["histogram"]) == ["v0", "v1"]
+        assert columns["ts"]["histogram"] == []
+        assert columns["n"]["null_percent"] == 100.0
+        assert columns["n"]["histogram"] == []
+
+        monkeypatch.setattr(state, "TABLE_STATS_SAMPLE_THRESHOLD_ROWS", 50)
+        monkeypatch.setattr(state, "TABLE_STATS_SAMPLE_ROWS", 20)
+        sampled = state._table_stats(driver, table)
+        assert (sampled["row_count"], sampled["sample_rows"]) == (100, 20)
+    finally:
+        driver.close()
+
+
+def test_result_routes(result_ids):
+    result_id = result_ids()
+    state.RESULT_STORE.put(
+        result_id,
+        state._build_result(["a", "b"], [[1, 2, 3], [1.5, float("nan"), None]], False),
+    )
+    state.RESULT_STREAMS.register(result_id, f"test-{uuid.uuid4()}")
+    client = TestClient(results_api)
+    url = f"{state.RESULT_STREAM_PATH}/{result_id}"
+
+    response = client.get(f"{url}/rows", params={"first": 1, "last": 10})
+    assert response.json() == {"rows": [[2, "nan"], [3, None]]}
+    assert client.get(f"{url}/rows", params={"first": "x"}).status_code == 400
+    missing = f"{state.RESULT_STREAM_PATH}/{uuid.uuid4()}"
+    assert client.get(f"{missing}/rows?first=0&last=1").status_code == 404
+    assert client.get(missing).status_code == 404
+
+    table = pa.ipc.open_stream(client.get(url).content).read_all()
+    assert table.column_names == ["a", "b"] and table.num_rows == 3
+    assert table.schema.metadata == {b"has_more": b"false"}
\ No newline at end of file